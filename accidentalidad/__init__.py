@@ -0,0 +1,5 @@
+"""Lógica de datos del dashboard de accidentalidad vial (sin dependencias de Streamlit)."""
+from .carga import asegurar_snapshot, huella_archivo, leer_meta
+from .esquema import compactar
+
+__all__ = ['asegurar_snapshot', 'compactar', 'huella_archivo', 'leer_meta']
@@ -0,0 +1,199 @@
+"""Recarga en segundo plano de la colección cuando cambian los CSV de ``data/``.
+
+Un ``Actualizador`` por proceso vigila la carpeta de datos con watchdog y,
+por si se pierde algún evento (carpetas de red, volúmenes montados), la
+revisa también cada cierto tiempo. Cuando aparece, cambia o desaparece un
+CSV construye en un hilo propio la versión completa (snapshots, dataset,
+índice de filtros, índice de texto y cubo) y solo entonces la publica,
+cambiando una referencia. Ninguna petición espera esa reconstrucción:
+mientras tanto se sigue sirviendo la versión anterior.
+
+Se conservan las últimas versiones publicadas para que cada sesión siga
+con la que empezó hasta que pase a la nueva.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from . import coleccion
+from .compartido import DatasetCompartido
+
+# Versiones en memoria a la vez: la vigente y la anterior (la de las
+# sesiones que aún no pasaron a la nueva)
+VERSIONES_CONSERVADAS = 2
+
+# Revisión periódica aunque watchdog no avise, y segundos sin cambios que
+# se esperan antes de reconstruir (un CSV que se está copiando)
+INTERVALO_REVISION = 60
+ESPERA_ESTABLE = 2.0
+
+
+@dataclass(frozen=True)
+class Version:
+    """Una versión publicada de la colección; inmutable una vez construida."""
+
+    huella: str
+    rutas: tuple
+    huellas: tuple
+    meta: dict
+    # None en modo por bloques: ahí el dataset se lee por ventanas de fechas
+    dataset: DatasetCompartido | None
+    publicada: float
+
+
+def _firma(carpeta):
+    """Rutas, tamaños y fechas de modificación de los CSV (sin leerlos)."""
+    firma = []
+    for ruta in coleccion.fuentes(carpeta):
+        estado = ruta.stat()
+        firma.append((str(ruta), estado.st_size, estado.st_mtime_ns))
+    return tuple(firma)
+
+
+def identificar(carpeta):
+    """Huella de la colección de ``carpeta``, con las rutas y huellas de sus archivos."""
+    rutas = tuple(str(ruta) for ruta in coleccion.fuentes(carpeta))
+    huellas = tuple(coleccion.huellas(rutas))
+    return coleccion.huella_coleccion(huellas), rutas, huellas
+
+
+def construir_version(huella, rutas, huellas):
+    """Versión completa de la colección, con índices y cubo ya construidos."""
+    meta = coleccion.combinar_metas(coleccion.asegurar_snapshots(rutas, huellas))
+    # Suma de los cubos de los snapshots (también en modo por bloques, donde
+    # cada ventana de fechas sale de él)
+    conteos = coleccion.cubo_coleccion(rutas, huellas)
+    dataset = None
+    if meta['modo'] != 'bloques':
+        dataset = DatasetCompartido(huella, coleccion.leer_coleccion(rutas, huellas),
+                                    coleccion.carpeta_coleccion(huella), conteos)
+        # Los índices perezosos se construyen aquí, no en la primera petición
+        dataset.busqueda
+    return Version(huella, rutas, huellas, meta, dataset, time.time())
+
+
+class Actualizador:
+    """Versión vigente de la colección, reconstruida en segundo plano cuando cambian los CSV."""
+
+    def __init__(self, carpeta, conservar=VERSIONES_CONSERVADAS, intervalo=INTERVALO_REVISION,
+                 espera=ESPERA_ESTABLE):
+        self.carpeta = Path(carpeta)
+        self.conservar = conservar
+        self.intervalo = intervalo
+        self.espera = espera
+        # Último error de una reconstrucción (la versión vigente sigue sirviéndose)
+        self.error = None
+        self._versiones = OrderedDict()
+        self._vigente = None
+        self._firma = None
+        self._firma_error = None
+        self._candado = threading.Lock()
+        self._cambio = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._observador = None
+
+    def cargar(self):
+        """Construye y publica la primera versión en el hilo que llama.
+
+        Lanza ``FileNotFoundError`` si no hay CSV y ``ValueError`` si alguno
+        no tiene un esquema conocido.
+        """
+        firma = _firma(self.carpeta)
+        self._publicar(construir_version(*identificar(self.carpeta)), firma)
+        return self._vigente
+
+    def iniciar(self):
+        """Empieza a vigilar la carpeta en segundo plano."""
+        self._hilo = threading.Thread(target=self._bucle, name='actualizador-datos', daemon=True)
+        self._hilo.start()
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            # Sin watchdog queda solo la revisión periódica
+            return self
+
+        cambio = self._cambio
+
+        class AvisoCSV(FileSystemEventHandler):
+            def on_any_event(self, evento):
+                rutas = (evento.src_path, getattr(evento, 'dest_path', '') or '')
+                if not evento.is_directory and any(str(r).lower().endswith('.csv') for r in rutas):
+                    cambio.set()
+
+        self._observador = Observer()
+        self._observador.daemon = True
+        self._observador.schedule(AvisoCSV(), str(self.carpeta), recursive=False)
+        self._observador.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        self._cambio.set()
+        if self._observador is not None:
+            self._observador.stop()
+
+    def vigente(self):
+        """Última versión publicada (leer la referencia no necesita candado)."""
+        return self._vigente
+
+    def obtener(self, huella):
+        """Versión ``huella`` si todavía se conserva, o None."""
+        with self._candado:
+            return self._versiones.get(huella)
+
+    def _publicar(self, version, firma):
+        with self._candado:
+            self._versiones[version.huella] = version
+            self._versiones.move_to_end(version.huella)
+            while len(self._versiones) > self.conservar:
+                self._versiones.popitem(last=False)
+            self._firma = firma
+            # El cambio de versión es esta sola asignación
+            self._vigente = version
+
+    def revisar(self):
+        """Reconstruye y publica si los CSV cambiaron; devuelve True si hay versión nueva."""
+        firma = None
+        try:
+            firma = _firma(self.carpeta)
+            if firma == self._firma:
+                # Sin cambios, o de vuelta a lo publicado (se quitó el archivo que fallaba)
+                self.error = None
+                return False
+            if firma == self._firma_error:
+                # Lo que ya falló no se vuelve a construir hasta que cambie
+                return False
+            # Un archivo que todavía se está copiando cambia entre dos miradas
+            time.sleep(self.espera)
+            if _firma(self.carpeta) != firma:
+                self._cambio.set()
+                return False
+            huella, rutas, huellas = identificar(self.carpeta)
+            if huella == self._vigente.huella:
+                # Mismo contenido (por ejemplo, un archivo tocado o copiado encima)
+                self._firma = firma
+                return False
+            version = construir_version(huella, rutas, huellas)
+        except (OSError, ValueError) as e:
+            self.error = str(e)
+            self._firma_error = firma
+            return False
+        self.error = None
+        self._firma_error = None
+        self._publicar(version, firma)
+        return True
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            self._cambio.wait(self.intervalo)
+            if self._detener.is_set():
+                break
+            # Se agrupan los eventos seguidos (una copia genera varios)
+            while self._cambio.is_set() and not self._detener.is_set():
+                self._cambio.clear()
+                self._detener.wait(self.espera)
+            self.revisar()
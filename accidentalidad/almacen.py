@@ -0,0 +1,107 @@
+"""Almacén en disco particionado por año y mes.
+
+Las filas se guardan en archivos Parquet bajo ``ANIO=aaaa/MES=m/``. Cada
+escritura agrega archivos nuevos con su propio prefijo, así que incorporar un
+mes de datos no reescribe las particiones existentes. Las lecturas por rango
+de fechas o por municipio solo abren las particiones (y grupos de filas) que
+pueden contener resultados.
+"""
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .esquema import CATEGORICAS, COLUMNA_MINUTO, ordenar_categorias
+
+COLUMNAS_PARTICION = ['ANIO', 'MES']
+
+
+def esquema_arrow(columnas):
+    """Esquema fijo de los archivos: todo texto salvo FECHA y MINUTO_DIA."""
+    campos = []
+    for col in columnas:
+        if col == 'FECHA':
+            campos.append(pa.field(col, pa.timestamp('ns')))
+        elif col == COLUMNA_MINUTO:
+            campos.append(pa.field(col, pa.int16()))
+        else:
+            campos.append(pa.field(col, pa.string()))
+    return pa.schema(campos)
+
+
+def como_texto(df):
+    """Categóricas -> texto, para que todas las escrituras compartan el esquema."""
+    return df.astype({col: object for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+
+
+def escribir_particiones(df, raiz, prefijo='parte'):
+    """Agrega las filas al almacén, un archivo nuevo por (año, mes) tocado.
+
+    ``prefijo`` debe ser distinto en cada escritura; los archivos que ya
+    existen en las particiones no se modifican.
+    """
+    if df.empty:
+        return
+    esquema = esquema_arrow(df.columns)
+    tabla = pa.Table.from_pandas(como_texto(df), schema=esquema, preserve_index=False)
+    tabla = tabla.append_column('ANIO', pa.array(df['FECHA'].dt.year.to_numpy(), pa.int16()))
+    tabla = tabla.append_column('MES', pa.array(df['FECHA'].dt.month.to_numpy(), pa.int8()))
+    pq.write_to_dataset(
+        tabla, raiz,
+        partition_cols=COLUMNAS_PARTICION,
+        basename_template=f"{prefijo}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore',
+    )
+
+
+def _dataset(raiz):
+    """Dataset Arrow de un almacén, o la unión de varios si ``raiz`` es una lista."""
+    # Las columnas categóricas se leen directamente como diccionario (sin un
+    # string por fila) y pasan a pandas como categóricas
+    formato = ds.ParquetFileFormat(dictionary_columns=list(CATEGORICAS))
+    if not isinstance(raiz, (list, tuple)):
+        return ds.dataset(raiz, format=formato, partitioning='hive')
+
+    # Exportaciones distintas pueden traer columnas extra distintas: se unifica
+    # el esquema y las columnas ausentes se leen como nulas
+    partes = [ds.dataset(r, format=formato, partitioning='hive') for r in raiz]
+    esquema = pa.unify_schemas([parte.schema for parte in partes])
+    return ds.dataset([ds.dataset(r, format=formato, partitioning='hive', schema=esquema) for r in raiz])
+
+
+def filtro(desde=None, hasta=None, municipios=None):
+    """Expresión Arrow para un rango de fechas y/o una lista de municipios.
+
+    Las condiciones sobre ANIO/MES permiten descartar particiones enteras sin
+    abrirlas; las de FECHA y MUNICIPIO recortan dentro de cada archivo.
+    """
+    anio, mes = ds.field('ANIO'), ds.field('MES')
+    condiciones = []
+    if desde is not None:
+        desde = pd.Timestamp(desde)
+        condiciones.append((anio > desde.year) | ((anio == desde.year) & (mes >= desde.month)))
+        condiciones.append(ds.field('FECHA') >= pa.scalar(desde.to_pydatetime(), pa.timestamp('ns')))
+    if hasta is not None:
+        hasta = pd.Timestamp(hasta)
+        condiciones.append((anio < hasta.year) | ((anio == hasta.year) & (mes <= hasta.month)))
+        condiciones.append(ds.field('FECHA') <= pa.scalar(hasta.to_pydatetime(), pa.timestamp('ns')))
+    if municipios:
+        condiciones.append(ds.field('MUNICIPIO').isin(list(municipios)))
+    if not condiciones:
+        return None
+    expresion = condiciones[0]
+    for condicion in condiciones[1:]:
+        expresion = expresion & condicion
+    return expresion
+
+
+def leer_particiones(raiz, desde=None, hasta=None, municipios=None, columnas=None):
+    """Lee solo las particiones que cumplen los filtros y devuelve el DataFrame compacto.
+
+    ``raiz`` puede ser un almacén o una lista de almacenes que se leen como uno solo.
+    """
+    dataset = _dataset(raiz)
+    nombres = [c for c in dataset.schema.names if c not in COLUMNAS_PARTICION]
+    tabla = dataset.to_table(columns=columnas or nombres, filter=filtro(desde, hasta, municipios))
+    return ordenar_categorias(tabla.to_pandas())
+
@@ -0,0 +1,177 @@
+"""Índice invertido de trigramas para buscar por dirección o barrio.
+
+Los textos se normalizan (minúsculas y sin tildes) y se indexan una sola vez
+por valor distinto, no por fila: cada trigrama apunta a los textos que lo
+contienen y cada texto a las filas donde aparece. El índice se guarda junto
+al snapshot del dataset para no reconstruirlo en cada sesión.
+"""
+import os
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+COLUMNAS_TEXTO = ['DIRECCION', 'BARRIO']
+ARCHIVO_INDICE = 'indice_texto.npz'
+TAMANO_NGRAMA = 3
+
+
+def normalizar_texto(texto):
+    """Minúsculas, sin tildes y con los espacios colapsados."""
+    descompuesto = unicodedata.normalize('NFKD', str(texto))
+    sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_tildes.lower().split())
+
+
+def _trigramas(texto):
+    return {texto[i:i + TAMANO_NGRAMA] for i in range(len(texto) - TAMANO_NGRAMA + 1)}
+
+
+def _csr(claves, valores, total):
+    """Agrupa valores por clave: el grupo k es valores[ptr[k]:ptr[k + 1]]."""
+    orden = np.argsort(claves, kind='stable')
+    ptr = np.concatenate(([0], np.cumsum(np.bincount(claves, minlength=total))))
+    return ptr, valores[orden]
+
+
+class IndiceTexto:
+    """Trigramas -> textos normalizados -> ids de fila."""
+
+    def __init__(self, textos, originales, trigramas, post_ptr, post_ids, filas_ptr, filas_ids):
+        self.textos = textos
+        self.originales = originales
+        self.trigramas = trigramas
+        self.post_ptr = post_ptr
+        self.post_ids = post_ids
+        self.filas_ptr = filas_ptr
+        self.filas_ids = filas_ids
+        self._posicion = {t: i for i, t in enumerate(trigramas.tolist())}
+
+    @classmethod
+    def construir(cls, df, columnas=COLUMNAS_TEXTO):
+        """Construye el índice a partir de las columnas de texto del DataFrame."""
+        por_columna = []
+        originales = {}
+        for col in columnas:
+            # Se normaliza cada valor distinto una sola vez
+            codigos, unicos = pd.factorize(df[col], sort=False)
+            normales = [normalizar_texto(u) for u in unicos]
+            for normal, original in zip(normales, unicos):
+                originales.setdefault(normal, str(original).strip())
+            por_columna.append((codigos, normales))
+
+        textos = sorted(originales)
+        posicion = {t: i for i, t in enumerate(textos)}
+
+        # Texto -> filas (una fila puede aparecer por DIRECCION y por BARRIO)
+        claves, filas = [], []
+        for codigos, normales in por_columna:
+            mapa = np.array([posicion[n] for n in normales], dtype=np.int64)
+            validas = np.flatnonzero(codigos >= 0)
+            claves.append(mapa[codigos[validas]])
+            filas.append(validas)
+        filas_ptr, filas_ids = _csr(np.concatenate(claves), np.concatenate(filas), len(textos))
+
+        # Trigrama -> textos; los ids de texto quedan ordenados por construcción
+        postings = {}
+        for i, texto in enumerate(textos):
+            for trigrama in _trigramas(texto):
+                postings.setdefault(trigrama, []).append(i)
+        trigramas = sorted(postings)
+        largos = [len(postings[t]) for t in trigramas]
+        post_ptr = np.concatenate(([0], np.cumsum(largos, dtype=np.int64)))
+        post_ids = np.fromiter((i for t in trigramas for i in postings[t]), dtype=np.int32, count=int(post_ptr[-1]))
+
+        return cls(
+            np.array(textos, dtype=str),
+            np.array([originales[t] for t in textos], dtype=str),
+            np.array(trigramas, dtype=str),
+            post_ptr, post_ids, filas_ptr, filas_ids.astype(np.int32),
+        )
+
+    @property
+    def nbytes(self):
+        """Memoria ocupada por los arreglos del índice."""
+        return sum(a.nbytes for a in (self.textos, self.originales, self.trigramas,
+                                      self.post_ptr, self.post_ids, self.filas_ptr, self.filas_ids))
+
+    # --- Persistencia ---
+
+    def guardar(self, ruta):
+        """Escribe el índice en un .npz (sin pickle) de forma atómica."""
+        ruta = Path(ruta)
+        temporal = ruta.with_name(f".{ruta.stem}-{os.getpid()}.npz")
+        np.savez(
+            temporal, textos=self.textos, originales=self.originales, trigramas=self.trigramas,
+            post_ptr=self.post_ptr, post_ids=self.post_ids,
+            filas_ptr=self.filas_ptr, filas_ids=self.filas_ids,
+        )
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta):
+        """Lee un índice escrito con guardar()."""
+        with np.load(ruta) as datos:
+            return cls(**{nombre: datos[nombre] for nombre in datos.files})
+
+    # --- Consultas ---
+
+    def _textos_con(self, consulta):
+        """Ids de los textos normalizados que contienen la consulta."""
+        if len(consulta) < TAMANO_NGRAMA:
+            # Consultas muy cortas: se recorren los textos distintos, no las filas
+            return np.flatnonzero(np.char.find(self.textos, consulta) >= 0)
+
+        listas = []
+        for trigrama in _trigramas(consulta):
+            k = self._posicion.get(trigrama)
+            if k is None:
+                return np.empty(0, dtype=np.int64)
+            listas.append(self.post_ids[self.post_ptr[k]:self.post_ptr[k + 1]])
+
+        listas.sort(key=len)
+        candidatos = listas[0]
+        for lista in listas[1:]:
+            candidatos = np.intersect1d(candidatos, lista, assume_unique=True)
+            if len(candidatos) == 0:
+                return candidatos
+
+        # Compartir trigramas no garantiza la subcadena: se verifica sobre los candidatos
+        return candidatos[np.char.find(self.textos[candidatos], consulta) >= 0]
+
+    def buscar(self, consulta):
+        """Ids de fila (ordenados) cuya dirección o barrio contiene la consulta."""
+        consulta = normalizar_texto(consulta)
+        if not consulta:
+            return None
+        ids = self._textos_con(consulta)
+        if len(ids) == 0:
+            return np.empty(0, dtype=self.filas_ids.dtype)
+        partes = [self.filas_ids[self.filas_ptr[i]:self.filas_ptr[i + 1]] for i in ids]
+        return np.unique(np.concatenate(partes))
+
+    def sugerencias(self, prefijo, limite=8):
+        """Textos originales que empiezan por el prefijo (para autocompletar)."""
+        prefijo = normalizar_texto(prefijo)
+        if not prefijo:
+            return []
+        inicio = np.searchsorted(self.textos, prefijo, side='left')
+        fin = np.searchsorted(self.textos, prefijo + '\uffff', side='right')
+        return self.originales[inicio:min(fin, inicio + limite)].tolist()
+
+
+def cargar_o_construir(df, directorio):
+    """Lee el índice guardado en la carpeta del snapshot o lo construye y lo guarda.
+
+    Con ``directorio=None`` (datos parciales) el índice no se persiste.
+    """
+    if directorio is None:
+        return IndiceTexto.construir(df)
+    ruta = Path(directorio) / ARCHIVO_INDICE
+    if ruta.exists():
+        return IndiceTexto.cargar(ruta)
+    indice = IndiceTexto.construir(df)
+    if ruta.parent.exists():
+        indice.guardar(ruta)
+    return indice
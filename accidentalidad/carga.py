@@ -0,0 +1,216 @@
+"""Carga y normalización del CSV de accidentalidad del AMVA.
+
+El CSV se lee, se limpia y se tipa una sola vez. El resultado se guarda como
+un snapshot Parquet identificado por el hash del contenido del archivo, así
+los reruns y los demás procesos solo tienen que leer el Parquet.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from . import registro
+from .almacen import como_texto, escribir_particiones
+from .cubo import ARCHIVO_CUBO, Cubo
+from .esquema import COLUMNA_MINUTO, categorizar, compactar, minuto_del_dia
+from .memoria import MedidorPico
+
+# Carpeta donde se guardan los snapshots (ignorada por Git)
+DIRECTORIO_CACHE = Path('data') / '.cache'
+
+# Se incrementa cuando cambia el formato del snapshot para no reutilizar los viejos
+VERSION_SNAPSHOT = 4
+
+# Subcarpeta del snapshot con el almacén particionado por año y mes
+CARPETA_DATOS = 'datos'
+
+# CSV más grandes que esto se procesan por bloques de TAMANO_BLOQUE filas
+UMBRAL_BLOQUES = 256 * 2 ** 20
+TAMANO_BLOQUE = 200_000
+
+# Filas sin alguno de estos valores no sirven para el análisis
+COLUMNAS_CLAVE = ['FECHA', 'MUNICIPIO', 'COMUNA', 'CLASE', 'GRAVEDAD']
+COMUNA_SIN_INFORMACION = 'SIN INFORMACI\xcaN'
+
+# Huellas ya calculadas en este proceso: (ruta, tamaño, mtime) -> hash
+_HUELLAS = {}
+
+
+def huella_archivo(ruta, bloque=1 << 20):
+    """Devuelve el hash SHA-256 (abreviado) del contenido del archivo."""
+    ruta = Path(ruta).resolve()
+    estado = ruta.stat()
+    clave = (str(ruta), estado.st_size, estado.st_mtime_ns)
+    if clave not in _HUELLAS:
+        sha = hashlib.sha256()
+        with open(ruta, 'rb') as archivo:
+            for trozo in iter(lambda: archivo.read(bloque), b''):
+                sha.update(trozo)
+        _HUELLAS[clave] = sha.hexdigest()[:16]
+    return _HUELLAS[clave]
+
+
+def ruta_snapshot(ruta_csv, huella, directorio_cache=DIRECTORIO_CACHE):
+    """Carpeta del snapshot correspondiente a una versión del CSV."""
+    return Path(directorio_cache) / f"{Path(ruta_csv).stem}-{huella}-v{VERSION_SNAPSHOT}"
+
+
+def leer_csv(ruta_csv, esquema=None, **kwargs):
+    """Lee el CSV crudo con el separador y la codificación detectados."""
+    esquema = esquema or registro.identificar(ruta_csv)
+    # Todo se lee como texto para que el esquema no dependa de qué filas tocó cada bloque
+    return pd.read_csv(ruta_csv, sep=esquema.separador, encoding=esquema.codificacion, dtype=str, **kwargs)
+
+
+def normalizar_columnas(df, esquema=None):
+    """Limpia los nombres de columna y los lleva al esquema canónico."""
+    renombres = esquema.renombres if esquema else registro.mapear(df.columns)
+    df.columns = [col.strip() for col in df.columns]
+    return df.rename(columns=renombres)
+
+
+def limpiar(df):
+    """Convierte FECHA/HORA y elimina las filas inutilizables."""
+    df['FECHA'] = pd.to_datetime(df['FECHA'], format='%d/%m/%Y', errors='coerce')
+
+    # HORA viene en formato "hh:mm:ss AM/PM"; se interpreta una sola vez
+    hora = pd.to_datetime(df['HORA'], format='%I:%M:%S %p', errors='coerce')
+    df[COLUMNA_MINUTO] = minuto_del_dia(hora)
+
+    df = df.dropna(subset=COLUMNAS_CLAVE)
+    df = df[df['COMUNA'] != COMUNA_SIN_INFORMACION]
+    return df.reset_index(drop=True)
+
+
+def _construir_en_memoria(ruta_csv, esquema, carpeta, medidor):
+    """Lee el CSV completo, lo limpia y escribe datos y cubo de una vez."""
+    df = limpiar(normalizar_columnas(leer_csv(ruta_csv, esquema), esquema))
+    medidor.muestrear()
+    df, memoria = compactar(df)
+    medidor.muestrear()
+    escribir_particiones(df, carpeta / CARPETA_DATOS)
+    Cubo.construir(df).celdas.to_parquet(carpeta / ARCHIVO_CUBO, index=False)
+    medidor.muestrear()
+    return {
+        'filas': len(df),
+        'columnas': list(df.columns),
+        'bytes_por_fila': memoria,
+        'fecha_min': str(df['FECHA'].min().date()),
+        'fecha_max': str(df['FECHA'].max().date()),
+    }
+
+
+def _construir_por_bloques(ruta_csv, esquema, carpeta, tamano_bloque, medidor):
+    """Procesa el CSV en bloques de filas con memoria acotada.
+
+    Cada bloque pasa por las mismas reglas de renombrado, limpieza y
+    compactación, se agrega al almacén particionado y actualiza el cubo de
+    conteos; nunca hay más de un bloque de filas en memoria. Como las
+    exportaciones del AMVA vienen ordenadas por fecha, cada bloque suele
+    tocar muy pocas particiones.
+    """
+    cubo = None
+    columnas = None
+    filas = 0
+    fecha_min = fecha_max = None
+    bytes_antes = bytes_despues = 0.0
+    for numero, bloque in enumerate(leer_csv(ruta_csv, esquema, chunksize=tamano_bloque)):
+        bloque = limpiar(normalizar_columnas(bloque, esquema))
+        if bloque.empty:
+            continue
+        bloque, memoria = compactar(bloque)
+        filas += len(bloque)
+        bytes_antes += memoria['antes'] * len(bloque)
+        bytes_despues += memoria['despues'] * len(bloque)
+        columnas = list(bloque.columns)
+        fecha_min = min(filter(None, [fecha_min, bloque['FECHA'].min()]))
+        fecha_max = max(filter(None, [fecha_max, bloque['FECHA'].max()]))
+
+        parcial = Cubo.construir(bloque)
+        parcial.celdas = como_texto(parcial.celdas)
+        cubo = parcial if cubo is None else cubo.combinar(parcial)
+
+        escribir_particiones(bloque, carpeta / CARPETA_DATOS, prefijo=f"bloque{numero:05d}")
+        medidor.muestrear()
+
+    if cubo is None:
+        raise ValueError("El CSV no contiene filas válidas.")
+    categorizar(cubo.celdas).to_parquet(carpeta / ARCHIVO_CUBO, index=False)
+    medidor.muestrear()
+    memoria = {'antes': round(bytes_antes / filas, 1), 'despues': round(bytes_despues / filas, 1)}
+    return {
+        'filas': filas,
+        'columnas': columnas,
+        'bytes_por_fila': memoria,
+        'fecha_min': str(fecha_min.date()),
+        'fecha_max': str(fecha_max.date()),
+    }
+
+
+def construir_snapshot(ruta_csv, destino, huella, tamano_bloque=None):
+    """Construye el snapshot en una carpeta temporal y la publica de forma atómica.
+
+    Con ``tamano_bloque`` (o si el CSV supera ``UMBRAL_BLOQUES``) el CSV se
+    procesa por bloques en lugar de cargarse completo en memoria.
+    """
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    if tamano_bloque is None and Path(ruta_csv).stat().st_size > UMBRAL_BLOQUES:
+        tamano_bloque = TAMANO_BLOQUE
+
+    temporal = Path(tempfile.mkdtemp(prefix=f".{destino.name}-", dir=destino.parent))
+    try:
+        inicio = time.perf_counter()
+        medidor = MedidorPico()
+        esquema = registro.identificar(ruta_csv)
+        if tamano_bloque:
+            resumen = _construir_por_bloques(ruta_csv, esquema, temporal, tamano_bloque, medidor)
+        else:
+            resumen = _construir_en_memoria(ruta_csv, esquema, temporal, medidor)
+        meta = {
+            'fuente': str(ruta_csv),
+            'huella': huella,
+            'esquema': {
+                'huella': esquema.huella,
+                'codificacion': esquema.codificacion,
+                'separador': esquema.separador,
+                'renombres': esquema.renombres,
+            },
+            'modo': 'bloques' if tamano_bloque else 'memoria',
+            **resumen,
+            'segundos_construccion': round(time.perf_counter() - inicio, 3),
+            'pico_rss_mb': medidor.pico_mb(),
+        }
+        (temporal / 'meta.json').write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding='utf-8')
+        os.replace(temporal, destino)
+    except OSError:
+        # Otro proceso publicó el mismo snapshot primero; el suyo es igual de válido
+        if not (destino / 'meta.json').exists():
+            raise
+    finally:
+        shutil.rmtree(temporal, ignore_errors=True)
+    return leer_meta(ruta_csv, huella, destino.parent)
+
+
+def leer_meta(ruta_csv, huella=None, directorio_cache=DIRECTORIO_CACHE):
+    """Metadatos del snapshot (filas, memoria por fila, ...) o {} si no existe."""
+    huella = huella or huella_archivo(ruta_csv)
+    ruta_meta = ruta_snapshot(ruta_csv, huella, directorio_cache) / 'meta.json'
+    if not ruta_meta.exists():
+        return {}
+    return json.loads(ruta_meta.read_text(encoding='utf-8'))
+
+
+def asegurar_snapshot(ruta_csv, huella=None, directorio_cache=DIRECTORIO_CACHE, tamano_bloque=None):
+    """Construye el snapshot si todavía no existe y devuelve sus metadatos."""
+    huella = huella or huella_archivo(ruta_csv)
+    meta = leer_meta(ruta_csv, huella, directorio_cache)
+    if not meta:
+        meta = construir_snapshot(ruta_csv, ruta_snapshot(ruta_csv, huella, directorio_cache), huella, tamano_bloque)
+    return meta
+
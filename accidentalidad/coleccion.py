@@ -0,0 +1,143 @@
+"""Colección de varios CSV del AMVA tratada como un solo dataset.
+
+Cada archivo de ``data/`` tiene su propio snapshot (ver ``carga``). Los que
+faltan se construyen en paralelo en un pool de procesos, así que cargar
+varias exportaciones anuales tarda lo que tarda la más lenta. La lectura
+une los almacenes particionados de todos los archivos en una sola tabla.
+
+El cubo de conteos de la colección es la suma de los cubos que cada
+snapshot guardó al construirse (en modo por bloques, acumulado bloque a
+bloque), así que no hace falta recorrer ninguna fila para obtenerlo.
+"""
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from .almacen import como_texto, leer_particiones
+from .carga import CARPETA_DATOS, DIRECTORIO_CACHE, asegurar_snapshot, huella_archivo, leer_meta, ruta_snapshot
+from .cubo import ARCHIVO_CUBO, Cubo, guardar_celdas
+from .esquema import categorizar
+
+CARPETA_FUENTES = Path('data')
+
+
+def fuentes(carpeta=CARPETA_FUENTES, patron='*.csv'):
+    """CSV de la carpeta, en orden alfabético (el orden fija la posición de las filas)."""
+    rutas = sorted(Path(carpeta).glob(patron))
+    if not rutas:
+        raise FileNotFoundError(f"No hay archivos {patron} en '{carpeta}'.")
+    return rutas
+
+
+def huellas(rutas):
+    """Huella de contenido de cada archivo."""
+    return [huella_archivo(ruta) for ruta in rutas]
+
+
+def huella_coleccion(huellas_archivos):
+    """Versión de la colección: cambia si cambia, se agrega o se quita un archivo."""
+    return hashlib.sha256('|'.join(huellas_archivos).encode('ascii')).hexdigest()[:16]
+
+
+def carpeta_coleccion(version, directorio_cache=DIRECTORIO_CACHE):
+    """Carpeta donde se persisten los índices calculados sobre la colección."""
+    carpeta = Path(directorio_cache) / f"coleccion-{version}"
+    carpeta.mkdir(parents=True, exist_ok=True)
+    return carpeta
+
+
+def asegurar_snapshots(rutas, huellas_archivos, directorio_cache=DIRECTORIO_CACHE, procesos=None):
+    """Construye en paralelo los snapshots que falten y devuelve los metadatos de todos."""
+    metas = [leer_meta(ruta, huella, directorio_cache) for ruta, huella in zip(rutas, huellas_archivos)]
+    pendientes = [i for i, meta in enumerate(metas) if not meta]
+
+    if len(pendientes) == 1:
+        i = pendientes[0]
+        metas[i] = asegurar_snapshot(rutas[i], huellas_archivos[i], directorio_cache)
+    elif pendientes:
+        procesos = min(len(pendientes), procesos or os.cpu_count() or 1)
+        # Procesos nuevos (spawn) y no copias (fork): el servidor de Streamlit
+        # tiene muchos hilos, y un fork puede heredar un candado tomado por
+        # alguno de ellos y quedarse esperándolo para siempre
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+            futuros = {
+                i: pool.submit(asegurar_snapshot, str(rutas[i]), huellas_archivos[i], str(directorio_cache))
+                for i in pendientes
+            }
+            for i, futuro in futuros.items():
+                metas[i] = futuro.result()
+    return metas
+
+
+def combinar_metas(metas):
+    """Metadatos agregados de la colección (mismo formato que los de un archivo)."""
+    filas = sum(meta['filas'] for meta in metas)
+
+    def promedio(clave):
+        return round(sum(meta['bytes_por_fila'][clave] * meta['filas'] for meta in metas) / max(filas, 1), 1)
+
+    picos = [meta['pico_rss_mb'] for meta in metas if meta.get('pico_rss_mb')]
+    return {
+        'fuentes': [meta['fuente'] for meta in metas],
+        'esquemas': sorted({meta['esquema']['huella'] for meta in metas}),
+        'filas': filas,
+        'modo': 'bloques' if any(meta['modo'] == 'bloques' for meta in metas) else 'memoria',
+        'bytes_por_fila': {'antes': promedio('antes'), 'despues': promedio('despues')},
+        'fecha_min': min(meta['fecha_min'] for meta in metas),
+        'fecha_max': max(meta['fecha_max'] for meta in metas),
+        'pico_rss_mb': max(picos) if picos else None,
+    }
+
+
+def leer_coleccion(rutas, huellas_archivos, desde=None, hasta=None, municipios=None,
+                   directorio_cache=DIRECTORIO_CACHE):
+    """Une los almacenes de todos los archivos, leyendo solo las particiones pedidas."""
+    raices = [
+        ruta_snapshot(ruta, huella, directorio_cache) / CARPETA_DATOS
+        for ruta, huella in zip(rutas, huellas_archivos)
+    ]
+    return leer_particiones(raices, desde, hasta, municipios)
+
+
+def cubo_coleccion(rutas, huellas_archivos, directorio_cache=DIRECTORIO_CACHE):
+    """Cubo de toda la colección, sumando los cubos de los snapshots.
+
+    El resultado se guarda en la carpeta de la colección; las categorías son
+    las observadas en las celdas (ver ``Cubo.alinear`` para llevarlas a las
+    de un DataFrame).
+    """
+    metas = [leer_meta(ruta, huella, directorio_cache) for ruta, huella in zip(rutas, huellas_archivos)]
+    fecha_min = pd.Timestamp(min(meta['fecha_min'] for meta in metas))
+    fecha_max = pd.Timestamp(max(meta['fecha_max'] for meta in metas))
+    ruta = carpeta_coleccion(huella_coleccion(huellas_archivos), directorio_cache) / ARCHIVO_CUBO
+    if ruta.exists():
+        return Cubo(pd.read_parquet(ruta), fecha_min, fecha_max)
+
+    total = None
+    for ruta_csv, huella in zip(rutas, huellas_archivos):
+        celdas = pd.read_parquet(ruta_snapshot(ruta_csv, huella, directorio_cache) / ARCHIVO_CUBO)
+        # Cada archivo tiene sus propias categorías: se suman como texto
+        parcial = Cubo(como_texto(celdas))
+        total = parcial if total is None else total.combinar(parcial)
+    celdas = categorizar(total.celdas)
+    guardar_celdas(celdas, ruta)
+    return Cubo(celdas, fecha_min, fecha_max)
+
+
+def cubo_ventana(total, df, desde, hasta):
+    """Cubo de una ventana de fechas cuyas filas son ``df``.
+
+    Los meses completos de la ventana salen del cubo de la colección
+    ``total``; solo los días sueltos de los bordes se cuentan desde ``df``.
+    """
+    fechas = df['FECHA']
+    ventana = total.consultar(
+        None, (pd.Timestamp(desde), pd.Timestamp(hasta)),
+        lambda inicio, fin: df[((fechas >= inicio) & (fechas <= fin)).to_numpy()],
+    )
+    return Cubo(ventana.celdas, fechas.min() if len(df) else None, fechas.max() if len(df) else None)
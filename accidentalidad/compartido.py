@@ -0,0 +1,101 @@
+"""Dataset compartido por todas las sesiones de un proceso.
+
+El DataFrame limpio y sus índices existen una sola vez por proceso y versión
+y se tratan como inmutables: cada sesión trabaja con selecciones de ids de
+fila sobre él, nunca con una copia propia del dataset. ``RegistroSesiones``
+lleva la cuenta de lo que cada sesión agrega encima de lo compartido.
+"""
+import threading
+import time
+
+import numpy as np
+
+from . import busqueda, cubo
+from .filtros import IndiceFiltros
+from .memoria import rss_actual
+
+MB = 2 ** 20
+
+
+class DatasetCompartido:
+    """DataFrame de solo lectura con su índice de filtros y, bajo demanda, búsqueda y cubo.
+
+    ``conteos`` es un cubo ya armado para ``df`` (por ejemplo, el de la
+    colección); sin él, el cubo se lee de ``carpeta_indices`` o se construye.
+    """
+
+    def __init__(self, version, df, carpeta_indices=None, conteos=None):
+        self.version = version
+        self.df = df
+        self.carpeta_indices = carpeta_indices
+        self.indice = IndiceFiltros(df)
+        # Se mide una sola vez (deep recorre los strings)
+        self.bytes_datos = int(df.memory_usage(deep=True).sum())
+        self._busqueda = None
+        self._cubo = None if conteos is None else conteos.alinear(df)
+        self._candado = threading.Lock()
+
+    @property
+    def busqueda(self):
+        """Índice de texto; se carga la primera vez que alguna sesión busca."""
+        with self._candado:
+            if self._busqueda is None:
+                self._busqueda = busqueda.cargar_o_construir(self.df, self.carpeta_indices)
+            return self._busqueda
+
+    @property
+    def cubo(self):
+        """Cubo de conteos; se carga la primera vez que se dibujan gráficos."""
+        with self._candado:
+            if self._cubo is None:
+                self._cubo = cubo.cargar_o_construir(self.df, self.carpeta_indices)
+            return self._cubo
+
+    def tomar(self, filas):
+        """Filas seleccionadas (None = el DataFrame compartido, sin copiar)."""
+        return self.df if filas is None else self.df.take(filas)
+
+    def bytes_filas(self, filas):
+        """Memoria aproximada de materializar ``filas`` filas del dataset."""
+        return int(self.bytes_datos / max(len(self.df), 1) * filas)
+
+    def bytes_total(self):
+        """Datos más índices cargados en este proceso."""
+        total = self.bytes_datos + self.indice.nbytes
+        if self._busqueda is not None:
+            total += self._busqueda.nbytes
+        if self._cubo is not None:
+            total += int(self._cubo.celdas.memory_usage(deep=True).sum())
+        return total
+
+
+class RegistroSesiones:
+    """Bytes propios de cada sesión activa (selecciones, vistas materializadas)."""
+
+    def __init__(self, inactividad=600):
+        self.inactividad = inactividad
+        self._sesiones = {}
+        self._candado = threading.Lock()
+
+    def registrar(self, sesion, bytes_propios):
+        with self._candado:
+            self._sesiones[sesion] = (time.monotonic(), int(bytes_propios))
+
+    def _activas(self):
+        limite = time.monotonic() - self.inactividad
+        with self._candado:
+            # Las sesiones que no hacen rerun hace rato se dan por cerradas
+            for sesion in [s for s, (visto, _) in self._sesiones.items() if visto < limite]:
+                del self._sesiones[sesion]
+            return [bytes_propios for _, bytes_propios in self._sesiones.values()]
+
+    def resumen(self, compartido_bytes=0):
+        """Métricas de memoria del proceso: compartida, por sesión y RSS total."""
+        propias = self._activas()
+        rss = rss_actual()
+        return {
+            'sesiones': len(propias),
+            'mb_compartidos': round(compartido_bytes / MB, 1),
+            'mb_por_sesion': round(float(np.mean(propias)) / MB, 2) if propias else 0.0,
+            'rss_mb': None if rss is None else round(rss / MB, 1),
+        }
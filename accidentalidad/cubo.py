@@ -0,0 +1,180 @@
+"""Cubo de conteos pre-agregado para los gráficos del dashboard.
+
+El cubo guarda cuántos accidentes hay en cada combinación observada de las
+dimensiones. Cualquier gráfico, con cualquier combinación de los selectbox,
+se responde rebanando y sumando celdas en lugar de recorrer las filas.
+"""
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .esquema import COLUMNA_MINUTO
+
+DIMENSIONES = ['MUNICIPIO', 'COMUNA', 'CLASE', 'GRAVEDAD', 'DÍA DE LA SEMANA', 'HORA_DIA', 'DISEÑO', 'MES']
+COLUMNA_TOTAL = 'TOTAL'
+ARCHIVO_CUBO = 'cubo.parquet'
+
+
+def _inicio_mes(fecha):
+    return pd.Timestamp(fecha).to_period('M').to_timestamp()
+
+
+def claves(df):
+    """Valores de las dimensiones del cubo para cada fila (hora y mes derivados)."""
+    return df[['MUNICIPIO', 'COMUNA', 'CLASE', 'GRAVEDAD', 'DÍA DE LA SEMANA', 'DISEÑO']].assign(
+        # SIN_HORA (-1) // 60 sigue siendo -1, así que se conserva como "sin hora"
+        HORA_DIA=(df[COLUMNA_MINUTO] // 60).astype(np.int8),
+        MES=df['FECHA'].dt.to_period('M').dt.to_timestamp(),
+    )
+
+
+class Cubo:
+    """Celdas (una por combinación de dimensiones) con su número de accidentes."""
+
+    # Conteos exactos (ver muestreo.VistaMuestra para los estimados)
+    aproximada = False
+
+    def __init__(self, celdas, fecha_min=None, fecha_max=None):
+        self.celdas = celdas
+        self.fecha_min = fecha_min
+        self.fecha_max = fecha_max
+
+    @classmethod
+    def construir(cls, df):
+        """Agrega las filas del DataFrame (una pasada) en celdas de conteo."""
+        celdas = (
+            claves(df).groupby(DIMENSIONES, observed=True, dropna=False)
+            .size()
+            .reset_index(name=COLUMNA_TOTAL)
+        )
+        fechas = df['FECHA']
+        return cls(celdas, fechas.min() if len(df) else None, fechas.max() if len(df) else None)
+
+    @property
+    def total(self):
+        """Número de accidentes representados por el cubo."""
+        return int(self.celdas[COLUMNA_TOTAL].sum())
+
+    def combinar(self, otro):
+        """Suma celda a celda con otro cubo (por ejemplo, el de unas filas sueltas)."""
+        celdas = (
+            pd.concat([self.celdas, otro.celdas], ignore_index=True)
+            .groupby(DIMENSIONES, observed=True, dropna=False)[COLUMNA_TOTAL]
+            .sum()
+            .reset_index()
+        )
+        return Cubo(celdas, self.fecha_min, self.fecha_max)
+
+    def alinear(self, df):
+        """Mismo cubo con las categorías de ``df``, para combinarlo con cubos de sus filas."""
+        celdas = self.celdas.copy()
+        for col in DIMENSIONES:
+            if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+                celdas[col] = pd.Categorical(celdas[col], categories=df[col].cat.categories,
+                                             ordered=df[col].cat.ordered)
+        return Cubo(celdas, self.fecha_min, self.fecha_max)
+
+    # --- Rebanado ---
+
+    def rebanar(self, igualdades=None, meses=None):
+        """Cubo con solo las celdas que cumplen los filtros de igualdad y de meses."""
+        mascara = np.ones(len(self.celdas), dtype=bool)
+        for col, valor in (igualdades or {}).items():
+            mascara &= (self.celdas[col] == valor).to_numpy()
+        if meses is not None:
+            desde, hasta = meses
+            mes = self.celdas['MES']
+            mascara &= ((mes >= desde) & (mes <= hasta)).to_numpy()
+        return Cubo(self.celdas[mascara], self.fecha_min, self.fecha_max)
+
+    def dividir_rango(self, desde, hasta):
+        """Separa un rango de fechas en meses completos y tramos sueltos en los bordes.
+
+        Devuelve ``(meses, bordes)``: ``meses`` es (primer mes, último mes) de los
+        meses cubiertos por completo, o None si no hay ninguno, y ``bordes`` la
+        lista de rangos (desde, hasta) que hay que contar desde las filas.
+        """
+        desde, hasta = pd.Timestamp(desde), pd.Timestamp(hasta)
+        # Fuera de los datos no hay nada que contar: se extiende al mes completo
+        if self.fecha_min is not None and desde <= self.fecha_min:
+            desde = _inicio_mes(desde)
+        if self.fecha_max is not None and hasta >= self.fecha_max:
+            hasta = _inicio_mes(hasta) + pd.offsets.MonthEnd(0)
+
+        primero = _inicio_mes(desde)
+        if desde != primero:
+            primero = primero + pd.offsets.MonthBegin(1)
+        ultimo = _inicio_mes(hasta)
+        if hasta.normalize() != ultimo + pd.offsets.MonthEnd(0):
+            ultimo = ultimo - pd.offsets.MonthBegin(1)
+
+        if primero > ultimo:
+            return None, [(desde, hasta)]
+        bordes = []
+        if desde < primero:
+            bordes.append((desde, primero - pd.Timedelta(days=1)))
+        if hasta >= ultimo + pd.offsets.MonthBegin(1):
+            bordes.append((ultimo + pd.offsets.MonthBegin(1), hasta))
+        return (primero, ultimo), bordes
+
+    def consultar(self, igualdades, rango, filas_en_rango):
+        """Cubo para los filtros dados; solo los bordes del rango se cuentan por filas.
+
+        ``filas_en_rango(desde, hasta)`` debe devolver el DataFrame de filas que
+        cumplen las igualdades dentro de ese tramo de fechas.
+        """
+        if rango is None:
+            return self.rebanar(igualdades)
+        meses, bordes = self.dividir_rango(*rango)
+        vista = self.rebanar(igualdades, meses) if meses else Cubo(self.celdas.iloc[:0], self.fecha_min, self.fecha_max)
+        for desde, hasta in bordes:
+            vista = vista.combinar(Cubo.construir(filas_en_rango(desde, hasta)))
+        return vista
+
+    # --- Agregaciones para los gráficos ---
+
+    def contar(self, *dimensiones, completo=False):
+        """Total de accidentes por las dimensiones pedidas.
+
+        Con ``completo=True`` aparecen también las categorías sin accidentes
+        (útil para el gráfico de días de la semana).
+        """
+        conteo = (
+            self.celdas.groupby(list(dimensiones), observed=not completo)[COLUMNA_TOTAL]
+            .sum()
+            .reset_index()
+        )
+        if not completo:
+            # Sin las categorías que no aparecen: Plotly agrupa por todas las
+            # categorías de la columna y falla con las que no tienen filas
+            for col in dimensiones:
+                if isinstance(conteo[col].dtype, pd.CategoricalDtype):
+                    conteo[col] = conteo[col].cat.remove_unused_categories()
+        return conteo
+
+
+def guardar_celdas(celdas, ruta):
+    """Escribe las celdas en ``ruta`` de forma atómica (otro proceso puede estar leyéndola)."""
+    ruta = Path(ruta)
+    temporal = ruta.with_name(f".{ruta.stem}-{os.getpid()}.parquet")
+    celdas.to_parquet(temporal, index=False)
+    temporal.replace(ruta)
+
+
+def cargar_o_construir(df, directorio):
+    """Lee el cubo guardado en la carpeta del snapshot o lo construye y lo guarda.
+
+    Con ``directorio=None`` (datos parciales) el cubo no se persiste.
+    """
+    if directorio is None:
+        return Cubo.construir(df)
+    ruta = Path(directorio) / ARCHIVO_CUBO
+    fechas = df['FECHA']
+    if ruta.exists():
+        return Cubo(pd.read_parquet(ruta), fechas.min(), fechas.max())
+    cubo = Cubo.construir(df)
+    if ruta.parent.exists():
+        guardar_celdas(cubo.celdas, ruta)
+    return cubo
@@ -0,0 +1,44 @@
+"""Cálculos largos en hilos de fondo, compartidos entre sesiones.
+
+Cada cálculo se pide con una clave (versión del dataset, filtros, ...) y
+devuelve un ``Future``: la página puede esperarlo un momento y, si todavía
+no terminó, mostrar algo provisional y volver más tarde. Dos sesiones que
+piden la misma clave comparten el mismo cálculo.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+HILOS_CALCULO = 2
+CALCULOS_CONSERVADOS = 32
+
+
+class CalculosDiferidos:
+    """Futuros por clave sobre un pool acotado, con expulsión LRU."""
+
+    def __init__(self, hilos=HILOS_CALCULO, capacidad=CALCULOS_CONSERVADOS):
+        self.capacidad = capacidad
+        self._ejecutor = ThreadPoolExecutor(hilos, thread_name_prefix='calculos')
+        self._futuros = OrderedDict()
+        self._candado = threading.Lock()
+
+    def pedir(self, clave, funcion):
+        """Futuro del resultado de ``funcion()`` para ``clave``; lo lanza si no existe."""
+        with self._candado:
+            futuro = self._futuros.get(clave)
+            # Un cálculo que falló se vuelve a intentar en la próxima petición
+            if futuro is None or (futuro.done() and futuro.exception() is not None):
+                futuro = self._ejecutor.submit(funcion)
+                self._futuros[clave] = futuro
+            self._futuros.move_to_end(clave)
+            while len(self._futuros) > self.capacidad:
+                self._futuros.popitem(last=False)
+        return futuro
+
+    def listo(self, clave):
+        """Resultado ya calculado para ``clave``, o None si no está, no terminó o falló."""
+        with self._candado:
+            futuro = self._futuros.get(clave)
+        if futuro is None or not futuro.done() or futuro.exception() is not None:
+            return None
+        return futuro.result()
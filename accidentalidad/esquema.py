@@ -0,0 +1,88 @@
+"""Esquema compacto del DataFrame de accidentes.
+
+Las columnas de baja cardinalidad se guardan como categóricas con un orden
+fijo y la hora del accidente como un único entero pequeño (minuto del día).
+"""
+import numpy as np
+import pandas as pd
+
+ORDEN_DIAS = ['LUNES', 'MARTES', 'MIERCOLES', 'JUEVES', 'VIERNES', 'SABADO', 'DOMINGO']
+ORDEN_GRAVEDAD = ['Solo Daños', 'Heridos', 'Muertos']
+
+# Columna categórica -> orden fijo de categorías (None = orden alfabético)
+# Los valores observados que no estén en el orden fijo se agregan al final
+CATEGORICAS = {
+    'MUNICIPIO': None,
+    'COMUNA': None,
+    'BARRIO': None,
+    'CLASE': None,
+    'GRAVEDAD': ORDEN_GRAVEDAD,
+    'DISEÑO': None,
+    'DÍA DE LA SEMANA': ORDEN_DIAS,
+}
+
+# Minuto del día (0-1439); -1 cuando la hora no se pudo interpretar
+COLUMNA_MINUTO = 'MINUTO_DIA'
+SIN_HORA = -1
+
+
+def bytes_por_fila(df):
+    """Memoria real (incluyendo los strings) dividida por el número de filas."""
+    if df.empty:
+        return 0.0
+    return float(df.memory_usage(deep=True).sum()) / len(df)
+
+
+def _categorias(valores, orden):
+    """Categorías observadas, respetando el orden fijo cuando existe."""
+    observadas = set(valores.dropna().unique())
+    fijas = [c for c in (orden or []) if c in observadas]
+    return fijas + sorted(observadas - set(fijas))
+
+
+def minuto_del_dia(horas):
+    """Convierte una serie de timestamps en minutos del día (int16)."""
+    minutos = horas.dt.hour * 60 + horas.dt.minute
+    return minutos.fillna(SIN_HORA).astype(np.int16)
+
+
+def hora_del_dia(minutos):
+    """Hora (0-23) a partir de MINUTO_DIA; NaN cuando no hay hora."""
+    return (minutos // 60).where(minutos != SIN_HORA)
+
+
+def hora_texto(minutos):
+    """Formatea MINUTO_DIA como 'HH:MM' para mostrarlo en tablas."""
+    horas, resto = np.divmod(minutos.to_numpy(), 60)
+    texto = pd.Series([f"{h:02d}:{m:02d}" for h, m in zip(horas, resto)], index=minutos.index)
+    return texto.where(minutos != SIN_HORA, '')
+
+
+def categorizar(df):
+    """Convierte las columnas del esquema en categóricas (con strip) sobre una copia."""
+    df = df.copy()
+    for col, orden in CATEGORICAS.items():
+        if col not in df.columns:
+            continue
+        # El strip se hace una sola vez aquí (p. ej. 'LUNES    ' -> 'LUNES')
+        valores = df[col].astype('string').str.strip()
+        df[col] = pd.Categorical(valores, categories=_categorias(valores, orden), ordered=orden is not None)
+    return df
+
+
+def ordenar_categorias(df):
+    """Lleva categóricas ya existentes al orden del esquema sin tocar los strings."""
+    for col, orden in CATEGORICAS.items():
+        if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+            actuales = pd.Series(df[col].cat.categories)
+            df[col] = df[col].cat.set_categories(_categorias(actuales, orden), ordered=orden is not None)
+    return df
+
+
+def compactar(df):
+    """Aplica el esquema compacto y devuelve (df, reporte de memoria)."""
+    antes = bytes_por_fila(df)
+    # HORA (texto) queda representada por MINUTO_DIA
+    df = categorizar(df).drop(columns=['HORA'], errors='ignore')
+    reporte = {'antes': round(antes, 1), 'despues': round(bytes_por_fila(df), 1)}
+    return df, reporte
@@ -0,0 +1,102 @@
+"""Exportación de la selección filtrada a CSV o Parquet.
+
+Las filas se escriben por bloques de ids: cada bloque se toma del dataset,
+se escribe y se descarta, así que la memoria usada depende del tamaño del
+bloque y no del tamaño del resultado. El archivo se arma en disco con un
+nombre temporal y se publica con un ``os.replace`` atómico.
+"""
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .almacen import como_texto
+from .esquema import COLUMNA_MINUTO, hora_texto
+from .tabla import COLUMNAS_TABLA
+
+FORMATOS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+TAMANO_BLOQUE = 50_000
+ARCHIVOS_CONSERVADOS = 16
+
+
+def bloques(df, ids, columnas=COLUMNAS_TABLA, tamano_bloque=TAMANO_BLOQUE):
+    """Genera la selección como DataFrames de a lo sumo ``tamano_bloque`` filas.
+
+    ``ids`` = None exporta todas las filas. La hora se entrega como 'HH:MM'.
+    """
+    ids = np.arange(len(df)) if ids is None else ids
+    # Siempre al menos un bloque (vacío si no hay filas) para escribir el encabezado
+    for inicio in range(0, max(len(ids), 1), tamano_bloque):
+        bloque = df.take(ids[inicio:inicio + tamano_bloque])[columnas]
+        if COLUMNA_MINUTO in bloque.columns:
+            bloque = bloque.assign(**{COLUMNA_MINUTO: hora_texto(bloque[COLUMNA_MINUTO])})
+            bloque = bloque.rename(columns={COLUMNA_MINUTO: 'HORA'})
+        yield bloque
+
+
+def _escribir_csv(partes, destino):
+    with open(destino, 'w', encoding='utf-8', newline='') as archivo:
+        for i, bloque in enumerate(partes):
+            bloque.to_csv(archivo, index=False, header=i == 0, date_format='%Y-%m-%d')
+
+
+def _escribir_parquet(partes, destino):
+    escritor = None
+    try:
+        for bloque in partes:
+            tabla = pa.Table.from_pandas(como_texto(bloque), preserve_index=False)
+            if escritor is None:
+                escritor = pq.ParquetWriter(destino, tabla.schema)
+            escritor.write_table(tabla)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+def nombre_exportacion(*partes):
+    """Nombre estable para una exportación (versión, filtros, orden, ...)."""
+    return hashlib.sha1(repr(partes).encode('utf-8')).hexdigest()[:16]
+
+
+def _limpiar(carpeta, conservar=ARCHIVOS_CONSERVADOS):
+    """Borra las exportaciones más antiguas, dejando las ``conservar`` más recientes."""
+    def antiguedad(ruta):
+        # Otra sesión puede haberlo borrado entre el glob y el stat
+        try:
+            return ruta.stat().st_mtime
+        except FileNotFoundError:
+            return 0
+
+    for ruta in sorted(carpeta.glob('export-*'), key=antiguedad)[:-conservar]:
+        ruta.unlink(missing_ok=True)
+
+
+def exportar(df, ids, formato, carpeta, nombre, tamano_bloque=TAMANO_BLOQUE):
+    """Escribe la selección en ``carpeta/export-{nombre}.{formato}`` y devuelve la ruta.
+
+    Si el archivo ya existe (misma versión, filtros y orden) se reutiliza.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de exportación no soportado: '{formato}'.")
+    carpeta = Path(carpeta)
+    carpeta.mkdir(parents=True, exist_ok=True)
+    destino = carpeta / f"export-{nombre}.{formato}"
+    if destino.exists():
+        return destino
+
+    temporal = carpeta / f".export-{nombre}-{os.getpid()}-{threading.get_ident()}.{formato}"
+    escribir = _escribir_csv if formato == 'csv' else _escribir_parquet
+    try:
+        escribir(bloques(df, ids, tamano_bloque=tamano_bloque), temporal)
+        os.replace(temporal, destino)
+    finally:
+        temporal.unlink(missing_ok=True)
+    _limpiar(carpeta)
+    return destino
@@ -0,0 +1,67 @@
+"""Caché de figuras compartida entre sesiones, con expulsión LRU.
+
+Muchas sesiones piden las mismas combinaciones de filtros ("Todos" en todo,
+un municipio, ...). Cada figura se guarda bajo (versión del dataset, filtros
+normalizados, id del gráfico) y se reutiliza tal cual: Streamlit solo la lee
+para serializarla, así que una misma figura puede servir a varias sesiones.
+"""
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def clave_filtros(igualdades=None, rango=None, consulta=None):
+    """Tupla hashable e independiente del orden que describe un estado de filtros."""
+    fechas = None if rango is None else tuple(str(pd.Timestamp(f).date()) for f in rango)
+    return (tuple(sorted((igualdades or {}).items())), fechas, consulta or None)
+
+
+class CacheFiguras:
+    """Figuras ya construidas, con límite de entradas y contadores de aciertos."""
+
+    def __init__(self, capacidad=256):
+        self.capacidad = capacidad
+        self.aciertos = 0
+        self.fallos = 0
+        self._figuras = OrderedDict()
+        self._candado = threading.Lock()
+
+    def buscar(self, clave):
+        """Figura de ``clave`` si ya está guardada, o None (sin construirla)."""
+        with self._candado:
+            figura = self._figuras.get(clave)
+            if figura is not None:
+                self._figuras.move_to_end(clave)
+                self.aciertos += 1
+            return figura
+
+    def obtener(self, clave, construir):
+        """Figura de ``clave``; si no está, la construye con ``construir()`` y la guarda."""
+        with self._candado:
+            figura = self._figuras.get(clave)
+            if figura is not None:
+                self._figuras.move_to_end(clave)
+                self.aciertos += 1
+                return figura
+            self.fallos += 1
+
+        # Se construye fuera del candado para no bloquear a las otras sesiones
+        figura = construir()
+        with self._candado:
+            self._figuras[clave] = figura
+            self._figuras.move_to_end(clave)
+            while len(self._figuras) > self.capacidad:
+                self._figuras.popitem(last=False)
+        return figura
+
+    def estadisticas(self):
+        """Entradas guardadas, aciertos, fallos y tasa de aciertos."""
+        with self._candado:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._figuras),
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa': self.aciertos / consultas if consultas else 0.0,
+            }
@@ -0,0 +1,145 @@
+"""Motor de filtros basado en índices de filas por valor.
+
+Para cada columna filtrable se guardan los ids de fila agrupados por categoría
+(ordenados de forma ascendente dentro de cada grupo) y para FECHA un índice
+ordenado por fecha. Una combinación de filtros se resuelve partiendo del
+conjunto más pequeño y combinando el resto con un AND sobre ese conjunto, sin
+crear DataFrames intermedios; al final se hace un único ``take``.
+"""
+import numpy as np
+import pandas as pd
+
+COLUMNAS_FILTRO = ['MUNICIPIO', 'CLASE', 'GRAVEDAD', 'DÍA DE LA SEMANA', 'COMUNA']
+
+
+def _tipo_ids(filas):
+    """int32 mientras alcance; reduce a la mitad la memoria de los índices."""
+    return np.int32 if filas < np.iinfo(np.int32).max else np.int64
+
+
+def _ordenar_ids(ids, filas):
+    """Ordena ids de fila; con muchos ids es más barato pasar por una máscara."""
+    if len(ids) * 16 < filas:
+        return np.sort(ids)
+    mascara = np.zeros(filas, dtype=bool)
+    mascara[ids] = True
+    return np.flatnonzero(mascara).astype(ids.dtype, copy=False)
+
+
+class IndiceFiltros:
+    """Índice de ids de fila por valor de categoría y por fecha."""
+
+    def __init__(self, df, columnas=COLUMNAS_FILTRO, columna_fecha='FECHA'):
+        self.filas = len(df)
+        tipo = _tipo_ids(self.filas)
+
+        self.codigos = {}
+        self.categorias = {}
+        self._orden = {}
+        self._limites = {}
+        for col in columnas:
+            cat = df[col].cat
+            codigos = cat.codes.to_numpy()
+            self.codigos[col] = codigos
+            self.categorias[col] = {valor: i for i, valor in enumerate(cat.categories)}
+            # Los nulos (código -1) quedan al principio; el grupo del código c
+            # ocupa orden[limites[c + 1]:limites[c + 2]]
+            self._orden[col] = np.argsort(codigos, kind='stable').astype(tipo)
+            conteos = np.bincount(codigos.astype(np.int64) + 1, minlength=len(cat.categories) + 1)
+            self._limites[col] = np.concatenate(([0], np.cumsum(conteos)))
+
+        self._fechas = df[columna_fecha].to_numpy('datetime64[ns]').view(np.int64)
+        self._orden_fecha = np.argsort(self._fechas, kind='stable').astype(tipo)
+        self._fechas_ordenadas = self._fechas[self._orden_fecha]
+
+    @property
+    def nbytes(self):
+        """Memoria ocupada por los arreglos del índice."""
+        arreglos = [*self.codigos.values(), *self._orden.values(), *self._limites.values(),
+                    self._fechas, self._orden_fecha, self._fechas_ordenadas]
+        return sum(a.nbytes for a in arreglos)
+
+    # --- Consultas elementales ---
+
+    def valores(self, columna):
+        """Categorías de una columna en su orden (para los selectbox)."""
+        return list(self.categorias[columna])
+
+    def _rango_grupo(self, columna, valor):
+        codigo = self.categorias[columna].get(valor)
+        if codigo is None:
+            return 0, 0
+        limites = self._limites[columna]
+        return limites[codigo + 1], limites[codigo + 2]
+
+    def _rango_fechas(self, desde, hasta):
+        desde = pd.Timestamp(desde).value
+        hasta = pd.Timestamp(hasta).value
+        i = np.searchsorted(self._fechas_ordenadas, desde, side='left')
+        j = np.searchsorted(self._fechas_ordenadas, hasta, side='right')
+        return i, j
+
+    def filas_de(self, columna, valor):
+        """Ids de fila (ascendentes) donde columna == valor."""
+        i, j = self._rango_grupo(columna, valor)
+        return self._orden[columna][i:j]
+
+    def filas_en_rango(self, desde, hasta):
+        """Ids de fila (ascendentes) con FECHA entre desde y hasta, inclusive."""
+        i, j = self._rango_fechas(desde, hasta)
+        return _ordenar_ids(self._orden_fecha[i:j], self.filas)
+
+    # --- Combinación de filtros ---
+
+    def seleccionar(self, igualdades=None, rango_fechas=None, candidatos=None):
+        """Ids de fila que cumplen todos los filtros, o None si no filtran nada.
+
+        ``igualdades`` es un dict columna -> valor, ``rango_fechas`` una tupla
+        (desde, hasta) y ``candidatos`` un arreglo ordenado de ids ya calculado
+        por otro medio (por ejemplo la búsqueda de texto).
+        """
+        # Cada filtro se describe con su tamaño, cómo obtener sus ids y cómo
+        # probar la pertenencia de un conjunto de ids ya reducido
+        filtros = []
+
+        for col, valor in (igualdades or {}).items():
+            i, j = self._rango_grupo(col, valor)
+            codigo = self.categorias[col].get(valor, -2)
+            filtros.append((
+                j - i,
+                lambda col=col, valor=valor: self.filas_de(col, valor),
+                lambda ids, col=col, codigo=codigo: self.codigos[col][ids] == codigo,
+            ))
+
+        if rango_fechas is not None:
+            i, j = self._rango_fechas(*rango_fechas)
+            # Un rango que cubre todas las fechas no descarta nada
+            if j - i < self.filas:
+                desde, hasta = (pd.Timestamp(f).value for f in rango_fechas)
+                filtros.append((
+                    j - i,
+                    lambda: self.filas_en_rango(*rango_fechas),
+                    lambda ids: (self._fechas[ids] >= desde) & (self._fechas[ids] <= hasta),
+                ))
+
+        if candidatos is not None:
+            candidatos = np.asarray(candidatos)
+            filtros.append((
+                len(candidatos),
+                lambda: candidatos,
+                lambda ids: np.isin(ids, candidatos, assume_unique=True),
+            ))
+
+        if not filtros:
+            return None
+
+        # Se parte del filtro más selectivo; el resto solo mira esas filas
+        filtros.sort(key=lambda f: f[0])
+        ids = filtros[0][1]()
+        if len(ids) == 0 or len(filtros) == 1:
+            return ids
+
+        mascara = np.ones(len(ids), dtype=bool)
+        for _, _, probar in filtros[1:]:
+            mascara &= probar(ids)
+        return ids[mascara]
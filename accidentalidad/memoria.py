@@ -0,0 +1,39 @@
+"""Medición de memoria residente (RSS) del proceso."""
+import os
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def rss_actual():
+    """RSS actual en bytes, o None si el sistema no permite consultarlo."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # Sin /proc solo se conoce el pico histórico (KB en Linux, bytes en macOS)
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico if os.uname().sysname == 'Darwin' else pico * 1024
+    return None
+
+
+class MedidorPico:
+    """Registra el mayor RSS observado entre llamadas a ``muestrear``."""
+
+    def __init__(self):
+        self.inicial = rss_actual()
+        self.pico = self.inicial
+
+    def muestrear(self):
+        actual = rss_actual()
+        if actual is not None and (self.pico is None or actual > self.pico):
+            self.pico = actual
+        return actual
+
+    def pico_mb(self):
+        """Pico observado en MB (redondeado), o None si no se pudo medir."""
+        return None if self.pico is None else round(self.pico / 2 ** 20, 1)
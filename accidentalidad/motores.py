@@ -0,0 +1,199 @@
+"""Motores de consulta intercambiables para los filtros y los conteos.
+
+Los dos motores responden las mismas preguntas sobre un ``DatasetCompartido``:
+qué filas cumplen los filtros (para la tabla y la exportación) y el cubo de
+conteos de esa selección (para los gráficos).
+
+- ``pandas`` (por defecto): índices de filas por valor, búsqueda por
+  trigramas y cubo pre-agregado, todo en el proceso.
+- ``duckdb`` (opcional): SQL vectorizado y multi-hilo de DuckDB sobre el
+  mismo DataFrame en memoria, sin copiarlo.
+
+El motor se elige con la variable de entorno ``ACCIDENTALIDAD_MOTOR``; si
+se pide ``duckdb`` y no está instalado se usa ``pandas``.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from . import cubo
+from .busqueda import COLUMNAS_TEXTO, normalizar_texto
+from .esquema import COLUMNA_MINUTO, SIN_HORA
+
+VARIABLE_MOTOR = 'ACCIDENTALIDAD_MOTOR'
+MOTORES = ('pandas', 'duckdb')
+COLUMNA_FILA = 'FILA'
+
+
+def motor_configurado():
+    """Nombre del motor pedido por configuración ('pandas' si no se indica)."""
+    nombre = os.environ.get(VARIABLE_MOTOR, 'pandas').strip().lower()
+    if nombre not in MOTORES:
+        raise ValueError(f"Motor de consultas desconocido: '{nombre}' (opciones: {', '.join(MOTORES)}).")
+    return nombre
+
+
+def duckdb_disponible():
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def crear_motor(dataset, nombre=None):
+    """Motor ``nombre`` (o el configurado) sobre el dataset; cae a pandas sin DuckDB."""
+    nombre = nombre or motor_configurado()
+    if nombre == 'duckdb' and duckdb_disponible():
+        return MotorDuckDB(dataset)
+    return MotorPandas(dataset)
+
+
+class MotorPandas:
+    """Filtros con ``IndiceFiltros`` y conteos desde el cubo pre-agregado."""
+
+    nombre = 'pandas'
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def filas_texto(self, consulta):
+        """Ids de fila que contienen la consulta, o None sin consulta."""
+        return self.dataset.busqueda.buscar(consulta) if consulta else None
+
+    def seleccionar(self, igualdades=None, rango=None, consulta=None):
+        """Ids de fila (ascendentes) que cumplen los filtros, o None si no filtran nada."""
+        return self.dataset.indice.seleccionar(igualdades, rango, candidatos=self.filas_texto(consulta))
+
+    def vista(self, igualdades=None, rango=None, consulta=None):
+        """Cubo de conteos de la selección."""
+        dataset = self.dataset
+        filas_texto = self.filas_texto(consulta)
+        # Sale del cubo; solo la búsqueda de texto obliga a agregar desde las
+        # filas (y los días sueltos en los bordes del rango de fechas)
+        if filas_texto is None:
+            return dataset.cubo.consultar(
+                igualdades, rango,
+                lambda desde, hasta: dataset.tomar(dataset.indice.seleccionar(igualdades, (desde, hasta))),
+            )
+        return cubo.Cubo.construir(dataset.tomar(dataset.indice.seleccionar(igualdades, rango, candidatos=filas_texto)))
+
+
+def _texto_normalizado(serie):
+    """Categórica con el texto normalizado de cada fila (normalizando cada valor distinto una vez)."""
+    codigos, unicos = pd.factorize(serie, sort=False)
+    normales = np.array([normalizar_texto(u) for u in unicos], dtype=object)
+    normales, mapa = np.unique(normales, return_inverse=True)
+    # El código -1 (nulo) toma la última posición, que sigue siendo -1
+    mapa = np.append(mapa, -1)
+    return pd.Categorical.from_codes(mapa[codigos], normales)
+
+
+class MotorDuckDB:
+    """Las mismas consultas resueltas en SQL por DuckDB sobre el DataFrame compartido."""
+
+    nombre = 'duckdb'
+
+    def __init__(self, dataset, hilos=None):
+        import duckdb
+
+        self.dataset = dataset
+        df = dataset.df
+        # Columnas extra (sin copiar las del dataset): el id de fila y el texto
+        # normalizado igual que en la búsqueda por trigramas, para que las dos
+        # búsquedas encuentren exactamente lo mismo
+        extras = pd.DataFrame(
+            {COLUMNA_FILA: np.arange(len(df), dtype=np.int64),
+             **{f"{col}_N": _texto_normalizado(df[col]) for col in COLUMNAS_TEXTO}},
+            index=df.index,
+        )
+        self._tabla = pd.concat([df, extras], axis=1, copy=False)
+        self._fechas = (df['FECHA'].min(), df['FECHA'].max()) if len(df) else None
+        self._con = duckdb.connect()
+        self._con.execute(f"SET threads TO {int(hilos or os.cpu_count() or 1)}")
+        self._con.register('accidentes', self._tabla)
+        # Una conexión de DuckDB no admite consultas simultáneas desde varios hilos
+        self._candado = threading.Lock()
+
+    def _donde(self, igualdades=None, rango=None, consulta=None):
+        condiciones, parametros = [], []
+        for col, valor in (igualdades or {}).items():
+            condiciones.append(f'"{col}" = ?')
+            parametros.append(valor)
+        # Como en IndiceFiltros: un rango que cubre todas las fechas no descarta nada
+        if rango is not None and not self._cubre_todo(rango):
+            condiciones.append('"FECHA" BETWEEN ? AND ?')
+            parametros.extend(pd.Timestamp(f).to_pydatetime() for f in rango)
+        consulta = normalizar_texto(consulta) if consulta else ''
+        if consulta:
+            condiciones.append('(' + ' OR '.join(f'contains("{col}_N", ?)' for col in COLUMNAS_TEXTO) + ')')
+            parametros.extend([consulta] * len(COLUMNAS_TEXTO))
+        return (' WHERE ' + ' AND '.join(condiciones) if condiciones else ''), parametros
+
+    def _cubre_todo(self, rango):
+        if self._fechas is None:
+            return False
+        desde, hasta = (pd.Timestamp(f) for f in rango)
+        return desde <= self._fechas[0] and hasta >= self._fechas[1]
+
+    def _ejecutar(self, sql, parametros):
+        with self._candado:
+            return self._con.execute(sql, parametros).df()
+
+    def seleccionar(self, igualdades=None, rango=None, consulta=None):
+        """Ids de fila (ascendentes) que cumplen los filtros, o None si no filtran nada."""
+        donde, parametros = self._donde(igualdades, rango, consulta)
+        if not donde:
+            return None
+        filas = self._ejecutar(f'SELECT "{COLUMNA_FILA}" FROM accidentes{donde} ORDER BY 1', parametros)
+        return filas[COLUMNA_FILA].to_numpy()
+
+    def vista(self, igualdades=None, rango=None, consulta=None):
+        """Cubo de conteos de la selección, agregado con un GROUP BY."""
+        df = self.dataset.df
+        donde, parametros = self._donde(igualdades, rango, consulta)
+        columnas = [d for d in cubo.DIMENSIONES if d not in ('HORA_DIA', 'MES')]
+        seleccion = ', '.join(f'"{col}"' for col in columnas)
+        sql = (
+            f'SELECT {seleccion}, '
+            # Igual que en pandas: sin hora (-1) queda como -1
+            f'CASE WHEN "{COLUMNA_MINUTO}" = {SIN_HORA} THEN {SIN_HORA} ELSE "{COLUMNA_MINUTO}" // 60 END AS "HORA_DIA", '
+            f'date_trunc(\'month\', "FECHA") AS "MES", COUNT(*) AS "{cubo.COLUMNA_TOTAL}" '
+            f'FROM accidentes{donde} GROUP BY ALL'
+        )
+        resultado = self._ejecutar(sql, parametros)
+
+        # Mismos tipos que las celdas del cubo de pandas
+        celdas = resultado.astype({
+            **{col: pd.CategoricalDtype(df[col].cat.categories, ordered=df[col].cat.ordered) for col in columnas},
+            'HORA_DIA': np.int8,
+            'MES': 'datetime64[ns]',
+            cubo.COLUMNA_TOTAL: np.int64,
+        })[[*cubo.DIMENSIONES, cubo.COLUMNA_TOTAL]]
+        fechas = df['FECHA']
+        return cubo.Cubo(celdas, fechas.min() if len(df) else None, fechas.max() if len(df) else None)
+
+
+def comparar(motor_a, motor_b, casos, dimensiones=(('CLASE',), ('CLASE', 'GRAVEDAD'), ('MES',))):
+    """Diferencias entre dos motores para una lista de casos (igualdades, rango, consulta).
+
+    Devuelve una lista vacía si los dos motores seleccionan las mismas filas y
+    dan los mismos conteos en todos los casos.
+    """
+    diferencias = []
+    for caso in casos:
+        filas_a, filas_b = motor_a.seleccionar(*caso), motor_b.seleccionar(*caso)
+        if (filas_a is None) != (filas_b is None) or (
+                filas_a is not None and not np.array_equal(filas_a, filas_b)):
+            diferencias.append((caso, 'filas'))
+            continue
+        vista_a, vista_b = motor_a.vista(*caso), motor_b.vista(*caso)
+        for dims in dimensiones:
+            conteo_a = vista_a.contar(*dims).sort_values(list(dims), ignore_index=True)
+            conteo_b = vista_b.contar(*dims).sort_values(list(dims), ignore_index=True)
+            if not conteo_a.astype({cubo.COLUMNA_TOTAL: np.int64}).equals(
+                    conteo_b.astype({cubo.COLUMNA_TOTAL: np.int64})):
+                diferencias.append((caso, dims))
+    return diferencias
@@ -0,0 +1,103 @@
+"""Conteos aproximados desde una muestra estratificada, para la vista preliminar.
+
+Mientras los conteos exactos se calculan en segundo plano, los gráficos se
+dibujan con una muestra de la selección estratificada por municipio y clase
+de accidente: cada estrato se muestrea con su propia tasa (los pequeños por
+completo), así que ningún municipio ni clase desaparece de la vista previa.
+Cada conteo se estima como la suma sobre estratos de N_h·k/n_h y lleva su
+margen de error al 95 %.
+"""
+import numpy as np
+import pandas as pd
+
+from .cubo import COLUMNA_TOTAL, claves
+
+ESTRATOS = ('MUNICIPIO', 'CLASE')
+TAMANO_MUESTRA = 20_000
+# Filas mínimas por estrato (o todas si tiene menos)
+MINIMO_ESTRATO = 30
+COLUMNA_MARGEN = 'MARGEN'
+Z_95 = 1.96
+_ESTRATO = '_ESTRATO'
+
+
+def _codigos_estrato(df, estratos):
+    """Código entero del estrato de cada fila (combinación de los códigos de categoría)."""
+    codigo = np.zeros(len(df), dtype=np.int64)
+    for col in estratos:
+        serie = df[col]
+        # +1 para que los nulos (-1) sean su propio estrato
+        codigo = codigo * (len(serie.cat.categories) + 1) + (serie.cat.codes.to_numpy() + 1)
+    return codigo
+
+
+class VistaMuestra:
+    """Estimaciones de conteo con la misma interfaz ``contar`` que el cubo."""
+
+    # Los conteos son estimados: contar() añade la columna MARGEN
+    aproximada = True
+
+    def __init__(self, claves_muestra, poblacion, muestra, filas_total):
+        # Dimensiones de cada fila muestreada, con el código de su estrato
+        self.claves = claves_muestra
+        # Filas de la selección (N_h) y de la muestra (n_h) por estrato
+        self.poblacion = poblacion
+        self.muestra = muestra
+        self.filas_total = filas_total
+
+    @property
+    def filas_muestra(self):
+        return len(self.claves)
+
+    @property
+    def total(self):
+        return self.filas_total
+
+    def contar(self, *dimensiones, completo=False):
+        """Total estimado de accidentes por las dimensiones pedidas, con su margen al 95 %."""
+        dimensiones = list(dimensiones)
+        k = self.claves.groupby([_ESTRATO, *dimensiones], observed=True).size().reset_index(name='k')
+        estrato = k[_ESTRATO].to_numpy()
+        N = self.poblacion[estrato].astype(float)
+        n = self.muestra[estrato].astype(float)
+        p = k['k'].to_numpy() / n
+        # Varianza del total de un estrato con muestreo aleatorio simple y
+        # corrección por población finita (0 si el estrato está completo)
+        varianza = np.where(n > 1, N ** 2 * (1 - n / N) * p * (1 - p) / np.maximum(n - 1, 1), 0.0)
+        estimado = k[dimensiones].assign(**{COLUMNA_TOTAL: N * p, COLUMNA_MARGEN: varianza})
+        conteo = (
+            estimado.groupby(dimensiones, observed=not completo)[[COLUMNA_TOTAL, COLUMNA_MARGEN]]
+            .sum()
+            .reset_index()
+        )
+        conteo[COLUMNA_MARGEN] = np.ceil(Z_95 * np.sqrt(conteo[COLUMNA_MARGEN]))
+        conteo = conteo.round({COLUMNA_TOTAL: 0}).astype(
+            {COLUMNA_TOTAL: np.int64, COLUMNA_MARGEN: np.int64})
+        if not completo:
+            # Igual que en Cubo.contar: Plotly falla con categorías sin filas
+            for col in dimensiones:
+                if isinstance(conteo[col].dtype, pd.CategoricalDtype):
+                    conteo[col] = conteo[col].cat.remove_unused_categories()
+        return conteo
+
+
+def muestra_estratificada(df, filas=None, tamano=TAMANO_MUESTRA, estratos=ESTRATOS, semilla=0):
+    """Vista aproximada de las filas ``filas`` de ``df`` (todas si es None).
+
+    Cada fila entra con la probabilidad de su estrato (al menos
+    ``tamano``/N y al menos ``MINIMO_ESTRATO`` filas por estrato); el
+    recorrido es lineal, sin ordenar la selección.
+    """
+    estrato = _codigos_estrato(df, estratos)
+    if filas is not None:
+        estrato = estrato[filas]
+    filas_total = len(estrato)
+    poblacion = np.bincount(estrato)
+    tasas = np.minimum(1.0, np.maximum(tamano / max(filas_total, 1),
+                                       MINIMO_ESTRATO / np.maximum(poblacion, 1)))
+    elegidas = np.flatnonzero(np.random.default_rng(semilla).random(filas_total) < tasas[estrato])
+    muestra = np.bincount(estrato[elegidas], minlength=len(poblacion))
+
+    ids = elegidas if filas is None else filas[elegidas]
+    claves_muestra = claves(df.take(ids)).assign(**{_ESTRATO: estrato[elegidas]})
+    return VistaMuestra(claves_muestra, poblacion, muestra, filas_total)
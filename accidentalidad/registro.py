@@ -0,0 +1,92 @@
+"""Registro de variantes de esquema de las exportaciones del AMVA.
+
+Cada exportación escribe los encabezados a su manera (acentos rotos por la
+codificación, espacios de más, 'GRAVEDAºOSSADAºOSS', ...). Aquí se detecta la
+codificación y el separador de cada archivo, se calcula una huella de su
+encabezado y se mapea cada columna al nombre canónico.
+"""
+import hashlib
+import unicodedata
+from dataclasses import dataclass, field
+
+# Nombre canónico -> variantes conocidas (además de las que coinciden tras
+# quitar tildes, espacios y mayúsculas)
+VARIANTES = {
+    'GRAVEDAD': ['GRAVEDA\xbaOSSADA\xbaOSS', 'GRAVEDAºOSSADAºOSS'],
+    'DIRECCION': ['DIRECCIÓN', 'DIRECCI\xcaN'],
+    'DÍA DE LA SEMANA': ['D\xcdA DE LA SEMANA', 'DIA DE LA SEMANA'],
+    'DISEÑO': ['DISE\xcaO', 'DISENO'],
+    'MUNICIPIO': [],
+    'FECHA': [],
+    'HORA': [],
+    'COMUNA': [],
+    'BARRIO': [],
+    'CLASE': [],
+}
+
+BYTES_MUESTRA = 64 * 1024
+
+
+@dataclass(frozen=True)
+class EsquemaArchivo:
+    """Formato detectado de un CSV y su mapeo al esquema canónico."""
+    huella: str
+    codificacion: str
+    separador: str
+    encabezado: tuple
+    renombres: dict = field(default_factory=dict)
+
+
+def _clave(nombre):
+    """Forma comparable de un encabezado: sin tildes, sin espacios, en mayúsculas."""
+    descompuesto = unicodedata.normalize('NFKD', nombre)
+    sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ''.join(c for c in sin_tildes.upper() if c.isalnum())
+
+
+_POR_CLAVE = {}
+for _canonico, _variantes in VARIANTES.items():
+    for _nombre in [_canonico, *_variantes]:
+        _POR_CLAVE[_clave(_nombre)] = _canonico
+
+
+def mapear(columnas):
+    """Renombres {columna original (sin espacios) -> canónica} para un encabezado."""
+    columnas = [col.strip() for col in columnas]
+    renombres = {}
+    for col in columnas:
+        canonico = _POR_CLAVE.get(_clave(col))
+        if canonico and canonico != col:
+            renombres[col] = canonico
+
+    # Algunas exportaciones traen GRAVEDAD con una codificación rota distinta
+    if 'GRAVEDAD' not in renombres.values() and 'GRAVEDAD' not in columnas:
+        candidatas = [col for col in columnas if 'GRAVEDAD' in col.upper() or 'OSSADA' in col.upper()]
+        if not candidatas:
+            raise ValueError("No se pudo identificar la columna de 'GRAVEDAD'.")
+        renombres[candidatas[0]] = 'GRAVEDAD'
+    return renombres
+
+
+def _detectar_codificacion(muestra):
+    if muestra.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+    # Se descarta la última línea, que puede estar cortada a mitad de un carácter
+    try:
+        muestra[:muestra.rfind(b'\n') + 1 or len(muestra)].decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin1'
+
+
+def identificar(ruta):
+    """Detecta codificación, separador y encabezado de un CSV sin leerlo completo."""
+    with open(ruta, 'rb') as archivo:
+        muestra = archivo.read(BYTES_MUESTRA)
+    codificacion = _detectar_codificacion(muestra)
+    primera = muestra.decode(codificacion, errors='replace').splitlines()[0] if muestra else ''
+    separador = ';' if primera.count(';') >= primera.count(',') else ','
+    encabezado = tuple(primera.split(separador))
+
+    huella = hashlib.sha1('|'.join([codificacion, separador, *encabezado]).encode('utf-8')).hexdigest()[:12]
+    return EsquemaArchivo(huella, codificacion, separador, encabezado, mapear(encabezado))
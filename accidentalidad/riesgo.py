@@ -0,0 +1,224 @@
+"""Puntos críticos de accidentalidad por zona (municipio y comuna), día y hora.
+
+Sobre las celdas del cubo (no sobre las filas) se arma una matriz densa
+zona × día de la semana × hora con tres sumas por celda: accidentes, índice
+de severidad (cada accidente pesa según su gravedad, al estilo EPDO) y suma
+de pesos al cuadrado. Las tres son aditivas: un lote de celdas nuevo se
+suma con ``agregar`` sin recalcular lo anterior.
+
+Cada celda se compara con la línea base de su municipio: el perfil de día
+y hora del municipio repartido según el peso total de la zona. De ahí salen
+la razón estandarizada (observado / esperado), un z del índice ponderado y
+la probabilidad de cola Poisson del número de accidentes. Una celda es
+punto crítico si esa probabilidad pasa la corrección de Bonferroni por el
+número de celdas evaluadas.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from .busqueda import normalizar_texto
+from .cubo import COLUMNA_TOTAL
+from .esquema import ORDEN_DIAS
+
+HORAS = 24
+DIAS = len(ORDEN_DIAS)
+CELDAS_ZONA = DIAS * HORAS
+
+# Peso de un accidente según el inicio de su gravedad normalizada (las
+# exportaciones escriben "Muertos", "MUERTO", ...); el resto pesa 1
+PESOS_GRAVEDAD = {'muert': 10.0, 'herid': 5.0}
+ALFA = 0.05
+# Accidentes mínimos en una celda para poder marcarla
+MINIMO_ACCIDENTES = 5
+
+
+def peso_gravedad(gravedad):
+    """Peso de un accidente de gravedad ``gravedad`` en el índice de severidad."""
+    texto = normalizar_texto(gravedad) if isinstance(gravedad, str) else ''
+    return next((peso for prefijo, peso in PESOS_GRAVEDAD.items() if texto.startswith(prefijo)), 1.0)
+
+
+def _posicion_dia(dia):
+    orden = [normalizar_texto(d) for d in ORDEN_DIAS]
+    texto = normalizar_texto(dia)
+    return orden.index(texto) if texto in orden else -1
+
+
+def _por_categoria(serie, funcion, nulo):
+    """``funcion`` aplicada a cada categoría (una vez) y repartida a las filas."""
+    valores = np.array([funcion(c) for c in serie.cat.categories] + [nulo])
+    return valores[serie.cat.codes.to_numpy()]
+
+
+# Coeficientes de la aproximación de Chebyshev de erfc (Numerical Recipes,
+# "erfcc"): error relativo menor que 1.2e-7 en toda la recta
+_COEFICIENTES_ERFC = (-1.26551223, 1.00002368, 0.37409196, 0.09678418, -0.18628806,
+                      0.27886807, -1.13520398, 1.48851587, -0.82215223, 0.17087277)
+
+
+def _erfc(x):
+    """erfc de cada elemento de ``x``, con operaciones de arreglo de NumPy."""
+    x = np.asarray(x, dtype=float)
+    t = 1.0 / (1.0 + 0.5 * np.abs(x))
+    polinomio = np.zeros_like(t)
+    for coeficiente in reversed(_COEFICIENTES_ERFC):
+        polinomio = polinomio * t + coeficiente
+    cola = t * np.exp(-x * x + polinomio)
+    return np.where(x >= 0, cola, 2.0 - cola)
+
+
+def _normal_superior(z):
+    """P(Z >= z) de la normal estándar, vectorizada."""
+    return 0.5 * _erfc(np.asarray(z, dtype=float) / math.sqrt(2))
+
+
+def cola_poisson(k, lam):
+    """P(X >= k) para X ~ Poisson(lam), con la aproximación de Wilson-Hilferty.
+
+    Usa que P(X >= k) = P(chi2 con 2k grados <= 2·lam); es precisa incluso
+    con conteos pequeños y no necesita scipy.
+    """
+    k = np.asarray(k, dtype=float)
+    lam = np.asarray(lam, dtype=float)
+    kk = np.maximum(k, 1.0)
+    z = (np.cbrt(lam / kk) - 1 + 1 / (9 * kk)) * 3 * np.sqrt(kk)
+    return np.where(k <= 0, 1.0, 1.0 - _normal_superior(z))
+
+
+class MatrizRiesgo:
+    """Sumas por zona × día × hora y sus puntuaciones frente al municipio."""
+
+    def __init__(self):
+        # Zonas como (municipio, comuna), en el orden en que aparecieron
+        self.zonas = pd.MultiIndex.from_arrays([[], []], names=['MUNICIPIO', 'COMUNA'])
+        self.conteo = np.zeros((0, DIAS, HORAS))
+        self.indice = np.zeros((0, DIAS, HORAS))
+        self.cuadrados = np.zeros((0, DIAS, HORAS))
+
+    @classmethod
+    def desde_celdas(cls, celdas):
+        """Matriz de las celdas de un cubo (MUNICIPIO, COMUNA, GRAVEDAD, día, HORA_DIA, TOTAL)."""
+        return cls().agregar(celdas)
+
+    def agregar(self, celdas):
+        """Suma las celdas de un cubo a la matriz (las zonas nuevas se añaden al final)."""
+        celdas = celdas[celdas['HORA_DIA'] >= 0]
+        dia = _por_categoria(celdas['DÍA DE LA SEMANA'], _posicion_dia, -1)
+        # Sin hora, día, municipio o comuna la celda no se puede ubicar
+        validas = (dia >= 0) & celdas['MUNICIPIO'].notna().to_numpy() & celdas['COMUNA'].notna().to_numpy()
+        celdas, dia = celdas[validas], dia[validas]
+
+        # Las zonas se arman con los códigos de categoría: solo las
+        # combinaciones distintas pasan a etiquetas
+        municipio, comuna = celdas['MUNICIPIO'], celdas['COMUNA']
+        par = municipio.cat.codes.to_numpy(np.int64) * len(comuna.cat.categories) + comuna.cat.codes.to_numpy()
+        codigo_par, pares = pd.factorize(par)
+        zonas = pd.MultiIndex.from_arrays(
+            [municipio.cat.categories[pares // len(comuna.cat.categories)].astype(str),
+             comuna.cat.categories[pares % len(comuna.cat.categories)].astype(str)],
+            names=self.zonas.names,
+        )
+        self._ampliar(self.zonas.append(zonas).unique())
+        zona = self.zonas.get_indexer(zonas)[codigo_par]
+
+        pesos = _por_categoria(celdas['GRAVEDAD'], peso_gravedad, 1.0)
+        total = celdas[COLUMNA_TOTAL].to_numpy(dtype=float)
+        plano = (zona * DIAS + dia) * HORAS + celdas['HORA_DIA'].to_numpy()
+        tamano = len(self.zonas) * CELDAS_ZONA
+        forma = (len(self.zonas), DIAS, HORAS)
+        self.conteo += np.bincount(plano, weights=total, minlength=tamano).reshape(forma)
+        self.indice += np.bincount(plano, weights=total * pesos, minlength=tamano).reshape(forma)
+        self.cuadrados += np.bincount(plano, weights=total * pesos ** 2, minlength=tamano).reshape(forma)
+        return self
+
+    def copiar(self):
+        """Copia independiente: ``agregar`` suma sobre las matrices en su lugar."""
+        copia = MatrizRiesgo()
+        copia.zonas = self.zonas
+        copia.conteo, copia.indice, copia.cuadrados = self.conteo.copy(), self.indice.copy(), self.cuadrados.copy()
+        return copia
+
+    def _ampliar(self, zonas):
+        """Reordena las matrices a un conjunto de zonas que contiene a las actuales."""
+        if len(zonas) == len(self.zonas):
+            return
+        extra = np.zeros((len(zonas) - len(self.zonas), DIAS, HORAS))
+        self.conteo = np.concatenate([self.conteo, extra])
+        self.indice = np.concatenate([self.indice, extra])
+        self.cuadrados = np.concatenate([self.cuadrados, extra])
+        self.zonas = zonas
+
+    def _por_municipio(self, matriz):
+        """Suma de cada municipio, repetida en cada una de sus zonas."""
+        municipio, _ = pd.factorize(self.zonas.get_level_values('MUNICIPIO'))
+        sumas = np.zeros((municipio.max() + 1 if len(municipio) else 0, DIAS, HORAS))
+        np.add.at(sumas, municipio, matriz)
+        return sumas[municipio]
+
+    def puntuar(self, alfa=ALFA, minimo=MINIMO_ACCIDENTES):
+        """Una fila por celda con accidentes: observado, esperado, razón, z, p y si es punto crítico.
+
+        Ordenada de mayor a menor z.
+        """
+        def esperado(matriz):
+            # Perfil de día y hora del municipio, escalado al total de la zona
+            municipio = self._por_municipio(matriz)
+            total_municipio = municipio.sum(axis=(1, 2), keepdims=True)
+            total_zona = matriz.sum(axis=(1, 2), keepdims=True)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return np.where(total_municipio > 0, municipio * total_zona / total_municipio, 0.0)
+
+        esperado_indice = esperado(self.indice)
+        esperado_conteo = esperado(self.conteo)
+        # Varianza del índice bajo la línea base: la de un Poisson compuesto
+        # con la mezcla de gravedades de la zona
+        varianza = esperado(self.cuadrados)
+
+        zona, dia, hora = np.nonzero(self.conteo)
+        observado = self.indice[zona, dia, hora]
+        esperado_indice = esperado_indice[zona, dia, hora]
+        varianza = varianza[zona, dia, hora]
+        conteo = self.conteo[zona, dia, hora]
+        lam = esperado_conteo[zona, dia, hora]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            razon = np.where(esperado_indice > 0, observado / esperado_indice, np.nan)
+            z = np.where(varianza > 0, (observado - esperado_indice) / np.sqrt(varianza), np.nan)
+        p_valor = cola_poisson(conteo, lam)
+        # Bonferroni: se evalúan todas las celdas con accidentes
+        critico = (p_valor < alfa / max(len(conteo), 1)) & (conteo >= minimo) & (razon > 1)
+
+        return pd.DataFrame({
+            'MUNICIPIO': self.zonas.get_level_values('MUNICIPIO')[zona],
+            'COMUNA': self.zonas.get_level_values('COMUNA')[zona],
+            'DÍA DE LA SEMANA': pd.Categorical.from_codes(dia, ORDEN_DIAS, ordered=True),
+            'HORA_DIA': hora.astype(np.int8),
+            'ACCIDENTES': conteo.astype(np.int64),
+            'INDICE': observado,
+            'ESPERADO': esperado_indice,
+            'RAZON': razon,
+            'Z': z,
+            'P_VALOR': p_valor,
+            'CRITICO': critico,
+        }).sort_values('Z', ascending=False, ignore_index=True, na_position='last')
+
+
+def razon_zona(puntaje, municipio, comuna):
+    """Matriz día × hora de la razón observado / esperado de una zona (de ``puntuar``)."""
+    puntaje = puntaje[(puntaje['MUNICIPIO'] == municipio) & (puntaje['COMUNA'] == comuna)]
+    return _matriz_dia_hora(puntaje, 'RAZON')
+
+
+def criticos_por_hora(puntaje):
+    """Matriz día × hora con el número de zonas marcadas como punto crítico."""
+    return _matriz_dia_hora(puntaje[puntaje['CRITICO']].assign(N=1), 'N', 'sum', 0).astype(np.int64)
+
+
+def _matriz_dia_hora(puntaje, columna, agregacion='first', vacio=np.nan):
+    return (
+        puntaje.pivot_table(index='DÍA DE LA SEMANA', columns='HORA_DIA', values=columna,
+                            aggfunc=agregacion, observed=False)
+        .reindex(index=pd.CategoricalIndex(ORDEN_DIAS, ordered=True, categories=ORDEN_DIAS), columns=range(HORAS))
+        .fillna(vacio)
+    )
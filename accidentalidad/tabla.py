@@ -0,0 +1,49 @@
+"""Tabla de resultados paginada en el servidor.
+
+El orden y la proyección de columnas se resuelven sobre ids de fila: solo se
+materializan (y se envían al navegador) las filas de la página visible, así
+que el tamaño de cada respuesta no depende del tamaño del resultado.
+"""
+import numpy as np
+import pandas as pd
+
+COLUMNAS_TABLA = ['FECHA', 'MINUTO_DIA', 'MUNICIPIO', 'COMUNA', 'BARRIO', 'CLASE', 'GRAVEDAD', 'DIRECCION']
+
+
+def _claves(serie):
+    """Claves numéricas de ordenación de una columna (categorías en su orden fijo)."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.to_numpy('datetime64[ns]').view(np.int64)
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.to_numpy()
+    # Texto libre (DIRECCION): se factoriza en orden alfabético
+    codigos, _ = pd.factorize(serie, sort=True)
+    return codigos
+
+
+def ordenar(df, filas=None, columna=None, descendente=False):
+    """Ids de fila de la selección ordenados por ``columna`` (orden estable).
+
+    ``filas`` = None significa todas las filas; sin ``columna`` se conserva el
+    orden original.
+    """
+    ids = np.arange(len(df)) if filas is None else np.asarray(filas)
+    if columna is None:
+        return ids[::-1] if descendente else ids
+    claves = _claves(df[columna].take(ids) if filas is not None else df[columna])
+    claves = claves.astype(np.int64, copy=False) if claves.dtype.kind in 'iub' else claves
+    orden = np.argsort(-claves if descendente else claves, kind='stable')
+    return ids[orden]
+
+
+def paginas(total, tamano):
+    """Número de páginas para ``total`` filas (al menos una)."""
+    return max(1, -(-total // tamano))
+
+
+def pagina(df, ids, numero, tamano, columnas=COLUMNAS_TABLA):
+    """DataFrame con solo las filas y columnas de la página ``numero`` (desde 1)."""
+    inicio = (numero - 1) * tamano
+    return df.take(ids[inicio:inicio + tamano])[columnas]
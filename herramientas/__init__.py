@@ -0,0 +1 @@
+"""Herramientas de desarrollo: datos sintéticos y mediciones de rendimiento."""
@@ -0,0 +1,176 @@
+"""API de tareas local con la forma de la Mock API de mockapi.io.
+
+Sirve ``/api/v1/tasks`` desde memoria, con la misma paginación, orden y
+filtros por campo que mockapi.io (``page``/``limit``, ``sortBy``/``order``,
+``?isComplete=true``), para probar el cliente y la página de
+tareas sin red, con colecciones grandes y con latencia o fallos simulados.
+
+Uso::
+
+    python -m herramientas.api_tareas --tareas 50000 --latencia 0.05
+    TAREAS_API_URL=http://127.0.0.1:<puerto>/api/v1/tasks streamlit run inicio.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class ApiTareasLocal:
+    """Servidor HTTP local con la forma de la Mock API de tareas (``/api/v1/tasks``).
+
+    Guarda las tareas en memoria y responde GET (lista o por id), POST, PUT y
+    DELETE como mockapi.io, esperando ``latencia`` segundos en cada petición.
+    Con ``fallos`` (entre 0 y 1) esa fracción de las peticiones responde 503.
+    Con ``filtra=False`` ignora los filtros por campo, como un backend que
+    no sabe filtrar.
+    """
+
+    RUTA = '/api/v1/tasks'
+    # Parámetros de la lista que no son filtros por campo
+    RESERVADOS = ('page', 'limit', 'sortBy', 'order')
+
+    def __init__(self, tareas=200, latencia=0.0, semilla=0, fallos=0.0, puerto=0, filtra=True):
+        azar = random.Random(semilla)
+        hoy = date.today()
+        self.tareas = [{
+            'id': str(i + 1),
+            'createdAt': (datetime.now(timezone.utc) - timedelta(days=tareas - i)).isoformat(timespec='seconds'),
+            'taskTitle': f"Tarea {i + 1}",
+            'description': f"Descripción de la tarea {i + 1}",
+            'priority': str(azar.randint(1, 3)),
+            'isComplete': azar.choice(['true', 'false']),
+            'dueDate': (hoy + timedelta(days=azar.randint(-30, 60))).isoformat(),
+        } for i in range(tareas)]
+        self._siguiente_id = tareas + 1
+        self.latencia = latencia
+        self.fallos = fallos
+        self.filtra = filtra
+        self.puerto = puerto
+        self.peticiones = defaultdict(int)
+        self._azar = random.Random(semilla)
+        self._candado = threading.Lock()
+        self._servidor = None
+        self.url = None
+
+    def _listar(self, parametros):
+        """Tareas que cumplen los filtros, de la página pedida (todas si no se pagina)."""
+        tareas = self.tareas
+        filtros = {campo: valor for campo, valor in parametros.items() if campo not in self.RESERVADOS}
+        if filtros and self.filtra:
+            tareas = [t for t in tareas if all(str(t.get(campo)) == valor for campo, valor in filtros.items())]
+        if 'sortBy' in parametros:
+            tareas = sorted(tareas, key=lambda t: str(t.get(parametros['sortBy'], '')),
+                            reverse=parametros.get('order') == 'desc')
+        if 'page' in parametros or 'limit' in parametros:
+            limite = int(parametros.get('limit', 10))
+            inicio = (int(parametros.get('page', 1)) - 1) * limite
+            tareas = tareas[inicio:inicio + limite]
+        return tareas
+
+    def _manejador(self):
+        api = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            # Conexiones keep-alive, como las de mockapi.io (sin Nagle, que con
+            # keep-alive agrega ~40 ms a cada respuesta)
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, estado, cuerpo=None):
+                datos = json.dumps(cuerpo).encode('utf-8') if cuerpo is not None else b''
+                self.send_response(estado)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def _leer(self):
+                largo = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(largo) or b'{}')
+
+            def _atender(self, metodo):
+                time.sleep(api.latencia)
+                partes = urlsplit(self.path)
+                ruta = partes.path.rstrip('/')
+                parametros = {clave: valores[-1] for clave, valores in parse_qs(partes.query).items()}
+                cuerpo = self._leer() if metodo in ('POST', 'PUT') else None
+                if not ruta.startswith(api.RUTA):
+                    return self._responder(404, 'Not found')
+                id_tarea = ruta[len(api.RUTA) + 1:] or None
+                with api._candado:
+                    api.peticiones[metodo] += 1
+                    if api.fallos and api._azar.random() < api.fallos:
+                        api.peticiones['fallidas'] += 1
+                        return self._responder(503, 'Service Unavailable')
+                    if metodo == 'POST' and id_tarea is None:
+                        tarea = {**cuerpo, 'createdAt': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+                        tarea['id'] = str(api._siguiente_id)
+                        api._siguiente_id += 1
+                        api.tareas.append(tarea)
+                        return self._responder(201, tarea)
+                    if metodo == 'GET' and id_tarea is None:
+                        return self._responder(200, api._listar(parametros))
+                    tarea = next((t for t in api.tareas if t['id'] == id_tarea), None)
+                    if tarea is None:
+                        return self._responder(404, 'Not found')
+                    if metodo == 'PUT':
+                        tarea.update(cuerpo)
+                    elif metodo == 'DELETE':
+                        api.tareas.remove(tarea)
+                    return self._responder(200, tarea)
+
+            def do_GET(self):
+                self._atender('GET')
+
+            def do_POST(self):
+                self._atender('POST')
+
+            def do_PUT(self):
+                self._atender('PUT')
+
+            def do_DELETE(self):
+                self._atender('DELETE')
+
+        return Manejador
+
+    def __enter__(self):
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', self.puerto), self._manejador())
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._servidor.server_port}{self.RUTA}"
+        return self
+
+    def __exit__(self, *excepcion):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sirve una API de tareas local con la forma de mockapi.io.")
+    parser.add_argument('--tareas', type=int, default=200, help="tareas iniciales")
+    parser.add_argument('--latencia', type=float, default=0.0, help="segundos de espera por petición")
+    parser.add_argument('--fallos', type=float, default=0.0, help="fracción de peticiones que responden 503")
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--sin-filtros', action='store_true', help="ignorar los filtros por campo")
+    args = parser.parse_args()
+
+    with ApiTareasLocal(args.tareas, args.latencia, fallos=args.fallos, puerto=args.puerto,
+                        filtra=not args.sin_filtros) as api:
+        print(f"API de tareas en {api.url} ({args.tareas} tareas). Ctrl+C para terminar.")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""Benchmark de punta a punta del dashboard de accidentalidad.
+
+Genera (o usa) un CSV con la forma del AMVA y mide por separado cada etapa
+del camino que recorre ``pages/2_🧮Data.py``: lectura, renombrado,
+interpretación de fechas y horas, limpieza, compactación, índices, cada
+filtro, cada agregación de los gráficos y la serialización de la tabla.
+Cada etapa se repite varias veces y se guarda la mediana en un JSON, para
+comparar versiones.
+
+Uso::
+
+    python -m herramientas.benchmark --filas 100000 1000000 --salida resultados.json
+    python -m herramientas.benchmark --filas 100000 --comparar resultados_anteriores.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from accidentalidad import carga, registro, tabla
+from accidentalidad.compartido import DatasetCompartido
+from accidentalidad.esquema import compactar, minuto_del_dia
+from accidentalidad.filtros import COLUMNAS_FILTRO
+from accidentalidad.memoria import MedidorPico
+from accidentalidad.motores import crear_motor, duckdb_disponible
+
+from .generar_datos import generar
+
+# Dimensiones que pide cada gráfico de la página (id -> dimensiones)
+GRAFICOS = {
+    'clase': ('CLASE',),
+    'dias': ('DÍA DE LA SEMANA',),
+    'gravedad_clase': ('CLASE', 'GRAVEDAD'),
+    'hora': ('HORA_DIA', 'GRAVEDAD'),
+    'comunas': ('COMUNA',),
+    'diseno': ('DISEÑO',),
+    'tiempo': ('MES',),
+}
+# Una etapa es una regresión si tarda 20 % más y al menos 5 ms más (las
+# etapas de menos de un milisegundo son puro ruido)
+UMBRAL_REGRESION = 1.2
+MINIMO_REGRESION = 0.005
+
+
+def _medir(funcion, repeticiones):
+    """Mediana (y mínimo) en segundos de ``repeticiones`` llamadas; devuelve también el último resultado."""
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return {'mediana': statistics.median(tiempos), 'minimo': min(tiempos)}, resultado
+
+
+def _serializar(df):
+    """Bytes Arrow IPC de un DataFrame, como los que st.dataframe envía al navegador."""
+    sumidero = pa.BufferOutputStream()
+    tabla_arrow = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.ipc.new_stream(sumidero, tabla_arrow.schema) as escritor:
+        escritor.write_table(tabla_arrow)
+    return sumidero.getvalue().size
+
+
+def _valor_frecuente(df, columna):
+    return df[columna].value_counts().index[0]
+
+
+def medir_archivo(ruta, repeticiones=3, motores=('pandas',)):
+    """Tiempos por etapa para un CSV; devuelve un dict listo para JSON."""
+    etapas = {}
+
+    def etapa(nombre, funcion, veces=repeticiones):
+        etapas[nombre], resultado = _medir(funcion, veces)
+        return resultado
+
+    medidor = MedidorPico()
+    esquema = etapa('identificar_esquema', lambda: registro.identificar(ruta))
+    crudo = etapa('leer_csv', lambda: carga.leer_csv(ruta, esquema))
+    filas_csv = len(crudo)
+    medidor.muestrear()
+    renombrado = etapa('renombrar', lambda: carga.normalizar_columnas(crudo.copy(), esquema))
+    etapa('parsear_fecha', lambda: pd.to_datetime(renombrado['FECHA'], format='%d/%m/%Y', errors='coerce'))
+    etapa('parsear_hora', lambda: minuto_del_dia(
+        pd.to_datetime(renombrado['HORA'], format='%I:%M:%S %p', errors='coerce')))
+    limpio = etapa('limpiar', lambda: carga.limpiar(renombrado.copy()))
+    df, bytes_fila = etapa('compactar', lambda: compactar(limpio))
+    del crudo, renombrado, limpio
+    medidor.muestrear()
+
+    dataset = etapa('indice_filtros', lambda: DatasetCompartido('benchmark', df), veces=1)
+    etapa('indice_texto', lambda: dataset.busqueda, veces=1)
+    etapa('cubo', lambda: dataset.cubo, veces=1)
+    medidor.muestrear()
+
+    # Un filtro por selectbox (con su valor más frecuente), el rango de
+    # fechas del último año, la búsqueda de texto y todos combinados
+    hasta = df['FECHA'].max()
+    rango = (hasta - pd.DateOffset(years=1), hasta)
+    casos = {f"filtro_{col}": ({col: _valor_frecuente(df, col)}, None, None) for col in COLUMNAS_FILTRO}
+    casos['filtro_fechas'] = ({}, rango, None)
+    casos['filtro_texto'] = ({}, None, str(df['DIRECCION'].iloc[0]).split()[0] + ' 1')
+    casos['filtro_combinado'] = ({'MUNICIPIO': _valor_frecuente(df, 'MUNICIPIO')}, rango, None)
+
+    for nombre_motor in motores:
+        motor = etapa(f"{nombre_motor}.preparar", lambda: crear_motor(dataset, nombre_motor), veces=1)
+        for nombre, caso in casos.items():
+            etapa(f"{nombre_motor}.{nombre}", lambda: motor.seleccionar(*caso))
+        # Gráficos con el filtro combinado: primero la vista, luego cada agregación
+        vista = etapa(f"{nombre_motor}.vista_graficos", lambda: motor.vista(*casos['filtro_combinado']))
+        for id_grafico, dimensiones in GRAFICOS.items():
+            etapa(f"{nombre_motor}.grafico_{id_grafico}", lambda: vista.contar(*dimensiones))
+    medidor.muestrear()
+
+    # Tabla: una página ordenada por fecha frente a la selección completa
+    filas = dataset.indice.seleccionar(*casos['filtro_combinado'][:2])
+    ids = etapa('tabla_ordenar', lambda: tabla.ordenar(df, filas, 'FECHA', True))
+    pagina = etapa('tabla_pagina', lambda: tabla.pagina(df, ids, 1, 50))
+    completa = dataset.tomar(filas)[tabla.COLUMNAS_TABLA]
+    # Además del tiempo, el tamaño de lo que viajaría al navegador
+    etapas['tabla_serializar_pagina'] = _medir(lambda: _serializar(pagina), repeticiones)[0]
+    etapas['tabla_serializar_pagina']['bytes'] = _serializar(pagina)
+    etapas['tabla_serializar_completa'] = _medir(lambda: _serializar(completa), repeticiones)[0]
+    etapas['tabla_serializar_completa']['bytes'] = _serializar(completa)
+    medidor.muestrear()
+
+    return {
+        'archivo': str(ruta),
+        'filas_csv': filas_csv,
+        'filas_limpias': len(df),
+        'bytes_por_fila': bytes_fila,
+        'pico_rss_mb': medidor.pico_mb(),
+        'etapas': etapas,
+    }
+
+
+def _version_codigo():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(actual, anterior, umbral=UMBRAL_REGRESION):
+    """Etapas que se volvieron más lentas que ``umbral`` veces su tiempo anterior."""
+    regresiones = []
+    previos = {r['filas_solicitadas']: r for r in anterior['resultados']}
+    for resultado in actual['resultados']:
+        previo = previos.get(resultado['filas_solicitadas'])
+        if not previo:
+            continue
+        for nombre, medida in resultado['etapas'].items():
+            antes = previo['etapas'].get(nombre, {}).get('mediana')
+            ahora = medida.get('mediana')
+            if antes and ahora and ahora > antes * umbral and ahora - antes > MINIMO_REGRESION:
+                regresiones.append((resultado['filas_solicitadas'], nombre, antes, ahora))
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide cada etapa del dashboard de accidentalidad.")
+    parser.add_argument('--filas', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help="tamaños de los datasets sintéticos a generar")
+    parser.add_argument('--csv', help="usar este CSV en lugar de generar datos")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--motores', nargs='+', default=None, help="pandas y/o duckdb (por defecto, los disponibles)")
+    parser.add_argument('--salida', default=None, help="JSON de resultados (por defecto benchmark-<fecha>.json)")
+    parser.add_argument('--comparar', default=None, help="JSON de una corrida anterior para detectar regresiones")
+    args = parser.parse_args()
+
+    motores = args.motores or (['pandas', 'duckdb'] if duckdb_disponible() else ['pandas'])
+    informe = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'version': _version_codigo(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'repeticiones': args.repeticiones,
+        'motores': motores,
+        'resultados': [],
+    }
+
+    with tempfile.TemporaryDirectory() as temporal:
+        if args.csv:
+            fuentes = [(None, Path(args.csv))]
+        else:
+            fuentes = [(n, Path(temporal) / f"AMVA_{n}.csv") for n in args.filas]
+        for filas, ruta in fuentes:
+            if filas is not None:
+                inicio = time.perf_counter()
+                generar(filas, ruta)
+                print(f"Generadas {filas} filas en {time.perf_counter() - inicio:.1f} s")
+            resultado = medir_archivo(ruta, args.repeticiones, motores)
+            resultado['filas_solicitadas'] = filas if filas is not None else resultado['filas_csv']
+            informe['resultados'].append(resultado)
+            for nombre, medida in resultado['etapas'].items():
+                if 'mediana' in medida:
+                    print(f"  {resultado['filas_solicitadas']:>10} {nombre:<32} {medida['mediana'] * 1000:10.1f} ms")
+
+    salida = Path(args.salida or f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json")
+    salida.write_text(json.dumps(informe, indent=2, ensure_ascii=False, default=str), encoding='utf-8')
+    print(f"Resultados guardados en {salida}")
+
+    if args.comparar:
+        anterior = json.loads(Path(args.comparar).read_text(encoding='utf-8'))
+        regresiones = comparar(informe, anterior)
+        for filas, nombre, antes, ahora in regresiones:
+            print(f"REGRESIÓN {filas} filas, {nombre}: {antes * 1000:.1f} ms -> {ahora * 1000:.1f} ms")
+        if regresiones:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,408 @@
+"""Prueba de carga con sesiones simultáneas sobre las páginas del dashboard.
+
+Simula N usuarios a la vez con el API de pruebas de Streamlit (``AppTest``):
+cada sesión recorre un guion de interacciones (filtros, gráficos, páginas de
+la tabla, crear una tarea, pedir una respuesta a Gemini) y se mide cuánto
+tarda cada rerun. Todas las sesiones corren en hilos del mismo proceso y
+comparten las cachés (``st.cache_data``/``st.cache_resource``), igual que en
+un servidor de Streamlit.
+
+La Mock API de tareas y Gemini se reemplazan por dobles locales con una
+latencia configurable, así que la prueba no depende de la red ni gasta
+cuota. Para la página de accidentalidad se genera un CSV sintético (o se usa
+``--carpeta``, un directorio con ``data/``).
+
+El informe da, por escalón de sesiones simultáneas: percentiles de latencia
+por rerun (global y por página), reruns por segundo, errores y memoria por
+sesión (crecimiento del RSS con todas las sesiones vivas, dividido entre N).
+
+Uso::
+
+    python -m herramientas.carga_concurrente --sesiones 1 5 10 20
+    python -m herramientas.carga_concurrente --sesiones 10 --paginas data --filas 1000000 --salida carga.json
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import types
+import warnings
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from .api_tareas import ApiTareasLocal
+from .generar_datos import generar
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+PAGINAS = {
+    'data': RAIZ / 'pages' / '2_🧮Data.py',
+    'proyecto': RAIZ / 'pages' / '1_📊 Data_Proyecto.py',
+    'gemini': RAIZ / 'pages' / '3_📟ChatGemini.py',
+}
+PERCENTILES = (50, 95, 99)
+TIEMPO_MAXIMO_RERUN = 300
+
+# --- DOBLES LOCALES DE LOS SERVICIOS EXTERNOS ---
+
+
+def modulo_gemini_local(latencia=0.0):
+    """Módulo con la interfaz de ``google.genai`` que usa la página (``Client().models.generate_content``)."""
+    modulo = types.ModuleType('google.genai')
+    llamadas = defaultdict(int)
+
+    class Modelos:
+        def __init__(self, api_key):
+            self.api_key = api_key
+
+        def generate_content(self, model, contents):
+            time.sleep(latencia)
+            llamadas[model] += 1
+            return types.SimpleNamespace(
+                text=f"Respuesta simulada de {model}:\n\n```python\n# {contents[:60]!r}\nprint('hola')\n```"
+            )
+
+    class Client:
+        def __init__(self, api_key=None):
+            self.models = Modelos(api_key)
+
+    modulo.Client = Client
+    modulo.llamadas = llamadas
+    return modulo
+
+
+@contextmanager
+def gemini_local(latencia=0.0):
+    """Reemplaza ``google.genai`` por el doble local mientras dure el bloque."""
+    import google
+
+    anterior_modulo = sys.modules.get('google.genai')
+    anterior_atributo = getattr(google, 'genai', None)
+    modulo = modulo_gemini_local(latencia)
+    sys.modules['google.genai'] = modulo
+    google.genai = modulo
+    try:
+        yield modulo
+    finally:
+        if anterior_modulo is None:
+            sys.modules.pop('google.genai', None)
+        else:
+            sys.modules['google.genai'] = anterior_modulo
+        if anterior_atributo is None:
+            del google.genai
+        else:
+            google.genai = anterior_atributo
+
+
+@contextmanager
+def runtime_compartido():
+    """Un único Runtime simulado y una caché de scripts para todas las sesiones, como en un servidor.
+
+    ``AppTest`` instala un Runtime simulado al empezar cada run y lo borra al
+    terminar; con varias sesiones en paralelo, la primera que termina se lo
+    quitaría a las demás. Además compila el script en cada run con una caché
+    propia, y compilar en varios hilos a la vez falla en algunas versiones
+    de Python. Aquí se instala un Runtime para toda la prueba, se desvía la
+    asignación que hace cada run y todas las sesiones comparten la caché de
+    bytecode (como las sesiones de un servidor).
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.testing.v1.util import patch_config_options
+
+    simulado = MagicMock(spec=Runtime)
+    simulado.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    simulado.cache_storage_manager = MemoryCacheStorageManager()
+    cache_scripts = ScriptCache()
+    originales = app_test.Runtime, app_test.ScriptCache, local_script_runner.ScriptCache
+    app_test.Runtime = type('RuntimePorRun', (), {'_instance': None})
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: cache_scripts
+    Runtime._instance = simulado
+    try:
+        # Fijada para toda la prueba: cada run la parchea y restaura por su cuenta
+        with patch_config_options({'global.appTest': True}):
+            yield simulado
+    finally:
+        app_test.Runtime, app_test.ScriptCache, local_script_runner.ScriptCache = originales
+        Runtime._instance = None
+
+
+# --- GUIONES DE CADA PÁGINA ---
+
+
+class Sesion:
+    """Un usuario simulado: su ``AppTest`` y la latencia de cada rerun."""
+
+    def __init__(self, pagina, semilla):
+        from streamlit.testing.v1 import AppTest
+
+        self.pagina = pagina
+        self.azar = random.Random(semilla)
+        self.app = AppTest.from_file(str(PAGINAS[pagina]), default_timeout=TIEMPO_MAXIMO_RERUN)
+        self.pasos = []
+        self.errores = []
+        self.omitidos = 0
+
+    def paso(self, nombre, accion=None):
+        """Aplica ``accion`` sobre la app (si hay) y mide el rerun."""
+        if accion is not None:
+            try:
+                accion(self.app)
+            except (LookupError, StopIteration):
+                # El control no está en la vista actual (por ejemplo, los
+                # filtros no dejaron resultados y la página se detuvo)
+                self.omitidos += 1
+                return
+        inicio = time.perf_counter()
+        try:
+            self.app.run()
+            mensajes = [e.message for e in self.app.exception]
+        except Exception as e:  # el rerun no terminó a tiempo
+            mensajes = [str(e)]
+        self.pasos.append((self.pagina, nombre, time.perf_counter() - inicio, len(mensajes)))
+        self.errores.extend((self.pagina, nombre, mensaje) for mensaje in mensajes)
+
+    def elegir(self, opciones):
+        return self.azar.choice(list(opciones))
+
+
+def _por_etiqueta(elementos, inicio):
+    return next(e for e in elementos if e.label.startswith(inicio))
+
+
+FILTROS_DATA = ("📍 Municipio", "💥 Clase", "🏘️ Comuna")
+
+
+def guion_data(sesion):
+    """Filtros de la barra lateral, grupos de gráficos, páginas de la tabla y búsqueda."""
+    def filtrar(etiqueta):
+        def accion(app):
+            caja = _por_etiqueta(app.selectbox, etiqueta)
+            caja.set_value(sesion.elegir(caja.options[1:]))
+        return accion
+
+    def limpiar(app):
+        for etiqueta in FILTROS_DATA:
+            _por_etiqueta(app.selectbox, etiqueta).set_value("Todos")
+
+    sesion.paso('abrir')
+    for etiqueta in FILTROS_DATA[:2]:
+        sesion.paso(f"filtro {etiqueta[2:].strip()}", filtrar(etiqueta))
+    for grupo in ("Gravedad y hora", "Comunas y diseño", "Tendencia mensual"):
+        sesion.paso(f"graficos {grupo}", lambda app, g=grupo: app.radio(key='grupo_graficos').set_value(g))
+    sesion.paso('tabla orden', lambda app: app.selectbox(key='tabla_orden').set_value('FECHA'))
+    sesion.paso('tabla pagina', lambda app: next(
+        n for n in app.number_input if (n.key or '').startswith('tabla_pagina_')).increment())
+    sesion.paso('limpiar filtros', limpiar)
+    sesion.paso(f"filtro {FILTROS_DATA[2][2:].strip()}", filtrar(FILTROS_DATA[2]))
+    sesion.paso('busqueda', lambda app: app.sidebar.text_input[0].input(sesion.elegir(['CL', 'CR 4', 'Barrio 01'])))
+    sesion.paso('limpiar busqueda', lambda app: (limpiar(app), app.sidebar.text_input[0].input('')))
+
+
+def guion_proyecto(sesion):
+    """Lista de tareas, filtro por estado y una tarea nueva desde el formulario."""
+    sesion.paso('abrir')
+    for estado in ('Pendientes', 'Completadas', 'Mostrar Todo'):
+        sesion.paso(f"estado {estado}", lambda app, e=estado: _por_etiqueta(app.selectbox, "Filtrar por Estado").set_value(e))
+    sesion.paso('crear tarea', lambda app: (
+        _por_etiqueta(app.text_input, "Título de la Tarea").input(f"Carga {sesion.azar.randrange(10 ** 6)}"),
+        _por_etiqueta(app.button, "Crear Tarea").click(),
+    ))
+
+
+def guion_gemini(sesion):
+    """Clave, tarea y una solicitud (respondida por el doble local de Gemini)."""
+    sesion.paso('abrir')
+    sesion.paso('clave', lambda app: app.text_input(key='api_key_input').input('clave-de-prueba'))
+    sesion.paso('tarea', lambda app: _por_etiqueta(app.selectbox, "Selecciona la tarea").set_value(
+        sesion.elegir(["Generar código corto", "Explicar código"])))
+    sesion.paso('enviar', lambda app: (
+        app.text_area[0].input("Una función en Python que sume dos números"),
+        next(b for b in app.button if 'Enviar' in b.label).click(),
+    ))
+
+
+GUIONES = {'data': guion_data, 'proyecto': guion_proyecto, 'gemini': guion_gemini}
+
+
+# --- EJECUCIÓN Y RESUMEN ---
+
+
+def _percentiles(tiempos):
+    if not tiempos:
+        return {}
+    ms = np.asarray(tiempos) * 1000
+    return {f"p{p}_ms": round(float(np.percentile(ms, p)), 1) for p in PERCENTILES} | {
+        'max_ms': round(float(ms.max()), 1), 'reruns': len(ms)}
+
+
+def resumir(sesiones, segundos):
+    """Percentiles global, por página y por paso, más el rendimiento total."""
+    pasos = [p for s in sesiones for p in s.pasos]
+    errores = [e for s in sesiones for e in s.errores]
+    por_pagina, por_paso = defaultdict(list), defaultdict(list)
+    for pagina, paso, duracion, _ in pasos:
+        por_pagina[pagina].append(duracion)
+        por_paso[f"{pagina}: {paso}"].append(duracion)
+    return {
+        'segundos': round(segundos, 2),
+        'reruns_por_segundo': round(len(pasos) / segundos, 2) if segundos else None,
+        'errores': len(errores),
+        # Los primeros mensajes distintos, para no repetir el mismo error N veces
+        'mensajes_error': list(dict.fromkeys(f"{pagina}: {paso}: {mensaje}" for pagina, paso, mensaje in errores))[:10],
+        'pasos_omitidos': sum(s.omitidos for s in sesiones),
+        'latencia': _percentiles([p[2] for p in pasos]),
+        'por_pagina': {pagina: _percentiles(t) for pagina, t in sorted(por_pagina.items())},
+        'por_paso': {paso: _percentiles(t) for paso, t in sorted(por_paso.items())},
+    }
+
+
+def correr_escalon(n, paginas, ciclos, semilla=0):
+    """``n`` sesiones simultáneas repartidas entre ``paginas``, ``ciclos`` vueltas de su guion cada una."""
+    from accidentalidad.memoria import rss_actual
+
+    gc.collect()
+    rss_base = rss_actual()
+    pico = [rss_base or 0]
+    candado = threading.Lock()
+
+    def usuario(i):
+        sesion = Sesion(paginas[i % len(paginas)], semilla * 10_000 + i)
+        for _ in range(ciclos):
+            GUIONES[sesion.pagina](sesion)
+            with candado:
+                pico[0] = max(pico[0], rss_actual() or 0)
+        return sesion
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n, thread_name_prefix='sesion') as hilos:
+        sesiones = list(hilos.map(usuario, range(n)))
+    segundos = time.perf_counter() - inicio
+
+    # Memoria con todas las sesiones todavía vivas (su session_state y resultados)
+    rss_final = rss_actual()
+    resumen = resumir(sesiones, segundos)
+    resumen['sesiones'] = n
+    if rss_base is not None:
+        resumen['memoria'] = {
+            'rss_base_mb': round(rss_base / 2 ** 20, 1),
+            'rss_pico_mb': round(pico[0] / 2 ** 20, 1),
+            'mb_por_sesion': round((max(rss_final, pico[0]) - rss_base) / 2 ** 20 / n, 2),
+        }
+    del sesiones
+    gc.collect()
+    return resumen
+
+
+def _imprimir(resumen):
+    latencia = resumen['latencia']
+    memoria = resumen.get('memoria', {})
+    print(f"{resumen['sesiones']:>4} sesiones | {resumen['reruns_por_segundo']:7.2f} reruns/s | "
+          f"p50 {latencia.get('p50_ms', 0):8.1f} ms  p95 {latencia.get('p95_ms', 0):8.1f} ms  "
+          f"p99 {latencia.get('p99_ms', 0):8.1f} ms | {resumen['errores']} errores | "
+          f"{memoria.get('mb_por_sesion', '?')} MB/sesión")
+    if resumen['pasos_omitidos']:
+        print(f"       {resumen['pasos_omitidos']} pasos omitidos (sin el control en la vista)")
+    for mensaje in resumen['mensajes_error']:
+        print(f"       ERROR {mensaje}")
+    for pagina, valores in resumen['por_pagina'].items():
+        print(f"       {pagina:<10} p50 {valores['p50_ms']:8.1f} ms  p95 {valores['p95_ms']:8.1f} ms  "
+              f"({valores['reruns']} reruns)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga con sesiones simultáneas de Streamlit.")
+    parser.add_argument('--sesiones', type=int, nargs='+', default=[1, 5, 10],
+                        help="escalones de sesiones simultáneas")
+    parser.add_argument('--paginas', nargs='+', choices=list(PAGINAS), default=list(PAGINAS),
+                        help="páginas a simular (las sesiones se reparten en turno)")
+    parser.add_argument('--ciclos', type=int, default=2, help="vueltas del guion por sesión")
+    parser.add_argument('--filas', type=int, default=100_000, help="filas del CSV sintético de accidentalidad")
+    parser.add_argument('--carpeta', help="directorio con data/ (en lugar de generar datos)")
+    parser.add_argument('--latencia-api', type=float, default=0.1, help="segundos por petición a la API local")
+    parser.add_argument('--latencia-gemini', type=float, default=1.0, help="segundos por respuesta de Gemini")
+    parser.add_argument('--salida', default=None, help="JSON de resultados (por defecto carga-<fecha>.json)")
+    parser.add_argument('--limite-p95', type=float, default=None,
+                        help="milisegundos: termina con error si el p95 de algún escalón lo supera")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(RAIZ))
+    import rendimiento
+
+    # Sin el aviso de cada hilo sin contexto de Streamlit (las sesiones lo son
+    # hasta su primer run) ni una línea por etapa de cada rerun
+    logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').disabled = True
+    rendimiento.registro_log.setLevel(logging.WARNING)
+    warnings.simplefilter('ignore', FutureWarning)
+
+    informe = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'paginas': args.paginas,
+        'ciclos': args.ciclos,
+        'latencia_api': args.latencia_api,
+        'latencia_gemini': args.latencia_gemini,
+        'escalones': [],
+    }
+    salida = Path(args.salida or f"carga-{datetime.now():%Y%m%d-%H%M%S}.json").resolve()
+    directorio_original = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as temporal, ApiTareasLocal(latencia=args.latencia_api) as api, \
+            gemini_local(args.latencia_gemini), runtime_compartido():
+        # La página de accidentalidad lee data/ relativo al directorio actual
+        if args.carpeta:
+            os.chdir(args.carpeta)
+        else:
+            generar(args.filas, Path(temporal) / 'data' / 'AMVA_sintetico.csv')
+            informe['filas'] = args.filas
+            os.chdir(temporal)
+        os.environ['TAREAS_API_URL'] = api.url
+
+        try:
+            # Arranque en frío (snapshots, dataset, índices): una sesión por página,
+            # fuera de los escalones para que no cuente como latencia de carga
+            inicio = time.perf_counter()
+            arranque = [Sesion(pagina, 0) for pagina in args.paginas]
+            for sesion in arranque:
+                sesion.paso('abrir')
+            informe['arranque'] = resumir(arranque, time.perf_counter() - inicio)
+            print(f"Arranque en frío: {informe['arranque']['segundos']} s")
+            del arranque
+
+            for n in args.sesiones:
+                resumen = correr_escalon(n, args.paginas, args.ciclos)
+                informe['escalones'].append(resumen)
+                _imprimir(resumen)
+        finally:
+            os.chdir(directorio_original)
+        informe['peticiones_api'] = dict(api.peticiones)
+
+    # Etapas medidas por las propias páginas (ver rendimiento.py) durante toda la prueba
+    informe['etapas'] = rendimiento.agregador().resumen().to_dict('records')
+    salida.write_text(json.dumps(informe, indent=2, ensure_ascii=False, default=str), encoding='utf-8')
+    print(f"Resultados guardados en {salida}")
+
+    if args.limite_p95 is not None:
+        excedidos = [r['sesiones'] for r in informe['escalones'] if r['latencia'].get('p95_ms', 0) > args.limite_p95]
+        if excedidos:
+            print(f"El p95 supera {args.limite_p95} ms con {', '.join(map(str, excedidos))} sesiones")
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
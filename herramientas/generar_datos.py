@@ -0,0 +1,138 @@
+"""Generador de datos sintéticos con la forma de las exportaciones del AMVA.
+
+Produce un CSV como el que espera ``pages/2_🧮Data.py``: codificación
+latin1, separador ';', encabezados con los acentos rotos de la exportación
+original ('GRAVEDAºOSSADAºOSS', 'DIRECCIÊN', ...), días de la semana con
+espacios de relleno, comunas 'SIN INFORMACIÓN', horas ilegibles y algún
+campo vacío. Las distribuciones (horas pico, más choques que atropellos,
+pocos muertos) imitan las de los datos reales.
+
+Uso::
+
+    python -m herramientas.generar_datos 1000000 data/AMVA_sintetico.csv
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ENCABEZADO = [
+    'FECHA', 'HORA', 'D\xcdA DE LA SEMANA', 'MUNICIPIO ', 'COMUNA', 'BARRIO', 'CLASE',
+    'GRAVEDA\xbaOSSADA\xbaOSS', 'DIRECCI\xcaN', 'DISE\xcaO',
+]
+
+MUNICIPIOS = {
+    'MEDELLIN': 0.62, 'BELLO': 0.09, 'ITAGUI': 0.08, 'ENVIGADO': 0.07, 'SABANETA': 0.04,
+    'LA ESTRELLA': 0.03, 'COPACABANA': 0.03, 'CALDAS': 0.02, 'GIRARDOTA': 0.01, 'BARBOSA': 0.01,
+}
+COMUNAS = [
+    'POPULAR', 'SANTA CRUZ', 'MANRIQUE', 'ARANJUEZ', 'CASTILLA', 'DOCE DE OCTUBRE', 'ROBLEDO',
+    'VILLA HERMOSA', 'BUENOS AIRES', 'LA CANDELARIA', 'LAURELES ESTADIO', 'LA AMERICA',
+    'SAN JAVIER', 'EL POBLADO', 'GUAYABAL', 'BELEN',
+]
+BARRIOS_POR_COMUNA = 12
+CLASES = {
+    'Choque': 0.68, 'Atropello': 0.11, 'Caída Ocupante': 0.10, 'Volcamiento': 0.05,
+    'Otro': 0.05, 'Incendio': 0.01,
+}
+GRAVEDADES = {'Solo Daños': 0.55, 'Heridos': 0.44, 'Muertos': 0.01}
+DISENOS = {
+    'Tramo de vía': 0.55, 'Interseccion': 0.30, 'Glorieta': 0.05, 'Lote o Predio': 0.04,
+    'Paso Elevado': 0.02, 'Puente': 0.02, 'Ciclo Ruta': 0.01, 'Vía peatonal': 0.01,
+}
+DIAS = ['LUNES', 'MARTES', 'MIERCOLES', 'JUEVES', 'VIERNES', 'SABADO', 'DOMINGO']
+SIN_INFORMACION = 'SIN INFORMACI\xcaN'
+
+# Peso relativo de cada hora del día: picos en la mañana y al final de la tarde
+PESOS_HORA = np.array([
+    2, 1.5, 1, 1, 1, 2, 5, 8, 8, 6, 6, 6, 7, 7, 6, 6, 7, 8, 9, 8, 6, 5, 4, 3,
+])
+
+# Ruido de las exportaciones reales
+PROPORCION_SIN_INFORMACION = 0.03
+PROPORCION_HORA_ILEGIBLE = 0.002
+PROPORCION_VACIOS = 0.001
+
+TAMANO_BLOQUE = 500_000
+
+
+def _elegir(azar, opciones, n):
+    """Muestra ``n`` valores de un dict valor -> probabilidad (o de una lista uniforme)."""
+    if isinstance(opciones, dict):
+        valores = np.array(list(opciones), dtype=object)
+        pesos = np.array(list(opciones.values()), dtype=float)
+        return valores[azar.choice(len(valores), n, p=pesos / pesos.sum())]
+    valores = np.array(opciones, dtype=object)
+    return valores[azar.integers(0, len(valores), n)]
+
+
+def bloque(azar, n, desde, dias):
+    """DataFrame de ``n`` filas crudas (todo texto), como vienen en el CSV."""
+    fechas = pd.Timestamp(desde) + pd.to_timedelta(azar.integers(0, dias, n), unit='D')
+    horas = azar.choice(24, n, p=PESOS_HORA / PESOS_HORA.sum())
+    minutos = azar.integers(0, 60, n)
+    segundos = azar.integers(0, 60, n)
+    hora_12 = np.where(horas % 12 == 0, 12, horas % 12)
+    sufijo = np.where(horas < 12, 'AM', 'PM')
+    hora = pd.Series(hora_12).map('{:02d}'.format) + ':' + pd.Series(minutos).map('{:02d}'.format) + ':' \
+        + pd.Series(segundos).map('{:02d}'.format) + ' ' + sufijo
+    hora[azar.random(n) < PROPORCION_HORA_ILEGIBLE] = '25:61:00 XM'
+
+    municipio = _elegir(azar, MUNICIPIOS, n)
+    comuna_id = azar.integers(0, len(COMUNAS), n)
+    comuna = np.array(COMUNAS, dtype=object)[comuna_id]
+    comuna[azar.random(n) < PROPORCION_SIN_INFORMACION] = SIN_INFORMACION
+    barrio = pd.Series(comuna_id * BARRIOS_POR_COMUNA + azar.integers(0, BARRIOS_POR_COMUNA, n)).map('Barrio {:03d}'.format)
+
+    # Algunas direcciones con espacios de más, como en las exportaciones
+    direccion = 'CL ' + pd.Series(azar.integers(1, 120, n)).astype(str) + ' CR ' + pd.Series(azar.integers(1, 90, n)).astype(str)
+    direccion[azar.random(n) < 0.05] += '  '
+
+    dias_semana = np.array([f"{d:<9}" for d in DIAS], dtype=object)[fechas.dayofweek]
+    df = pd.DataFrame({
+        ENCABEZADO[0]: fechas.strftime('%d/%m/%Y'),
+        ENCABEZADO[1]: hora.to_numpy(),
+        ENCABEZADO[2]: dias_semana,
+        ENCABEZADO[3]: municipio,
+        ENCABEZADO[4]: comuna,
+        ENCABEZADO[5]: barrio.to_numpy(),
+        ENCABEZADO[6]: _elegir(azar, CLASES, n),
+        ENCABEZADO[7]: _elegir(azar, GRAVEDADES, n),
+        ENCABEZADO[8]: direccion.to_numpy(),
+        ENCABEZADO[9]: _elegir(azar, DISENOS, n),
+    })
+    # Campos vacíos sueltos en las columnas obligatorias
+    for col in (ENCABEZADO[3], ENCABEZADO[6]):
+        df.loc[azar.random(n) < PROPORCION_VACIOS, col] = None
+    return df
+
+
+def generar(filas, destino, semilla=0, desde='2014-01-01', anios=6, tamano_bloque=TAMANO_BLOQUE):
+    """Escribe ``filas`` filas sintéticas en ``destino`` por bloques y devuelve la ruta."""
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    azar = np.random.default_rng(semilla)
+    dias = int(anios * 365.25)
+    with open(destino, 'w', encoding='latin1', newline='') as archivo:
+        # Con filas=0 se escribe solo el encabezado
+        for inicio in range(0, max(filas, 1), tamano_bloque):
+            n = min(tamano_bloque, filas - inicio)
+            bloque(azar, n, desde, dias).to_csv(archivo, sep=';', index=False, header=inicio == 0)
+    return destino
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un CSV sintético con la forma del AMVA.")
+    parser.add_argument('filas', type=int, help="número de filas (por ejemplo 10000 a 10000000)")
+    parser.add_argument('destino', help="ruta del CSV a escribir")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--desde', default='2014-01-01', help="primera fecha posible")
+    parser.add_argument('--anios', type=float, default=6, help="años cubiertos por las fechas")
+    args = parser.parse_args()
+    ruta = generar(args.filas, args.destino, args.semilla, args.desde, args.anios)
+    print(f"{args.filas} filas escritas en {ruta}")
+
+
+if __name__ == '__main__':
+    main()
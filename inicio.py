@@ -3,6 +3,8 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 
+import rendimiento
+
 # 1. Configuración de la página
 st.set_page_config(
     page_title="Análisis de Accidentes en Medellín",
@@ -10,6 +12,8 @@ st.set_page_config(
     layout="wide"
 )
 
+medicion = rendimiento.iniciar("Inicio")
+
 # 2. Título principal
 st.title("🎓 Proyecto Integrador - Análisis Detallado de Accidentes Viales en el Área Metropolitana")
 
@@ -64,4 +68,6 @@ st.markdown("""
 st.markdown(""" """)
 st.markdown('<p style="text-align: center; font-size: 0.8rem; color: #aaa;">✅ Proyecto de Análisis de Datos para la Seguridad Vial ❤️</p>', unsafe_allow_html=True)
 
-st.markdown("---") # Separador final
\ No newline at end of file
+st.markdown("---") # Separador final
+
+medicion.panel()
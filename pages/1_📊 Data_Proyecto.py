@@ -1,36 +1,73 @@
+import os
+from datetime import date, timedelta
+
 import streamlit as st
 import requests
 import pandas as pd
 import altair as alt
 
+import rendimiento
+from tareas import AlmacenTareas, ClienteTareas, importacion
+from tareas.almacen import PENDIENTE
+from tareas.filtros import CAMPOS_VISTA, FiltroTareas
+
 # =================================================================
 # 1. CONFIGURACIÓN
 # =================================================================
 
-# URL de tu Mock API de Tareas (¡Esta URL debe ser la tuya!)
-API_URL = "https://690b668e6ad3beba00f4c783.mockapi.io/api/v1/tasks"
+# URL de tu Mock API de Tareas (¡Esta URL debe ser la tuya!). La variable de
+# entorno TAREAS_API_URL permite apuntar a otra (por ejemplo, la API local de
+# herramientas/carga_concurrente.py)
+API_URL = os.environ.get("TAREAS_API_URL", "https://690b668e6ad3beba00f4c783.mockapi.io/api/v1/tasks")
+
+# Opciones de los filtros y su valor en la API ('isComplete' y 'priority' son strings)
+STATUS_OPTIONS = {'Mostrar Todo': None, 'Pendientes': 'false', 'Completadas': 'true'}
+PRIORITY_OPTIONS = {'Todas': None, '1 (Alta)': '1', '2 (Media)': '2', '3 (Baja)': '3'}
+# Ventana de fecha límite en días desde hoy (None = sin límite)
+DUE_OPTIONS = {
+    'Cualquier fecha': (None, None),
+    'Vencidas': (None, -1),
+    'Próximos 7 días': (0, 7),
+    'Próximos 30 días': (0, 30),
+}
 
 # =================================================================
 # 2. FUNCIONES DE INTERACCIÓN CON LA API
 # =================================================================
 
-@st.cache_data(ttl=60) # Carga los datos y los guarda en caché por 60 segundos
-def get_tasks():
-    """Realiza la solicitud GET a la API y devuelve los datos."""
+# Un solo cliente y una sola copia de las tareas por proceso: todas las
+# sesiones comparten las conexiones keep-alive y la lista ya descargada
+@st.cache_resource
+def get_store(url):
+    """Copia local de las tareas, con escrituras optimistas sobre la API."""
+    return AlmacenTareas(ClienteTareas(url))
+
+def build_filter():
+    """Filtro elegido en los selectores (se leen antes de dibujarlos, para pedir solo esas tareas)."""
+    def day(offset):
+        return None if offset is None else (date.today() + timedelta(days=offset)).isoformat()
+
+    due_from, due_to = DUE_OPTIONS[st.session_state.get('due_filter', 'Cualquier fecha')]
+    return FiltroTareas(
+        completa=STATUS_OPTIONS[st.session_state.get('status_filter', 'Mostrar Todo')],
+        prioridad=PRIORITY_OPTIONS[st.session_state.get('priority_filter', 'Todas')],
+        vence_desde=day(due_from),
+        vence_hasta=day(due_to),
+    )
+
+def get_tasks(task_filter):
+    """Tareas que cumplen el filtro: la API filtra estado y prioridad, la fecha se filtra aquí."""
     try:
-        response = requests.get(API_URL)
-        if response.status_code == 200:
-            data = response.json()
-            return data
-        else:
-            st.error(f"Error al obtener los datos. Código de estado: {response.status_code}")
-            return None
+        return get_store(API_URL).consultar(task_filter)
+    except requests.exceptions.HTTPError as e:
+        st.error(f"Error al obtener los datos. Código de estado: {e.response.status_code}")
+        return None
     except requests.exceptions.RequestException as e:
         st.error(f"Error de conexión: {e}")
         return None
 
 def post_task(title, description, priority, complete, due_date):
-    """Realiza la solicitud POST a la API para crear una nueva tarea."""
+    """Agrega la tarea a la copia local y la envía a la API (POST) en segundo plano."""
 
     # Prepara el cuerpo (payload) de la solicitud
     new_task = {
@@ -41,28 +78,86 @@ def post_task(title, description, priority, complete, due_date):
         "dueDate": due_date
     }
 
-    # Envía la solicitud POST
-    response = requests.post(API_URL, json=new_task)
+    # La tarea aparece al instante; la respuesta de la API se revisa en los
+    # siguientes reruns de esta sesión (ver show_write_results)
+    future = get_store(API_URL).crear(new_task)
+    st.session_state.setdefault('task_writes', []).append((f"agregar '{title}'", future))
 
-    if response.status_code == 201: # 201 = Created (Creado)
-        st.success("✅ Tarea agregada exitosamente. Recargando datos...")
-    else:
-        st.error(f"❌ Error al agregar tarea. Código de estado: {response.status_code}")
-        st.json(response.json()) # Muestra el error de la API si lo hay
+def reload_tasks():
+    """Vuelve a pedir la lista completa a la API (por ejemplo, si se borraron tareas desde otro lado)."""
+    try:
+        get_store(API_URL).recargar()
+    except requests.exceptions.RequestException as e:
+        st.error(f"Error al recargar las tareas: {e}")
+
+def show_write_results():
+    """Resultado de las escrituras de esta sesión que la API ya respondió."""
+    waiting = []
+    for label, future in st.session_state.get('task_writes', []):
+        if not future.done():
+            waiting.append((label, future))
+            continue
+        error = future.exception()
+        if error is None:
+            st.sidebar.success(f"✅ Guardado en la API: {label}.")
+        elif isinstance(error, requests.exceptions.HTTPError):
+            st.sidebar.error(f"❌ Error al {label}. Código de estado: {error.response.status_code}")
+            st.sidebar.code(error.response.text) # Muestra el error de la API si lo hay
+        else:
+            st.sidebar.error(f"❌ Error de conexión al {label}: {error}")
+    st.session_state['task_writes'] = waiting
+    if waiting:
+        st.sidebar.caption(f"⏳ {len(waiting)} cambio(s) enviándose a la API...")
+
+def import_tasks(valid_rows):
+    """Crea en la API las tareas válidas de un archivo, mostrando el avance."""
+    store = get_store(API_URL)
+    progress = st.sidebar.progress(0.0, text="Importando tareas...")
+
+    def advance(done, total):
+        progress.progress(done / total, text=f"Importando tareas... {done}/{total}")
+
+    result = importacion.importar(store.cliente, valid_rows, progreso=advance)
+    # Las creadas pasan a la copia local sin volver a pedir la lista; la
+    # próxima lectura igual pide los cambios, por si alguna de las que
+    # fallaron con resultado desconocido sí se creó en la API
+    store.registrar(result.creadas)
+    store.invalidar()
+    st.session_state['last_import'] = result
+
+def show_import_result():
+    """Resumen de la última importación de esta sesión y las filas que fallaron."""
+    result = st.session_state.get('last_import')
+    if result is None:
+        return
+    st.sidebar.success(f"✅ {len(result.creadas)} tarea(s) importada(s) en {result.segundos:.1f} s.")
+    if result.fallidas:
+        report = result.informe()
+        st.sidebar.error(f"❌ {len(report)} tarea(s) no se pudieron crear.")
+        if result.inciertas:
+            st.sidebar.warning(f"{len(result.inciertas)} de ellas pudieron haberse creado igual (la API no "
+                               "respondió o respondió 5xx): revisa la lista antes de volver a importarlas.")
+        st.sidebar.dataframe(report[['fila', 'taskTitle', 'error']], hide_index=True)
+        st.sidebar.download_button("Descargar las fallidas (CSV)", report.to_csv(index=False),
+                                   file_name="tareas_fallidas.csv", mime="text/csv")
 
 # =================================================================
 # 3. INTERFAZ Y LÓGICA DE STREAMLIT
 # =================================================================
 
+medicion = rendimiento.iniciar("Data_Proyecto")
+
 # Título y encabezado
 st.title("✅ Mi Aplicación de Tareas (Mock API)")
 st.caption("Datos obtenidos y gestionados desde una API simulada en mockapi.io")
 
-# Obtener los datos
-tasks_data = get_tasks()
+# Obtener los datos (solo las tareas del filtro y solo las columnas de la vista)
+tasks_data = get_tasks(build_filter())
+show_write_results()
+medicion.marcar("api")
 
-if tasks_data:
-    df = pd.DataFrame(tasks_data)
+if tasks_data is not None:
+    df = pd.DataFrame(tasks_data, columns=[*CAMPOS_VISTA, PENDIENTE])
 
     # Aseguramos que la columna 'priority' sea numérica para la gráfica
     df['priority'] = pd.to_numeric(df['priority'], errors='coerce')
@@ -88,43 +183,65 @@ if tasks_data:
                 due_date_str = date_obj.strftime("%Y-%m-%d")
                 # Inicialmente siempre es 'false' (pendiente)
                 post_task(title, description, str(priority_num), 'false', due_date_str)
-                # Forzar la recarga de la aplicación para ver el cambio
-                st.cache_data.clear() # Limpia la caché para obtener los datos nuevos
+                # La tarea ya está en la copia local: basta con volver a dibujar
                 st.rerun()
             else:
                 st.warning("El título de la tarea no puede estar vacío.")
 
+    # --- BARRA LATERAL (Importación masiva, POST) ---
+    st.sidebar.header("📥 Importar Tareas")
+    st.sidebar.caption("CSV o JSON con las columnas taskTitle, description, priority, isComplete y dueDate.")
+
+    uploaded = st.sidebar.file_uploader("Archivo de tareas", type=['csv', 'json'])
+    if uploaded is not None:
+        try:
+            rows = importacion.leer_archivo(uploaded.name, uploaded.getvalue())
+        except ValueError as e:
+            st.sidebar.error(f"No se pudo leer el archivo: {e}")
+            rows = []
+        valid_rows, invalid_rows = importacion.validar(rows)
+        if invalid_rows:
+            st.sidebar.warning(f"{len(invalid_rows)} fila(s) no son válidas y no se importarán.")
+            st.sidebar.dataframe(pd.DataFrame(invalid_rows, columns=['fila', 'motivo']), hide_index=True)
+        if valid_rows and st.sidebar.button(f"Importar {len(valid_rows)} tarea(s)"):
+            import_tasks(valid_rows)
+            st.rerun()
+    show_import_result()
+
     # --- CUERPO PRINCIPAL (Filtros y Datos) ---
 
     st.header(f"Total de Tareas Cargadas: {len(df)}")
+    last_sync = get_store(API_URL).ultima
+    if last_sync:
+        kind = {'completa': "lista completa", 'cambios': "solo cambios", 'filtrada': "solo las del filtro"}[last_sync['tipo']]
+        st.caption(f"Última sincronización con la API ({kind}): {last_sync['tareas']} tarea(s) "
+                   f"recibida(s) en {last_sync['segundos'] * 1000:.0f} ms.")
+    st.button("🔄 Recargar tareas", on_click=reload_tasks)
+    pending = int(df[PENDIENTE].eq(True).sum()) if PENDIENTE in df else 0
+    if pending:
+        st.caption(f"⏳ {pending} tarea(s) con cambios aún sin confirmar por la API.")
 
     # 1. Filtro Interactivo
     st.subheader("🔎 Filtrar Tareas")
 
-    completion_filter = st.selectbox(
-        "Filtrar por Estado:",
-        options=['Mostrar Todo', 'Pendientes', 'Completadas'],
-        index=0
-    )
-
-    df_filtered = df.copy()
-
-    if completion_filter == 'Pendientes':
-        df_filtered = df_filtered[df_filtered['isComplete'] == 'false']
-    elif completion_filter == 'Completadas':
-        df_filtered = df_filtered[df_filtered['isComplete'] == 'true']
+    # Los valores se leen al principio (build_filter): las tareas ya llegan filtradas
+    status_col, priority_col, due_col = st.columns(3)
+    status_col.selectbox("Filtrar por Estado:", options=list(STATUS_OPTIONS), key='status_filter')
+    priority_col.selectbox("Filtrar por Prioridad:", options=list(PRIORITY_OPTIONS), key='priority_filter')
+    due_col.selectbox("Fecha Límite:", options=list(DUE_OPTIONS), key='due_filter')
 
     # 2. Mostrar la tabla filtrada
     st.dataframe(
-        df_filtered,
+        df,
         use_container_width=True,
-        column_order=['id', 'taskTitle', 'description', 'priority', 'isComplete', 'dueDate']
+        column_order=CAMPOS_VISTA
     )
+    medicion.marcar("tabla")
 
     # 3. Gráfica de Resumen
     st.header("📊 Resumen de Tareas por Prioridad")
 
-    # Contar tareas por prioridad
+    # Contar tareas por prioridad (de las que cumplen el filtro)
     priority_counts = df['priority'].value_counts().reset_index()
     priority_counts.columns = ['Prioridad', 'Número de Tareas']
 
@@ -139,10 +256,13 @@ if tasks_data:
     ).interactive() # Permite hacer zoom y pan
 
     st.altair_chart(chart, use_container_width=True)
+    medicion.marcar("grafico")
 
 else:
     st.warning("No se pudieron cargar las tareas. Verifica la URL de la API o la conexión.")
 
+medicion.panel()
+
 
 
 
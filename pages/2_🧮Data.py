@@ -1,156 +1,343 @@
+import functools
+from concurrent.futures import TimeoutError as TiempoAgotado
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import rendimiento
+from accidentalidad import coleccion, cubo, exportacion, muestreo, riesgo, tabla
+from accidentalidad.actualizacion import Actualizador
+from accidentalidad.busqueda import normalizar_texto
+from accidentalidad.carga import DIRECTORIO_CACHE
+from accidentalidad.compartido import DatasetCompartido, RegistroSesiones
+from accidentalidad.diferidos import CalculosDiferidos
+from accidentalidad.esquema import hora_texto
+from accidentalidad.figuras import CacheFiguras, clave_filtros
+from accidentalidad.motores import crear_motor, motor_configurado
+
+# El dataset es compartido entre sesiones: con copy-on-write ninguna operación
+# de la página puede modificarlo por accidente a través de una vista
+pd.set_option('mode.copy_on_write', True)
+
 st.set_page_config(
     page_icon="🚨",
     layout="wide"
 )
 
+medicion = rendimiento.iniciar("Data")
+
 # --- CONFIGURACIÓN Y CARGA DE DATOS ---
 
-# Cargar datos con el delimitador y la codificación correctos
-archivo_csv = 'data/AMVA_Accidentalidad_20191022_2.csv' 
+# Todos los CSV de esta carpeta (una o varias exportaciones del AMVA) se unen
+carpeta_datos = 'data'
+
+# En modo por bloques (CSV muy grande) solo se cargan los meses elegidos;
+# por defecto, los últimos MESES_VENTANA meses
+MESES_VENTANA = 12
+
+# Filas por página de la tabla: solo la página visible viaja al navegador
+TAMANOS_PAGINA = [25, 50, 100, 250]
+# Exportaciones más grandes no se ofrecen para descargar: el servidor tendría
+# que tener el archivo entero en memoria mientras el botón está a la vista
+MAXIMO_DESCARGA_MB = 200
+
+# Segundos que se esperan los conteos exactos antes de dibujar la vista
+# preliminar desde una muestra estratificada (los exactos llegan después)
+PRESUPUESTO_EXACTO = 0.3
+
+# Una sola vez por proceso: construye la primera versión y deja un hilo
+# vigilando data/; las versiones siguientes se construyen en segundo plano
+@st.cache_resource(show_spinner="Cargando datos de accidentalidad...")
+def obtener_actualizador(carpeta):
+    """Versión vigente de la colección, recargada en segundo plano cuando cambian los CSV."""
+    actualizador = Actualizador(carpeta)
+    actualizador.cargar()
+    return actualizador.iniciar()
+
+# cache_resource (y no cache_data) para que todas las sesiones usen el mismo
+# objeto en memoria: cache_data devolvería una copia del DataFrame a cada una
+@st.cache_resource(show_spinner="Cargando datos de accidentalidad...", max_entries=4)
+def obtener_dataset(version, rutas, huellas, desde, hasta):
+    """Dataset de solo lectura con las particiones (año/mes) de un rango de fechas.
+
+    Solo para el modo por bloques: la colección completa ya viene en la versión.
+    Los conteos de los meses completos salen del cubo de la colección.
+    """
+    df_ventana = coleccion.leer_coleccion(rutas, huellas, desde=desde, hasta=hasta)
+    conteos = coleccion.cubo_ventana(coleccion.cubo_coleccion(rutas, huellas), df_ventana, desde, hasta)
+    return DatasetCompartido(version, df_ventana, conteos=conteos)
+
+@st.cache_resource(show_spinner="Preparando el motor de consultas...", max_entries=4)
+def obtener_motor(version, _dataset, nombre):
+    """Motor de filtros y conteos (pandas o DuckDB, según ACCIDENTALIDAD_MOTOR)."""
+    return crear_motor(_dataset, nombre)
+
+@st.cache_resource
+def obtener_registro():
+    """Registro de memoria por sesión, común a todo el proceso."""
+    return RegistroSesiones()
+
+@st.cache_resource
+def obtener_calculos():
+    """Pool de cálculos en segundo plano, común a todas las sesiones del proceso."""
+    return CalculosDiferidos()
+
+@st.cache_resource
+def obtener_figuras():
+    """Caché LRU de figuras Plotly, común a todas las sesiones del proceso."""
+    return CacheFiguras(capacidad=256)
+
 try:
-    # Usamos punto y coma como separador y codificación para manejar la 'Ñ' y los acentos
-    df = pd.read_csv(archivo_csv, sep=';', encoding='latin1')
+    # Las huellas de contenido identifican la versión de cada CSV: si alguno
+    # cambia, solo se reconstruye su snapshot
+    actualizador = obtener_actualizador(carpeta_datos)
 except FileNotFoundError:
-    st.error(f"Error: El archivo CSV no se encontró en la ruta '{archivo_csv}'.")
+    st.error(f"Error: No se encontraron archivos CSV en la carpeta '{carpeta_datos}'.")
+    st.stop()
+except ValueError as e:
+    st.error(f"Error Crítico: {e}")
     st.stop()
 
-# --- Limpieza y preparación de datos (CORRECCIONES CLAVE DE KEYERROR) ---
-
-# 1. Limpiar los nombres de columna: Eliminar espacios y caracteres no ASCII
-df.columns = [col.strip() for col in df.columns]
-
-# 2. Renombrar explícitamente las columnas problemáticas
-df.rename(columns={
-    # Correcciones de GRAVEDAD (soluciona KeyError)
-    'GRAVEDA\xbaOSSADA\xbaOSS': 'GRAVEDAD', 
-    'GRAVEDAºOSSADAºOSS': 'GRAVEDAD', 
-    
-    # Correcciones de DIRECCIÓN (soluciona KeyError)
-    'DIRECCIÓN': 'DIRECCION', 
-    'DIRECCI\xcaN': 'DIRECCION', 
-    'DIRECCION ': 'DIRECCION',
-    
-    # Correcciones de DÍA DE LA SEMANA
-    'D\xcdA DE LA SEMANA': 'DÍA DE LA SEMANA', 
-    'D\xcdA DE LA SEMANA ': 'DÍA DE LA SEMANA',
-    'DIA DE LA SEMANA': 'DÍA DE LA SEMANA',
-    
-    # Correcciones de DISEÑO y MUNICIPIO
-    'DISE\xcaO': 'DISEÑO',
-    'MUNICIPIO ': 'MUNICIPIO'
-    
-}, errors='ignore', inplace=True) 
-
-# Verificación de la columna 'GRAVEDAD' después del renombrado (Seguridad extra)
-if 'GRAVEDAD' not in df.columns:
-    gravedad_col_candidates = [col for col in df.columns if 'GRAVEDAD' in col.upper() or 'OSSADA' in col.upper()]
-    if gravedad_col_candidates:
-        df.rename(columns={gravedad_col_candidates[0]: 'GRAVEDAD'}, inplace=True)
-    else:
-        st.error("Error Crítico: No se pudo identificar la columna de 'GRAVEDAD'.")
-        st.stop()
-    
-# Convertir FECHA y HORA
-df['FECHA'] = pd.to_datetime(df['FECHA'], format='%d/%m/%Y', errors='coerce')
-# Asumiendo que HORA está en formato "hh:mm:ss AM/PM"
-df['HORA_ACCIDENTE'] = pd.to_datetime(df['HORA'], format='%I:%M:%S %p', errors='coerce').dt.time
-df['HORA_DIA'] = pd.to_datetime(df['HORA'], format='%I:%M:%S %p', errors='coerce').dt.hour 
-
-# Eliminar filas con valores nulos o 'SIN INFORMACIÓN' en columnas clave
-df = df.dropna(subset=['FECHA', 'MUNICIPIO', 'COMUNA', 'CLASE', 'GRAVEDAD'])
-df = df[df['COMUNA'] != 'SIN INFORMACI\xcaN'] 
+# Cada sesión sigue con la versión con la que empezó (mientras se conserve);
+# la nueva se publica en segundo plano y se adopta con el botón
+vigente = actualizador.vigente()
+version_datos = actualizador.obtener(st.session_state.get('version_datos')) or vigente
+st.session_state['version_datos'] = version_datos.huella
+if version_datos is not vigente:
+    st.sidebar.info(f"Hay datos nuevos ({len(vigente.rutas)} archivo(s), {vigente.meta['filas']} filas).")
+    if st.sidebar.button("🔄 Usar los datos nuevos"):
+        st.session_state['version_datos'] = vigente.huella
+        st.rerun()
+if actualizador.error:
+    st.sidebar.warning(f"No se pudieron cargar los cambios de '{carpeta_datos}': {actualizador.error}")
+
+huella, rutas, huellas, meta = version_datos.huella, version_datos.rutas, version_datos.huellas, version_datos.meta
+
+medicion.marcar("snapshots")
+
+por_particiones = meta['modo'] == 'bloques'
 
 # --- SIDEBAR: FILTROS ---
 
 st.sidebar.title("🔧 Configuración del Dashboard")
 st.sidebar.header("🎯 Filtros de Accidentes")
 
+# Los selectbox se dibujan aquí, pero sus opciones dependen de los datos
+# cargados, que a su vez dependen del rango de fechas
+zona_selectbox = st.sidebar.container()
+
+# Filtro por Rango de Fechas (los límites salen del snapshot, sin leer filas)
+min_fecha = pd.Timestamp(meta['fecha_min']).date() if meta.get('fecha_min') else None
+max_fecha = pd.Timestamp(meta['fecha_max']).date() if meta.get('fecha_max') else None
+
+if min_fecha and max_fecha:
+    inicio_defecto = min_fecha
+    if por_particiones:
+        inicio_defecto = max(min_fecha, (pd.Timestamp(max_fecha) - pd.DateOffset(months=MESES_VENTANA)).date())
+    fecha_rango = st.sidebar.date_input(
+        "📅 Rango de Fechas:",
+        value=[inicio_defecto, max_fecha],
+        min_value=min_fecha,
+        max_value=max_fecha
+    )
+else:
+    st.warning("No hay datos de fecha válidos para filtrar.")
+    st.stop()
+
+# Con datasets grandes solo se leen y decodifican las particiones del rango;
+# los índices se construyen sobre esa ventana
+if por_particiones and len(fecha_rango) == 2:
+    dataset = obtener_dataset(f"{huella}:{fecha_rango[0]}:{fecha_rango[1]}", rutas, huellas,
+                              fecha_rango[0], fecha_rango[1])
+elif por_particiones:
+    # Rango a medio elegir: la ventana por defecto
+    dataset = obtener_dataset(f"{huella}:{inicio_defecto}:{max_fecha}", rutas, huellas, inicio_defecto, max_fecha)
+else:
+    dataset = version_datos.dataset
+
+# Vistas de solo lectura: ninguna sesión modifica df ni sus índices
+df = dataset.df
+medicion.marcar("dataset")
+indice = dataset.indice
+
+def opciones(columna):
+    """Valores de una columna categórica en el orden de sus categorías."""
+    return ["Todos"] + indice.valores(columna)
+
 # Filtro por municipio
-municipio_seleccionado = st.sidebar.selectbox(
+municipio_seleccionado = zona_selectbox.selectbox(
     "📍 Municipio:",
-    ["Todos"] + sorted(df["MUNICIPIO"].unique())
+    opciones("MUNICIPIO")
 )
 
 # Filtro por clase de accidente
-clase = st.sidebar.selectbox(
+clase = zona_selectbox.selectbox(
     "💥 Clase de Accidente:",
-    ["Todos"] + sorted(df["CLASE"].unique())
+    opciones("CLASE")
 )
 
 # Filtro por gravedad
-gravedad = st.sidebar.selectbox(
+gravedad = zona_selectbox.selectbox(
     "💔 Gravedad (Estado de las personas):",
-    ["Todos"] + sorted(df["GRAVEDAD"].unique())
+    opciones("GRAVEDAD")
 )
 
 # Filtro por día de la semana
-dia_semana = st.sidebar.selectbox(
+dia_semana = zona_selectbox.selectbox(
     "🗓️ Día de la Semana:",
-    ["Todos"] + sorted(df["DÍA DE LA SEMANA"].str.strip().unique())
+    opciones("DÍA DE LA SEMANA")
 )
 
 # Filtro por Comuna
-comuna = st.sidebar.selectbox(
+comuna = zona_selectbox.selectbox(
     "🏘️ Comuna:",
-    ["Todos"] + sorted(df["COMUNA"].unique())
+    opciones("COMUNA")
 )
 
-# Filtro por Rango de Fechas
-min_fecha = df['FECHA'].min().date() if not df['FECHA'].empty else None
-max_fecha = df['FECHA'].max().date() if not df['FECHA'].empty else None
-
-if min_fecha and max_fecha:
-    fecha_rango = st.sidebar.date_input(
-        "📅 Rango de Fechas:",
-        value=[min_fecha, max_fecha],
-        min_value=min_fecha,
-        max_value=max_fecha
-    )
-else:
-    st.warning("No hay datos de fecha válidos para filtrar.")
-    st.stop()
+# Memoria por fila antes y después de la compactación, y pico de la ingesta
+panel_memoria = st.sidebar.expander("📦 Memoria del dataset")
+if meta.get('bytes_por_fila'):
+    bytes_fila = meta['bytes_por_fila']
+    panel_memoria.caption(f"{bytes_fila['antes']:.0f} → {bytes_fila['despues']:.0f} bytes por fila")
+    if meta.get('pico_rss_mb'):
+        panel_memoria.caption(f"Ingesta ({meta['modo']}): pico de {meta['pico_rss_mb']:.0f} MB de RSS")
 
 # --- APLICAR FILTROS ---
 
-df_filtrado = df.copy()
-
 # Filtro de texto (opcional)
 direccion = st.sidebar.text_input("🔍 Buscar por Dirección/Barrio:")
 if direccion:
-    # Usa 'DIRECCION' (sin acento) aquí
-    df_filtrado = df_filtrado[
-        df_filtrado["DIRECCION"].str.contains(direccion, case=False, na=False) |
-        df_filtrado["BARRIO"].str.contains(direccion, case=False, na=False)
-    ]
-
-# Filtros Selectbox
-if municipio_seleccionado != "Todos":
-    df_filtrado = df_filtrado[df_filtrado["MUNICIPIO"] == municipio_seleccionado]
-
-if clase != "Todos":
-    df_filtrado = df_filtrado[df_filtrado["CLASE"] == clase]
-
-if gravedad != "Todos":
-    df_filtrado = df_filtrado[df_filtrado["GRAVEDAD"] == gravedad]
-
-if dia_semana != "Todos":
-    df_filtrado = df_filtrado[df_filtrado["DÍA DE LA SEMANA"].str.strip() == dia_semana]
-
-if comuna != "Todos":
-    df_filtrado = df_filtrado[df_filtrado["COMUNA"] == comuna]
+    # Búsqueda sin distinguir mayúsculas ni tildes sobre 'DIRECCION' y 'BARRIO';
+    # la resuelve el motor, el índice de trigramas da las sugerencias
+    sugerencias = dataset.busqueda.sugerencias(direccion, limite=5)
+    if sugerencias:
+        st.sidebar.caption("Sugerencias: " + " · ".join(sugerencias))
+
+# Filtros Selectbox: cada uno se resuelve con el índice, sin copiar el DataFrame
+seleccion = {
+    "MUNICIPIO": municipio_seleccionado,
+    "CLASE": clase,
+    "GRAVEDAD": gravedad,
+    "DÍA DE LA SEMANA": dia_semana,
+    "COMUNA": comuna,
+}
+igualdades = {col: valor for col, valor in seleccion.items() if valor != "Todos"}
 
 # Filtro de Fechas
+rango = None
 if fecha_rango and len(fecha_rango) == 2:
-    start_date = pd.to_datetime(fecha_rango[0])
-    end_date = pd.to_datetime(fecha_rango[1])
-    df_filtrado = df_filtrado[
-        (df_filtrado['FECHA'] >= start_date) & (df_filtrado['FECHA'] <= end_date)
-    ]
+    rango = (pd.to_datetime(fecha_rango[0]), pd.to_datetime(fecha_rango[1]))
+
+# Filtros y conteos los resuelve el motor configurado; los dos dan los mismos
+# resultados (ver tests/test_motores.py)
+try:
+    nombre_motor = motor_configurado()
+except ValueError as e:
+    st.error(f"Error Crítico: {e}")
+    st.stop()
+motor = obtener_motor(dataset.version, dataset, nombre_motor)
+if motor.nombre != nombre_motor:
+    panel_memoria.caption(f"⚠️ El motor '{nombre_motor}' no está instalado; se usa '{motor.nombre}'.")
+panel_memoria.caption(f"Motor de consultas: {motor.nombre}")
+
+# Una sola selección de filas por id; el take se hace solo en las secciones
+# que necesitan las filas (la tabla y la exportación)
+consulta = direccion or None
+filas = motor.seleccionar(igualdades, rango, consulta)
+total_filas = len(df) if filas is None else len(filas)
+medicion.marcar("filtros")
+
+# Lo que esta sesión agrega sobre el dataset compartido: su selección de ids
+# y la página de la tabla (que es lo único que se materializa)
+sesion = get_script_run_ctx()
+bytes_sesion = dataset.bytes_filas(min(total_filas, max(TAMANOS_PAGINA)))
+if filas is not None:
+    bytes_sesion += filas.nbytes
+registro = obtener_registro()
+registro.registrar(sesion.session_id if sesion else 'local', bytes_sesion)
+uso = registro.resumen(dataset.bytes_total())
+panel_memoria.caption(f"Compartido por el proceso: {uso['mb_compartidos']} MB (una sola copia)")
+panel_memoria.caption(f"{uso['sesiones']} sesión(es) activa(s), {uso['mb_por_sesion']} MB propios por sesión")
+if uso['rss_mb'] is not None:
+    panel_memoria.caption(f"RSS del proceso: {uso['rss_mb']} MB")
+
+# --- SECCIONES Y SUS DEPENDENCIAS ---
+
+# Entradas de la barra lateral que lee cada sección. Un cambio en la barra
+# lateral vuelve a ejecutar la página, pero cada sección arma sus claves
+# (resultados, figuras, exportaciones) solo con sus entradas: los puntos
+# críticos no leen la búsqueda ni la comuna ni el día (la línea base de cada
+# municipio necesita todas sus comunas y días; se filtran después sobre la
+# tabla), así que al cambiarlos reutilizan lo ya calculado. La tabla y los
+# gráficos leen los mismos filtros; sus controles propios (orden, página,
+# grupo de gráficos) viven en su fragmento y solo re-ejecutan esa sección.
+ENTRADAS = {
+    'filtros': igualdades,
+    'filtros_municipio': {col: valor for col, valor in igualdades.items() if col not in ("COMUNA", "DÍA DE LA SEMANA")},
+    'fechas': rango,
+    'texto': normalizar_texto(direccion) if direccion else None,
+}
+DEPENDENCIAS = {
+    'tabla': ('filtros', 'fechas', 'texto'),
+    'graficos': ('filtros', 'fechas', 'texto'),
+    'riesgo': ('filtros_municipio', 'fechas'),
+}
+
+def estado_seccion(seccion):
+    """Clave del estado de filtros visto por una sección."""
+    entradas = {nombre: ENTRADAS[nombre] for nombre in DEPENDENCIAS[seccion]}
+    igualdades_seccion = entradas.get('filtros', entradas.get('filtros_municipio'))
+    return clave_filtros(igualdades_seccion, entradas.get('fechas'), entradas.get('texto'))
+
+# Los conteos exactos se calculan en un hilo de fondo; si otra sesión ya los
+# pidió con los mismos filtros, se comparte ese mismo cálculo
+calculos = obtener_calculos()
+
+@functools.cache
+def vista_exacta():
+    """Futuro con el cubo de conteos exactos de los filtros actuales."""
+    return calculos.pedir((dataset.version, motor.nombre, estado_seccion('graficos')),
+                          lambda: motor.vista(igualdades, rango, consulta))
+
+@functools.cache
+def vista():
+    """Conteos de los filtros actuales: los exactos si llegan a tiempo, si no una muestra."""
+    try:
+        # Con pocas filas la muestra no ahorra nada: se esperan los exactos
+        return vista_exacta().result(timeout=None if total_filas <= muestreo.TAMANO_MUESTRA else PRESUPUESTO_EXACTO)
+    except TiempoAgotado:
+        return muestreo.muestra_estratificada(df, filas)
+
+def conteo(*dimensiones, completo=False):
+    """Total de accidentes por dimensiones, listo para Plotly (con margen si es estimado)."""
+    return vista().contar(*dimensiones, completo=completo).rename(
+        columns={cubo.COLUMNA_TOTAL: 'Total Accidentes', muestreo.COLUMNA_MARGEN: 'Margen'})
+
+def margen(df_conteo):
+    """Columna de barras de error (intervalo al 95 %) si los conteos son estimados."""
+    return 'Margen' if 'Margen' in df_conteo else None
+
+# Las figuras se reutilizan entre sesiones con los mismos filtros; la clave
+# incluye la versión del dataset, así que nunca se sirve una figura vieja
+figuras = obtener_figuras()
+
+def figura(id_grafico, construir):
+    """Figura del gráfico para los filtros actuales, desde la caché si ya existe."""
+    clave = (dataset.version, estado_seccion('graficos'), id_grafico)
+    # Con la figura exacta en caché no hace falta la vista de conteos; las
+    # preliminares se guardan aparte para no servirlas como exactas
+    exacta = figuras.buscar((*clave, False))
+    if exacta is not None:
+        return exacta
+    return figuras.obtener((*clave, vista().aproximada), construir)
+
+def graficos_preliminares():
+    """Si los gráficos de esta ejecución salieron de la muestra (sin calcular la vista si no se usó)."""
+    return vista.cache_info().currsize > 0 and vista().aproximada
 
 # --- VISTA PRINCIPAL ---
 
@@ -163,16 +350,90 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-if not df_filtrado.empty:
-    st.markdown(f"**Total de Registros:** {len(df_filtrado)} | **Rango de Fechas:** {fecha_rango[0].strftime('%Y-%m-%d')} a {fecha_rango[1].strftime('%Y-%m-%d')}")
-
-    # Mostrar DataFrame filtrado (CORREGIDO: Usa 'DIRECCION' sin acento)
-    st.markdown("<h2 style='text-align: center;'>📁 Datos Filtrados</h2>", unsafe_allow_html=True)
-    st.dataframe(df_filtrado[['FECHA', 'HORA', 'MUNICIPIO', 'COMUNA', 'BARRIO', 'CLASE', 'GRAVEDAD', 'DIRECCION']], use_container_width=True)
-else:
+if total_filas == 0:
     st.warning("No hay datos que coincidan con los filtros seleccionados.")
     st.stop()
 
+st.markdown(f"**Total de Registros:** {total_filas} | **Rango de Fechas:** {fecha_rango[0].strftime('%Y-%m-%d')} a {fecha_rango[1].strftime('%Y-%m-%d')}")
+
+# --- TABLA ---
+
+# Nombre visible -> columna del dataset (HORA se guarda como minuto del día)
+COLUMNAS_ORDEN = {'HORA' if col == 'MINUTO_DIA' else col: col for col in tabla.COLUMNAS_TABLA}
+
+@functools.lru_cache(maxsize=4)
+def ids_tabla(columna, descendente):
+    """Ids de la selección en el orden pedido; se reutilizan al cambiar de página."""
+    return tabla.ordenar(df, filas, columna, descendente)
+
+def descargada(ruta):
+    """Tras la descarga: la sesión olvida la exportación y el archivo se borra del disco."""
+    st.session_state.pop('exportacion', None)
+    ruta.unlink(missing_ok=True)
+
+@st.fragment
+def seccion_tabla():
+    """Tabla de registros filtrados, paginada y ordenada en el servidor."""
+    st.markdown("<h2 style='text-align: center;'>📁 Datos Filtrados</h2>", unsafe_allow_html=True)
+    if not st.toggle("Mostrar registros", value=True, key='tabla_visible'):
+        return
+
+    c_orden, c_sentido, c_tamano, c_pagina = st.columns([3, 2, 2, 2])
+    orden = c_orden.selectbox("Ordenar por:", ["(orden original)", *COLUMNAS_ORDEN], key='tabla_orden')
+    descendente = c_sentido.toggle("Descendente", key='tabla_descendente')
+    tamano = c_tamano.selectbox("Filas por página:", TAMANOS_PAGINA, index=1, key='tabla_tamano')
+    total_paginas = tabla.paginas(total_filas, tamano)
+    # Un filtro nuevo (u otro tamaño de página) vuelve a la primera página
+    pagina_de = (estado_seccion('tabla'), total_paginas)
+    if st.session_state.get('tabla_pagina_de') != pagina_de:
+        st.session_state['tabla_pagina_de'] = pagina_de
+        st.session_state['tabla_pagina'] = 1
+    numero = c_pagina.number_input(f"Página (de {total_paginas}):", min_value=1, max_value=total_paginas,
+                                   key='tabla_pagina')
+
+    # (CORREGIDO: Usa 'DIRECCION' sin acento)
+    with medicion.etapa("tabla"):
+        ids = ids_tabla(COLUMNAS_ORDEN.get(orden), descendente)
+        df_tabla = tabla.pagina(df, ids, numero, tamano)
+        df_tabla = df_tabla.assign(MINUTO_DIA=hora_texto(df_tabla['MINUTO_DIA'])).rename(columns={'MINUTO_DIA': 'HORA'})
+        st.dataframe(df_tabla, use_container_width=True, hide_index=True)
+    inicio = (numero - 1) * tamano
+    st.caption(f"Filas {inicio + 1}–{inicio + len(df_tabla)} de {total_filas}")
+
+    # Exportación de toda la selección (en el orden de la tabla): se escribe a
+    # disco por bloques y se reutiliza si otra sesión ya pidió la misma. La
+    # sesión guarda solo la ruta; el archivo se lee al dibujar el botón y sus
+    # bytes quedan en el servidor de archivos de Streamlit (una copia por
+    # contenido, no por sesión), no en el estado de la sesión
+    c_formato, c_preparar, c_descargar = st.columns([2, 2, 3])
+    formato = c_formato.radio("Formato:", list(exportacion.FORMATOS), horizontal=True, key='tabla_formato')
+    nombre = exportacion.nombre_exportacion(dataset.version, estado_seccion('tabla'), orden, descendente)
+    if c_preparar.button("📤 Preparar exportación", key='tabla_exportar'):
+        with st.spinner(f"Exportando {total_filas} registros..."), medicion.etapa("exportacion"):
+            ruta = exportacion.exportar(df, ids, formato, DIRECTORIO_CACHE / 'exportaciones', nombre)
+            st.session_state['exportacion'] = (nombre, formato, ruta)
+    preparada = st.session_state.get('exportacion')
+    # Si cambió la selección, o el archivo ya no está (otra sesión lo
+    # descargó y borró), hay que volver a prepararla
+    if preparada and (preparada[:2] != (nombre, formato) or not preparada[2].exists()):
+        del st.session_state['exportacion']
+        preparada = None
+    if preparada:
+        ruta = preparada[2]
+        megas = ruta.stat().st_size / 2**20
+        if megas > MAXIMO_DESCARGA_MB:
+            c_descargar.warning(f"La exportación pesa {megas:.0f} MB (máximo {MAXIMO_DESCARGA_MB} MB para "
+                                "descargar): acota los filtros.")
+        else:
+            with open(ruta, 'rb') as archivo:
+                c_descargar.download_button(
+                    f"⬇️ Descargar {formato.upper()}", archivo,
+                    file_name=f"accidentes_filtrados.{formato}", mime=exportacion.FORMATOS[formato],
+                    on_click=descargada, args=(ruta,), key='tabla_descargar',
+                )
+
+seccion_tabla()
+
 
 # --------------------------
 # --- GRÁFICOS AVANZADOS ---
@@ -180,76 +441,241 @@ else:
 
 st.markdown("<h2 style='text-align: center;'>📈 Visualización de Tendencias y Causas</h2>", unsafe_allow_html=True)
 
-# Fila 1 de gráficos
-col1, col2 = st.columns(2)
-
-# Gráfico 1: Número de Accidentes por Clase
-df_clase = df_filtrado.groupby('CLASE').size().reset_index(name='Total Accidentes')
-fig_clase = px.bar(df_clase, x='CLASE', y='Total Accidentes', color='CLASE',
-                   title="Distribución de Accidentes por Clase",
-                   labels={'CLASE': 'Clase de Accidente', 'Total Accidentes': 'Frecuencia'})
-col1.plotly_chart(fig_clase, use_container_width=True)
-
-# Gráfico 2: Accidentes por Día de la Semana (CORREGIDO el ValueError de 'index')
-orden_dias = ['LUNES', 'MARTES', 'MIERCOLES', 'JUEVES', 'VIERNES', 'SABADO', 'DOMINGO']
-df_dias = df_filtrado['DÍA DE LA SEMANA'].str.strip().value_counts().reindex(orden_dias).fillna(0).reset_index(name='Total Accidentes')
-# 🚨 CORRECCIÓN: Renombrar 'index' a 'DÍA DE LA SEMANA'
-df_dias.rename(columns={'index': 'DÍA DE LA SEMANA'}, inplace=True) 
-
-fig_dias = px.bar(df_dias, x='DÍA DE LA SEMANA', y='Total Accidentes', color='Total Accidentes',
-                   title="Accidentes por Día de la Semana",
-                   labels={'DÍA DE LA SEMANA': 'Día de la Semana', 'Total Accidentes': 'Frecuencia'})
-col2.plotly_chart(fig_dias, use_container_width=True)
-
-
-# Fila 2 de gráficos
-col3, col4 = st.columns(2)
-
-# Gráfico 3: Distribución de Gravedad por Clase (Barras Apiladas)
-fig_gravedad_clase = px.histogram(df_filtrado, x='CLASE', color='GRAVEDAD',
-                                   title="Gravedad de Accidentes por Clase",
-                                   labels={'CLASE': 'Clase de Accidente', 'count': 'Total de Accidentes'},
-                                   category_orders={"GRAVEDAD": ["Solo Daños", "Heridos", "Muertos"]}) 
-col3.plotly_chart(fig_gravedad_clase, use_container_width=True)
-
-
-# Gráfico 4: Accidentes por Hora del Día (Histograma)
-fig_hora = px.histogram(df_filtrado, x='HORA_DIA', nbins=24, color='GRAVEDAD',
-                        title="Frecuencia de Accidentes por Hora del Día",
-                        labels={'HORA_DIA': 'Hora del Día', 'count': 'Número de Accidentes'})
-fig_hora.update_layout(xaxis=dict(tickmode='linear', dtick=1))
-col4.plotly_chart(fig_hora, use_container_width=True)
-
-
-# Fila 3 de gráficos
-st.markdown("---")
-col5, col6 = st.columns(2)
-
-# Gráfico 5: Accidentes por Comuna (Mapa de Árbol o Tree Map)
-df_comuna_counts = df_filtrado['COMUNA'].value_counts().reset_index()
-df_comuna_counts.columns = ['COMUNA', 'Total Accidentes']
-fig_treemap = px.treemap(df_comuna_counts, path=[px.Constant("Medellín"), 'COMUNA'], values='Total Accidentes',
-                         title="Distribución de Accidentes por Comuna",
-                         color='Total Accidentes', hover_data=['COMUNA'],
-                         color_continuous_scale='Reds')
-col5.plotly_chart(fig_treemap, use_container_width=True)
-
-
-# Gráfico 6: Distribución de Accidentes por Diseño Vial (Gráfico de Tarta)
-df_diseno = df_filtrado['DISEÑO'].value_counts().reset_index()
-df_diseno.columns = ['DISEÑO', 'Total Accidentes']
-fig_pie_diseno = px.pie(df_diseno, names='DISEÑO', values='Total Accidentes',
-                        title="Accidentes según el Diseño Vial",
-                        hole=0.3)
-col6.plotly_chart(fig_pie_diseno, use_container_width=True)
-
-
-# Fila 4: Tendencia Mensual de Accidentes
-st.markdown("---")
-df_tiempo = df_filtrado.groupby(df_filtrado['FECHA'].dt.to_period('M')).size().reset_index(name='Total Accidentes')
-df_tiempo['FECHA'] = df_tiempo['FECHA'].astype(str)
-
-fig_tiempo = px.line(df_tiempo, x='FECHA', y='Total Accidentes',
-                     title="Tendencia Mensual de Accidentes",
-                     labels={'FECHA': 'Mes y Año', 'Total Accidentes': 'Frecuencia'})
-st.plotly_chart(fig_tiempo, use_container_width=True)
\ No newline at end of file
+# Cada grupo de gráficos es una función: solo se construyen los del grupo
+# elegido, y cambiar de grupo solo re-ejecuta el fragmento de gráficos
+
+def grupo_clase_dia():
+    # Fila 1 de gráficos
+    col1, col2 = st.columns(2)
+
+    # Gráfico 1: Número de Accidentes por Clase
+    def grafico_clase():
+        df_clase = conteo('CLASE')
+        return px.bar(df_clase, x='CLASE', y='Total Accidentes', color='CLASE', error_y=margen(df_clase),
+                      title="Distribución de Accidentes por Clase",
+                      labels={'CLASE': 'Clase de Accidente', 'Total Accidentes': 'Frecuencia'})
+
+    fig_clase = figura('clase', grafico_clase)
+    col1.plotly_chart(fig_clase, use_container_width=True)
+
+    # Gráfico 2: Accidentes por Día de la Semana (CORREGIDO el ValueError de 'index')
+    # La columna es categórica con el orden Lunes-Domingo; los días sin accidentes quedan en 0
+    def grafico_dias():
+        df_dias = conteo('DÍA DE LA SEMANA', completo=True)
+        return px.bar(df_dias, x='DÍA DE LA SEMANA', y='Total Accidentes', color='Total Accidentes',
+                      error_y=margen(df_dias),
+                      title="Accidentes por Día de la Semana",
+                      labels={'DÍA DE LA SEMANA': 'Día de la Semana', 'Total Accidentes': 'Frecuencia'})
+
+    fig_dias = figura('dias', grafico_dias)
+    col2.plotly_chart(fig_dias, use_container_width=True)
+
+
+def grupo_gravedad_hora():
+    # Fila 2 de gráficos
+    col3, col4 = st.columns(2)
+
+    # Gráfico 3: Distribución de Gravedad por Clase (Barras Apiladas)
+    def grafico_gravedad_clase():
+        df_gravedad_clase = conteo('CLASE', 'GRAVEDAD')
+        return px.bar(df_gravedad_clase, x='CLASE', y='Total Accidentes', color='GRAVEDAD',
+                      error_y=margen(df_gravedad_clase),
+                      title="Gravedad de Accidentes por Clase",
+                      labels={'CLASE': 'Clase de Accidente', 'Total Accidentes': 'Total de Accidentes'},
+                      category_orders={"GRAVEDAD": list(df['GRAVEDAD'].cat.categories)})
+
+    fig_gravedad_clase = figura('gravedad_clase', grafico_gravedad_clase)
+    col3.plotly_chart(fig_gravedad_clase, use_container_width=True)
+
+    # Gráfico 4: Accidentes por Hora del Día (Histograma)
+    def grafico_hora():
+        df_horas = conteo('HORA_DIA', 'GRAVEDAD').query('HORA_DIA >= 0')
+        fig_hora = px.bar(df_horas, x='HORA_DIA', y='Total Accidentes', color='GRAVEDAD', error_y=margen(df_horas),
+                          title="Frecuencia de Accidentes por Hora del Día",
+                          labels={'HORA_DIA': 'Hora del Día', 'Total Accidentes': 'Número de Accidentes'})
+        fig_hora.update_layout(xaxis=dict(tickmode='linear', dtick=1))
+        return fig_hora
+
+    fig_hora = figura('hora', grafico_hora)
+    col4.plotly_chart(fig_hora, use_container_width=True)
+
+
+def grupo_comuna_diseno():
+    # Fila 3 de gráficos
+    col5, col6 = st.columns(2)
+
+    # Gráfico 5: Accidentes por Comuna (Mapa de Árbol o Tree Map)
+    def grafico_comunas():
+        df_comuna_counts = conteo('COMUNA')
+        return px.treemap(df_comuna_counts, path=[px.Constant("Medellín"), 'COMUNA'], values='Total Accidentes',
+                          title="Distribución de Accidentes por Comuna",
+                          color='Total Accidentes', hover_data=['COMUNA'],
+                          color_continuous_scale='Reds')
+
+    fig_treemap = figura('comunas', grafico_comunas)
+    col5.plotly_chart(fig_treemap, use_container_width=True)
+
+    # Gráfico 6: Distribución de Accidentes por Diseño Vial (Gráfico de Tarta)
+    def grafico_diseno():
+        df_diseno = conteo('DISEÑO')
+        return px.pie(df_diseno, names='DISEÑO', values='Total Accidentes',
+                      title="Accidentes según el Diseño Vial",
+                      hole=0.3)
+
+    fig_pie_diseno = figura('diseno', grafico_diseno)
+    col6.plotly_chart(fig_pie_diseno, use_container_width=True)
+
+
+def grupo_tendencia():
+    # Fila 4: Tendencia Mensual de Accidentes
+    def grafico_tiempo():
+        df_tiempo = conteo('MES').rename(columns={'MES': 'FECHA'})
+        df_tiempo['FECHA'] = df_tiempo['FECHA'].dt.strftime('%Y-%m')
+        return px.line(df_tiempo, x='FECHA', y='Total Accidentes', error_y=margen(df_tiempo),
+                       title="Tendencia Mensual de Accidentes",
+                       labels={'FECHA': 'Mes y Año', 'Total Accidentes': 'Frecuencia'})
+
+    fig_tiempo = figura('tiempo', grafico_tiempo)
+    st.plotly_chart(fig_tiempo, use_container_width=True)
+
+
+GRUPOS_GRAFICOS = {
+    "Clase y día": grupo_clase_dia,
+    "Gravedad y hora": grupo_gravedad_hora,
+    "Comunas y diseño": grupo_comuna_diseno,
+    "Tendencia mensual": grupo_tendencia,
+}
+
+@st.fragment
+def seccion_graficos():
+    """Gráficos del grupo seleccionado."""
+    grupo = st.radio("Gráficos:", list(GRUPOS_GRAFICOS), horizontal=True, key='grupo_graficos')
+    with medicion.etapa(f"graficos: {grupo}"):
+        GRUPOS_GRAFICOS[grupo]()
+    if graficos_preliminares():
+        estimada = vista()
+        st.caption(
+            f"⏳ Vista preliminar: muestra estratificada por municipio y clase de {estimada.filas_muestra} "
+            f"de {estimada.filas_total} registros, con intervalos al 95 %. Calculando los valores exactos..."
+        )
+
+    estadisticas = figuras.estadisticas()
+    st.caption(
+        f"Caché de gráficos: {estadisticas['entradas']} figuras, "
+        f"{estadisticas['aciertos']} aciertos / {estadisticas['fallos']} fallos ({estadisticas['tasa']:.0%})"
+    )
+
+seccion_graficos()
+
+# Mientras los gráficos son preliminares se revisa cada segundo y, cuando
+# terminan los conteos exactos, la página se vuelve a dibujar con ellos
+@st.fragment(run_every=1)
+def esperar_exactos():
+    if vista_exacta().done():
+        st.rerun()
+
+if graficos_preliminares():
+    esperar_exactos()
+
+
+# --------------------------
+# --- PUNTOS CRÍTICOS ---
+# --------------------------
+
+# Zona (municipio y comuna) × día × hora frente al perfil de su municipio.
+# La comuna y el día se aplican después sobre la tabla (ver DEPENDENCIAS)
+igualdades_riesgo = ENTRADAS['filtros_municipio']
+clave_riesgo = (dataset.version, motor.nombre, 'riesgo', estado_seccion('riesgo'))
+
+def calcular_riesgo(previa=None, rango_previo=None):
+    """Matriz de la ventana de fechas y sus celdas puntuadas.
+
+    Con ``previa`` (la matriz ya calculada de una ventana contenida en esta)
+    solo se le suman las celdas de los días que faltan, en vez de rehacerla.
+    """
+    if previa is None:
+        matriz = riesgo.MatrizRiesgo.desde_celdas(motor.vista(igualdades_riesgo, rango).celdas)
+    else:
+        matriz = previa.copiar()
+        un_dia = pd.Timedelta(days=1)
+        if rango[0] < rango_previo[0]:
+            matriz.agregar(motor.vista(igualdades_riesgo, (rango[0], rango_previo[0] - un_dia)).celdas)
+        if rango[1] > rango_previo[1]:
+            matriz.agregar(motor.vista(igualdades_riesgo, (rango_previo[1] + un_dia, rango[1])).celdas)
+    return matriz, matriz.puntuar()
+
+def puntaje_riesgo():
+    """Celdas puntuadas, calculadas desde el cubo en segundo plano (compartidas entre sesiones)."""
+    # Si la ventana anterior de esta sesión, con los mismos filtros, cabe en
+    # la actual, su matriz solo se amplía con los días nuevos
+    anterior = st.session_state.get('riesgo_anterior')
+    st.session_state['riesgo_anterior'] = (clave_riesgo, rango)
+    previa = rango_previo = None
+    if (anterior and rango is not None and anterior[1] is not None and anterior[1] != rango
+            and anterior[0][:3] == clave_riesgo[:3] and anterior[0][3][0] == clave_riesgo[3][0]
+            and rango[0] <= anterior[1][0] and anterior[1][1] <= rango[1]):
+        calculado = calculos.listo(anterior[0])
+        if calculado is not None:
+            previa, rango_previo = calculado[0], anterior[1]
+    return calculos.pedir(clave_riesgo, lambda: calcular_riesgo(previa, rango_previo)).result()[1]
+
+COLUMNAS_RIESGO = {
+    'MUNICIPIO': 'Municipio', 'COMUNA': 'Comuna', 'DÍA DE LA SEMANA': 'Día', 'HORA_DIA': 'Hora',
+    'ACCIDENTES': 'Accidentes', 'INDICE': 'Índice de severidad', 'ESPERADO': 'Esperado',
+    'RAZON': 'Razón', 'Z': 'z', 'P_VALOR': 'p', 'CRITICO': 'Punto crítico',
+}
+AREA_METROPOLITANA = "Toda el área metropolitana"
+
+@st.fragment
+def seccion_riesgo():
+    """Ranking de celdas zona × día × hora con más riesgo que su municipio, y su mapa de calor."""
+    st.markdown("<h2 style='text-align: center;'>🔥 Puntos Críticos por Comuna, Día y Hora</h2>", unsafe_allow_html=True)
+    if not st.toggle("Mostrar puntos críticos", value=True, key='riesgo_visible'):
+        return
+
+    with st.spinner("Calculando puntos críticos..."), medicion.etapa("riesgo"):
+        puntaje = puntaje_riesgo()
+        ranking = puntaje
+        if comuna != "Todos":
+            ranking = ranking[ranking['COMUNA'] == str(comuna)]
+        if dia_semana != "Todos":
+            ranking = ranking[ranking['DÍA DE LA SEMANA'].astype(str) == normalizar_texto(dia_semana).upper()]
+
+        c_solo, c_cantidad = st.columns(2)
+        solo_criticos = c_solo.toggle("Solo puntos críticos", key='riesgo_solo')
+        cantidad = c_cantidad.selectbox("Filas:", [20, 50, 100], key='riesgo_filas')
+        if solo_criticos:
+            ranking = ranking[ranking['CRITICO']]
+        st.dataframe(
+            ranking.head(cantidad).round({'INDICE': 0, 'ESPERADO': 1, 'RAZON': 2, 'Z': 2, 'P_VALOR': 6})
+            .rename(columns=COLUMNAS_RIESGO),
+            use_container_width=True, hide_index=True,
+        )
+        st.caption(
+            f"{int(puntaje['CRITICO'].sum())} puntos críticos entre {len(puntaje)} celdas con accidentes. "
+            "Índice de severidad: cada accidente pesa según su gravedad (muertos 10, heridos 5, solo daños 1). "
+            "Esperado: perfil de día y hora del municipio escalado al total de la comuna."
+            + (" La búsqueda por dirección no se aplica a esta sección." if consulta else "")
+        )
+
+        # Zonas ordenadas por su peor celda
+        zonas = puntaje.drop_duplicates(['MUNICIPIO', 'COMUNA'])
+        etiquetas = {f"{fila.COMUNA} ({fila.MUNICIPIO})": (fila.MUNICIPIO, fila.COMUNA) for fila in zonas.itertuples()}
+        zona = st.selectbox("Mapa de calor de:", [AREA_METROPOLITANA, *etiquetas], key='riesgo_zona')
+
+        def mapa_calor():
+            if zona == AREA_METROPOLITANA:
+                return px.imshow(riesgo.criticos_por_hora(puntaje), color_continuous_scale='Reds', aspect='auto',
+                                 labels={'x': 'Hora del Día', 'y': 'Día', 'color': 'Puntos críticos'},
+                                 title="Comunas marcadas como punto crítico por día y hora")
+            return px.imshow(riesgo.razon_zona(puntaje, *etiquetas[zona]), color_continuous_scale='RdBu_r',
+                             color_continuous_midpoint=1.0, aspect='auto',
+                             labels={'x': 'Hora del Día', 'y': 'Día', 'color': 'Razón'},
+                             title=f"{zona}: índice de severidad observado / esperado")
+
+        fig_calor = figuras.obtener((*clave_riesgo, zona), mapa_calor)
+        st.plotly_chart(fig_calor, use_container_width=True)
+
+seccion_riesgo()
+
+medicion.panel()
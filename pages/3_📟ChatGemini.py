@@ -2,6 +2,8 @@ import os
 import streamlit as st
 from google import genai 
 
+import rendimiento
+
 # --- Configuración y Estilización de la Página ---
 
 # Usa un emoji más acorde al nuevo estilo
@@ -11,6 +13,8 @@ st.set_page_config(
     layout="wide"
 )
 
+medicion = rendimiento.iniciar("ChatGemini")
+
 # Estilos CSS personalizados (más sencillos ahora que usamos el tema claro)
 st.markdown("""
 <style>
@@ -173,7 +177,8 @@ enviar = st.button(" Enviar Solicitud a Gemini", use_container_width=True)
 
 if enviar:
     with st.spinner(f"✨ Ejecutando la tarea: {opcion_tarea} con {modelo_seleccionado}..."): 
-        respuesta = generar_respuesta(prompt, opcion_tarea, modelo_seleccionado, api_key)
+        with medicion.etapa("respuesta_gemini"):
+            respuesta = generar_respuesta(prompt, opcion_tarea, modelo_seleccionado, api_key)
         
         st.markdown(f'<div class="result-box"><h3>✨ Resultado de la Tarea: {opcion_tarea}</h3>', unsafe_allow_html=True) 
         
@@ -183,4 +188,6 @@ if enviar:
         st.markdown('</div>', unsafe_allow_html=True)
         
 elif not enviar and not prompt:
-    st.caption("Esperando tu primera solicitud...")
\ No newline at end of file
+    st.caption("Esperando tu primera solicitud...")
+
+medicion.panel()
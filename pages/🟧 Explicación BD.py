@@ -1,8 +1,12 @@
 import streamlit as st
 
+import rendimiento
+
 # Configuración de la página
 st.set_page_config(page_title="Explicación del Dashboard de Accidentalidad Vial", page_icon="🚨", layout="centered")
 
+medicion = rendimiento.iniciar("Explicación BD")
+
 # Encabezado elegante para el nuevo tema
 st.markdown("""
 <div style="background: linear-gradient(90deg, #A83333, #D44E4E); padding: 20px; border-radius: 12px; text-align: center;">
@@ -52,6 +56,7 @@ El dashboard genera las siguientes **visualizaciones de tendencias y causas**:
 - 🚨 **Gravedad de Accidentes por Clase**: Conteo de Heridos, Daños y Muertos por cada tipo de accidente.
 - ⏰ **Frecuencia de Accidentes por Hora del Día**: Gráfico que muestra los picos de accidentalidad a lo largo de las 24 horas.
 - 📉 **Tendencia Mensual de Accidentes**: Gráfico de líneas que muestra la evolución de la frecuencia de siniestros a lo largo del tiempo.
+- 🔥 **Puntos Críticos por Comuna, Día y Hora**: Ranking de las combinaciones comuna × día × hora con más accidentes (ponderados por gravedad) de lo que se espera según el patrón de su municipio, con un mapa de calor por día y hora.
 """)
 
 st.markdown("---")
@@ -63,4 +68,6 @@ Esta herramienta tiene como objetivo principal:
 🚨 Identificar **puntos y momentos de riesgo** (días, horas, comunas) de alta accidentalidad.  
 🧠 Entender el **impacto** real de los siniestros (Heridos/Muertos) por clase de accidente.  
 📈 Apoyar la **planificación de la seguridad vial** basándose en patrones temporales y geográficos.
-""")
\ No newline at end of file
+""")
+
+medicion.panel()
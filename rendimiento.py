@@ -0,0 +1,145 @@
+"""Medición de tiempos y memoria por etapa en todas las páginas.
+
+Cada rerun de una página crea una ``Medicion`` y marca sus etapas (carga,
+filtros, gráficos, ...). Cada etapa registra su tiempo de pared y cuánto
+creció la memoria residente del proceso, escribe una línea JSON en el log
+``rendimiento`` y se suma a un agregador común a todas las sesiones, que
+calcula p50/p95 sobre las últimas mediciones de cada etapa.
+
+Uso en una página::
+
+    medicion = rendimiento.iniciar("Data")
+    ...
+    medicion.marcar("carga")        # tiempo desde la marca anterior
+    with medicion.etapa("graficos"):
+        ...
+    medicion.panel()                # panel opcional en la barra lateral
+"""
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from accidentalidad.memoria import rss_actual
+
+MB = 2 ** 20
+MUESTRAS_POR_ETAPA = 500
+
+registro_log = logging.getLogger('rendimiento')
+if not registro_log.handlers:
+    _manejador = logging.StreamHandler()
+    _manejador.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+    registro_log.addHandler(_manejador)
+    registro_log.setLevel(logging.INFO)
+    registro_log.propagate = False
+
+
+class Agregador:
+    """Últimas mediciones de cada (página, etapa), compartidas por todas las sesiones."""
+
+    def __init__(self, muestras=MUESTRAS_POR_ETAPA):
+        self._muestras = defaultdict(lambda: deque(maxlen=muestras))
+        self._candado = threading.Lock()
+
+    def agregar(self, pagina, etapa, segundos, mb):
+        with self._candado:
+            self._muestras[(pagina, etapa)].append((segundos, mb))
+
+    def resumen(self, pagina=None):
+        """p50/p95 de tiempo (ms) y de crecimiento de RSS (MB) por etapa."""
+        with self._candado:
+            copias = {clave: list(valores) for clave, valores in self._muestras.items()
+                      if pagina is None or clave[0] == pagina}
+        filas = []
+        for (pag, etapa), valores in copias.items():
+            tiempos = np.array([v[0] for v in valores]) * 1000
+            memoria = np.array([v[1] for v in valores if v[1] is not None])
+            filas.append({
+                'página': pag,
+                'etapa': etapa,
+                'n': len(valores),
+                'p50 ms': round(float(np.percentile(tiempos, 50)), 1),
+                'p95 ms': round(float(np.percentile(tiempos, 95)), 1),
+                'p50 ΔMB': round(float(np.percentile(memoria, 50)), 2) if len(memoria) else None,
+                'p95 ΔMB': round(float(np.percentile(memoria, 95)), 2) if len(memoria) else None,
+            })
+        return pd.DataFrame(filas)
+
+
+@st.cache_resource
+def agregador():
+    """Agregador del proceso (uno solo para todas las sesiones y páginas)."""
+    return Agregador()
+
+
+class Medicion:
+    """Etapas de un rerun de una página."""
+
+    def __init__(self, pagina, destino=None):
+        self.pagina = pagina
+        self.destino = destino
+        self.etapas = []
+        self._inicio = self._ultima = time.perf_counter()
+        self._rss = self._rss_ultima = rss_actual()
+
+    def _registrar(self, etapa, segundos, rss_antes):
+        rss = rss_actual()
+        mb = None if rss is None or rss_antes is None else (rss - rss_antes) / MB
+        self.etapas.append((etapa, segundos, mb))
+        if self.destino is not None:
+            self.destino.agregar(self.pagina, etapa, segundos, mb)
+        registro_log.info(json.dumps({
+            'pagina': self.pagina,
+            'etapa': etapa,
+            'ms': round(segundos * 1000, 2),
+            'delta_rss_mb': None if mb is None else round(mb, 2),
+        }, ensure_ascii=False))
+        return rss
+
+    def marcar(self, etapa):
+        """Cierra la etapa que va desde la marca anterior (o el inicio) hasta ahora."""
+        ahora = time.perf_counter()
+        self._rss_ultima = self._registrar(etapa, ahora - self._ultima, self._rss_ultima)
+        self._ultima = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nombre):
+        """Mide solo el bloque ``with`` (útil dentro de fragmentos)."""
+        inicio, rss = time.perf_counter(), rss_actual()
+        try:
+            yield
+        finally:
+            self._registrar(nombre, time.perf_counter() - inicio, rss)
+            self._ultima, self._rss_ultima = time.perf_counter(), rss_actual()
+
+    def panel(self):
+        """Panel opcional en la barra lateral con este rerun y los p50/p95 del proceso."""
+        # Lo que quedó sin marcar; en páginas sin etapas propias es todo el contenido
+        self.marcar('resto' if self.etapas else 'contenido')
+        if not st.sidebar.toggle("⏱️ Panel de rendimiento", key=f"rendimiento_{self.pagina}"):
+            return
+        with st.sidebar.expander("⏱️ Rendimiento", expanded=True):
+            total = time.perf_counter() - self._inicio
+            st.caption(f"Este rerun: {total * 1000:.0f} ms")
+            st.dataframe(
+                pd.DataFrame(
+                    [(etapa, round(s * 1000, 1), None if mb is None else round(mb, 2)) for etapa, s, mb in self.etapas],
+                    columns=['etapa', 'ms', 'ΔMB'],
+                ),
+                hide_index=True, use_container_width=True,
+            )
+            if self.destino is not None:
+                st.caption("Todas las sesiones (últimas mediciones):")
+                st.dataframe(self.destino.resumen(self.pagina).drop(columns='página'),
+                             hide_index=True, use_container_width=True)
+
+
+def iniciar(pagina):
+    """Medición de un rerun de ``pagina``, agregada con las del resto de sesiones."""
+    return Medicion(pagina, agregador())
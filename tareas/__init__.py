@@ -0,0 +1,5 @@
+"""Acceso a la API de tareas de la página Data_Proyecto (sin dependencias de Streamlit)."""
+from .almacen import AlmacenTareas
+from .cliente import ClienteTareas
+
+__all__ = ['AlmacenTareas', 'ClienteTareas']
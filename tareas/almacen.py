@@ -0,0 +1,299 @@
+"""Copia local de las tareas, compartida por todas las sesiones del proceso.
+
+Las escrituras son optimistas: una tarea nueva (o un cambio) aparece en la
+copia local al instante, marcada como pendiente, y la petición a la API se
+hace en un hilo de fondo. Cuando la API responde, la tarea confirmada
+reemplaza a la provisional; si falla, la provisional se retira (o el cambio
+se deshace) y el error queda en el ``Future`` que devolvió la escritura.
+
+Crear una tarea cuesta un POST, no un POST más un GET de todo. Cuando la
+copia vence (``vigencia``) no se vuelve a pedir la lista entera: solo las
+tareas creadas (o modificadas, si la API guarda ``updatedAt``) desde la
+marca de la última sincronización, así que el costo crece con lo que
+cambió y no con el tamaño de la colección. Cada ``reconciliacion``
+segundos sí se pide la lista completa, que es lo único que detecta las
+tareas borradas (o cambiadas sin marca) por otros clientes.
+
+Una vista filtrada no necesita la lista completa: ``consultar`` le pide a
+la API solo las tareas del filtro (con los parámetros que ella sabe
+filtrar), esté o no cargada la copia completa, y guarda cada consulta igual
+de ``vigencia`` segundos. Un filtro sin esos parámetros (solo la fecha
+límite) se aplica sobre la copia completa. Si la API resulta no filtrar,
+también se usa la copia completa y se filtra aquí.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Segundos que la copia local se da por buena antes de pedir los cambios, y
+# cada cuánto se pide la lista completa
+VIGENCIA = 60
+RECONCILIACION = 600
+ESCRITURAS_SIMULTANEAS = 4
+# Campo que marca las tareas (o cambios) que la API todavía no confirmó
+PENDIENTE = '_pendiente'
+
+
+class AlmacenTareas:
+    """Tareas confirmadas por la API más las escrituras locales en curso."""
+
+    def __init__(self, cliente, vigencia=VIGENCIA, reconciliacion=RECONCILIACION,
+                 simultaneas=ESCRITURAS_SIMULTANEAS):
+        self.cliente = cliente
+        self.vigencia = vigencia
+        self.reconciliacion = reconciliacion
+        # Última sincronización: tipo ('completa', 'cambios' o 'filtrada'), tareas recibidas y segundos
+        self.ultima = None
+        self._tareas = {}
+        # Tareas creadas localmente que aún no tienen id de la API
+        self._locales = {}
+        # Escrituras confirmadas (instante, id, tarea o None si se borró):
+        # se vuelven a aplicar sobre una lista pedida antes de confirmarse
+        self._escrituras = []
+        self._cargada = None
+        self._completa = None
+        # Campo y valor más reciente vistos: desde ahí se piden los cambios
+        self._campo = 'createdAt'
+        self._marca = None
+        # Consultas filtradas en la API: parámetros -> (instante, tareas por id)
+        self._consultas = {}
+        # Pasa a False si la API devuelve tareas que no cumplen los parámetros
+        self.api_filtra = True
+        self._candado = threading.Lock()
+        self._carga = threading.Lock()
+        self._hilos = ThreadPoolExecutor(simultaneas, thread_name_prefix='tareas-escritura')
+
+    # --- Lectura ---
+
+    def tareas(self):
+        """Lista de tareas (confirmadas y pendientes); la pide a la API si venció.
+
+        Lanza ``requests.RequestException`` si hay que pedirla y la API falla.
+        """
+        if not self._vigente():
+            self.sincronizar()
+        with self._candado:
+            return [*self._tareas.values(), *self._locales.values()]
+
+    def pendientes(self):
+        """Número de escrituras que la API todavía no confirmó."""
+        with self._candado:
+            return len(self._locales) + sum(1 for t in self._tareas.values() if t.get(PENDIENTE))
+
+    def consultar(self, filtro):
+        """Tareas (confirmadas y pendientes) que cumplen ``filtro``.
+
+        Si el filtro tiene parámetros que la API sabe filtrar se le pide a
+        ella solo lo filtrado; si no (o si la API no filtra) se filtra la
+        copia completa. Lanza ``requests.RequestException`` si hay que pedir
+        y la API falla.
+        """
+        if not filtro.parametros() or not self.api_filtra:
+            return filtro.aplicar(self.tareas())
+        tareas = self._consulta(filtro)
+        if tareas is None:
+            return filtro.aplicar(self.tareas())
+        return filtro.aplicar(tareas)
+
+    def _consulta(self, filtro):
+        """Tareas de la API para los parámetros de ``filtro``, con las escrituras locales encima.
+
+        Devuelve None si la API resultó no filtrar.
+        """
+        parametros = filtro.parametros()
+        clave = tuple(sorted(parametros.items()))
+        # Las escrituras se podan con este candado tomado: mientras se
+        # aplican sobre la consulta ninguna carga puede descartarlas
+        with self._carga:
+            guardada = self._consultas.get(clave)
+            if guardada is None or time.monotonic() - guardada[0] >= self.vigencia:
+                inicio = time.monotonic()
+                lista = self.cliente.listar(parametros)
+                if not all(filtro.cumple_parametros(tarea) for tarea in lista):
+                    self.api_filtra = False
+                guardada = (inicio, {tarea['id']: tarea for tarea in lista})
+                with self._candado:
+                    self._consultas[clave] = guardada
+                    self._podar(inicio)
+                self.ultima = {'tipo': 'filtrada', 'tareas': len(lista), 'segundos': time.monotonic() - inicio}
+            if not self.api_filtra:
+                return None
+            instante, tareas = guardada
+            with self._candado:
+                tareas = dict(tareas)
+                # Lo escrito después de la consulta, y los cambios sin confirmar
+                for momento, id_tarea, tarea in self._escrituras:
+                    if momento >= instante:
+                        self._aplicar(tareas, id_tarea, tarea)
+                tareas.update((id_tarea, tarea) for id_tarea, tarea in self._tareas.items() if tarea.get(PENDIENTE))
+                return [*tareas.values(), *self._locales.values()]
+
+    def _vigente(self):
+        return self._cargada is not None and time.monotonic() - self._cargada < self.vigencia
+
+    def sincronizar(self):
+        """Pone al día la copia: solo los cambios, o la lista completa si toca reconciliar."""
+        with self._carga:
+            # Otra sesión pudo sincronizar mientras se esperaba el candado
+            if self._vigente():
+                return
+            completa = (self._marca is None or self._completa is None
+                        or time.monotonic() - self._completa >= self.reconciliacion)
+            self._traer(completa)
+
+    def recargar(self):
+        """Pide la lista completa y reemplaza la copia confirmada (una carga a la vez)."""
+        with self._carga:
+            # Las consultas filtradas también se vuelven a pedir
+            with self._candado:
+                self._consultas = {}
+            self._traer(completa=True)
+
+    def _traer(self, completa):
+        inicio = time.monotonic()
+        if completa:
+            lista = self.cliente.listar()
+        else:
+            lista = self.cliente.recientes(self._marca, self._campo)
+        with self._candado:
+            tareas = {} if completa else dict(self._tareas)
+            tareas.update((tarea['id'], tarea) for tarea in lista)
+            # Lo escrito mientras viajaba la lista gana a la lista; los
+            # cambios optimistas aún sin confirmar también se conservan
+            for instante, id_tarea, tarea in self._escrituras:
+                if instante >= inicio:
+                    self._aplicar(tareas, id_tarea, tarea)
+            for id_tarea, tarea in self._tareas.items():
+                if tarea.get(PENDIENTE) and id_tarea in tareas:
+                    tareas[id_tarea] = tarea
+            self._podar(inicio)
+            self._tareas = tareas
+            self._avanzar_marca(tareas.values() if completa else lista)
+            self._cargada = inicio
+            if completa:
+                self._completa = inicio
+        self.ultima = {'tipo': 'completa' if completa else 'cambios', 'tareas': len(lista),
+                       'segundos': time.monotonic() - inicio}
+
+    def _podar(self, inicio):
+        """Descarta las consultas vencidas y las escrituras que ya no hay que volver a aplicar.
+
+        Se llama con los dos candados tomados; ``inicio`` es el de la carga
+        en curso. Una escritura se conserva mientras sea posterior a esa
+        carga o a alguna consulta guardada.
+        """
+        ahora = time.monotonic()
+        self._consultas = {clave: guardada for clave, guardada in self._consultas.items()
+                           if ahora - guardada[0] < self.vigencia}
+        limite = min([inicio, *(instante for instante, _ in self._consultas.values())])
+        self._escrituras = [e for e in self._escrituras if e[0] >= limite]
+
+    def _avanzar_marca(self, tareas):
+        """Sube la marca al campo más reciente de ``tareas`` (con el candado tomado)."""
+        tareas = list(tareas)
+        # Si la API guarda la fecha de modificación, los cambios también se sincronizan
+        if any('updatedAt' in tarea for tarea in tareas):
+            self._campo = 'updatedAt'
+        marcas = [str(tarea[self._campo]) for tarea in tareas if tarea.get(self._campo)]
+        if marcas:
+            self._marca = max([self._marca, *marcas] if self._marca else marcas)
+
+    def invalidar(self, completa=False):
+        """Marca la copia como vencida: la próxima lectura pide los cambios (o todo).
+
+        Espera a la carga en curso, si la hay, para que no vuelva a marcar
+        como vigente lo que se acaba de invalidar.
+        """
+        with self._carga, self._candado:
+            self._cargada = None
+            self._consultas = {}
+            if completa:
+                self._completa = None
+
+    # --- Escritura ---
+
+    @staticmethod
+    def _aplicar(tareas, id_tarea, tarea):
+        if tarea is None:
+            tareas.pop(id_tarea, None)
+        else:
+            tareas[id_tarea] = tarea
+
+    def _confirmar(self, id_tarea, tarea):
+        """Guarda una escritura confirmada por la API (con el candado tomado)."""
+        self._aplicar(self._tareas, id_tarea, tarea)
+        self._escrituras.append((time.monotonic(), id_tarea, tarea))
+
+    def crear(self, tarea):
+        """Agrega la tarea al instante y la envía a la API en segundo plano.
+
+        Devuelve un ``Future`` con la tarea guardada por la API (o su error).
+        """
+        id_local = f"local-{uuid.uuid4().hex[:12]}"
+        with self._candado:
+            self._locales[id_local] = {**tarea, 'id': id_local, PENDIENTE: True}
+        return self._hilos.submit(self._crear, id_local, tarea)
+
+    def _crear(self, id_local, tarea):
+        try:
+            guardada = self.cliente.crear(tarea)
+        except Exception:
+            with self._candado:
+                self._locales.pop(id_local, None)
+            raise
+        # La provisional se cambia por la confirmada de una sola vez
+        with self._candado:
+            self._locales.pop(id_local, None)
+            self._confirmar(guardada['id'], guardada)
+        return guardada
+
+    def registrar(self, tareas):
+        """Agrega tareas que ya guardó la API (por ejemplo, las de una importación)."""
+        with self._candado:
+            for tarea in tareas:
+                self._confirmar(tarea['id'], tarea)
+
+    def actualizar(self, id_tarea, campos):
+        """Aplica el cambio al instante y lo envía a la API en segundo plano.
+
+        Devuelve un ``Future`` con la tarea actualizada; si la API falla el
+        cambio local se deshace. Lanza ``KeyError`` si la tarea no existe.
+        """
+        with self._candado:
+            anterior = self._tareas.get(id_tarea)
+            base = anterior if anterior is not None else self._consultada(id_tarea)
+        if base is None:
+            # Sin la copia completa la tarea puede no estar en ninguna consulta
+            base = self._obtener(id_tarea)
+        with self._candado:
+            optimista = {**base, **campos, PENDIENTE: True}
+            self._tareas[id_tarea] = optimista
+        return self._hilos.submit(self._actualizar, id_tarea, campos, anterior, optimista)
+
+    def _consultada(self, id_tarea):
+        """La tarea según alguna consulta filtrada, o None (con el candado tomado)."""
+        return next((tareas[id_tarea] for _, tareas in self._consultas.values() if id_tarea in tareas), None)
+
+    def _obtener(self, id_tarea):
+        try:
+            return self.cliente.obtener(id_tarea)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                raise KeyError(id_tarea) from None
+            raise
+
+    def _actualizar(self, id_tarea, campos, anterior, optimista):
+        try:
+            guardada = self.cliente.actualizar(id_tarea, campos)
+        except Exception:
+            with self._candado:
+                # Solo si nadie la cambió después
+                if self._tareas.get(id_tarea) is optimista:
+                    self._aplicar(self._tareas, id_tarea, anterior)
+            raise
+        with self._candado:
+            self._confirmar(id_tarea, guardada)
+        return guardada
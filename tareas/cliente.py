@@ -0,0 +1,131 @@
+"""Cliente HTTP de la API de tareas (mockapi.io o una compatible).
+
+Una sola sesión de ``requests`` por proceso: las conexiones keep-alive se
+reutilizan entre peticiones y entre sesiones de Streamlit. Toda petición
+lleva tiempo de espera, y los errores de red y las respuestas 429/5xx se
+reintentan con espera exponencial (POST solo si la conexión ni siquiera se
+abrió, para no crear tareas duplicadas).
+
+La lista se pide por páginas con ``page``/``limit``: la primera sola y las
+siguientes de a varias a la vez, hasta que una página llega incompleta.
+Para sincronizar solo lo nuevo, ``recientes`` pide las tareas de la más
+reciente hacia atrás (``sortBy``/``order``) y se detiene en la marca de la
+última sincronización.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+TAMANO_PAGINA = 500
+# Páginas más chicas para los cambios: casi siempre cabe todo en la primera
+TAMANO_PAGINA_RECIENTES = 50
+PAGINAS_SIMULTANEAS = 8
+# (conexión, lectura) en segundos
+TIEMPO_ESPERA = (3.05, 20)
+REINTENTOS = 3
+# Espera antes del reintento n: ESPERA_REINTENTO * 2 ** (n - 1) segundos
+ESPERA_REINTENTO = 0.5
+ESTADOS_REINTENTO = (429, 500, 502, 503, 504)
+
+
+class ClienteTareas:
+    """Operaciones sobre ``/tasks`` con una sesión compartida y paginación concurrente."""
+
+    def __init__(self, url, tamano_pagina=TAMANO_PAGINA, simultaneas=PAGINAS_SIMULTANEAS,
+                 tiempo_espera=TIEMPO_ESPERA, reintentos=REINTENTOS):
+        self.url = url.rstrip('/')
+        self.tamano_pagina = tamano_pagina
+        self.simultaneas = simultaneas
+        self.tiempo_espera = tiempo_espera
+
+        reintento = Retry(
+            total=reintentos,
+            backoff_factor=ESPERA_REINTENTO,
+            status_forcelist=ESTADOS_REINTENTO,
+            # Los métodos idempotentes; POST solo reintenta errores de conexión
+            allowed_methods=frozenset({'GET', 'PUT', 'DELETE'}),
+            respect_retry_after_header=True,
+            # Agotados los reintentos se devuelve la última respuesta (y
+            # raise_for_status la convierte en HTTPError)
+            raise_on_status=False,
+        )
+        # Una conexión por página simultánea
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=simultaneas, max_retries=reintento)
+        self.sesion = requests.Session()
+        self.sesion.mount('http://', adaptador)
+        self.sesion.mount('https://', adaptador)
+        self._hilos = ThreadPoolExecutor(simultaneas, thread_name_prefix='tareas-http')
+
+    def _pedir(self, metodo, id_tarea=None, **kwargs):
+        url = self.url if id_tarea is None else f"{self.url}/{id_tarea}"
+        respuesta = self.sesion.request(metodo, url, timeout=self.tiempo_espera, **kwargs)
+        respuesta.raise_for_status()
+        return respuesta.json()
+
+    def pagina(self, numero, parametros=None, limite=None):
+        """Tareas de la página ``numero`` (empieza en 1)."""
+        try:
+            return self._pedir('GET', params={**(parametros or {}), 'page': numero,
+                                              'limit': limite or self.tamano_pagina})
+        except requests.HTTPError as e:
+            # mockapi.io responde 404 cuando no hay nada que listar
+            if e.response is not None and e.response.status_code == 404:
+                return []
+            raise
+
+    def listar(self, parametros=None):
+        """Todas las tareas, pedidas por páginas (varias a la vez).
+
+        Lanza ``requests.RequestException`` si alguna página falla después
+        de los reintentos.
+        """
+        tareas = {}
+
+        def agregar(pagina):
+            # Por id: si la colección cambia mientras se pagina, una tarea
+            # puede aparecer en dos páginas seguidas
+            for tarea in pagina:
+                tareas[tarea.get('id')] = tarea
+            return len(pagina) == self.tamano_pagina
+
+        if not agregar(self.pagina(1, parametros)):
+            return list(tareas.values())
+        siguiente = 2
+        while True:
+            numeros = range(siguiente, siguiente + self.simultaneas)
+            for pagina in self._hilos.map(lambda n: self.pagina(n, parametros), numeros):
+                if not agregar(pagina):
+                    return list(tareas.values())
+            siguiente += self.simultaneas
+
+    def recientes(self, desde, campo='createdAt', limite=TAMANO_PAGINA_RECIENTES):
+        """Tareas con ``campo`` mayor o igual que ``desde``, de la más reciente hacia atrás.
+
+        Las marcas son fechas ISO 8601 de la misma API, que se comparan como
+        texto. Se incluye la marca misma: las tareas creadas en el mismo
+        segundo que la última sincronizada no se pierden (se repite alguna).
+        """
+        tareas = []
+        numero = 1
+        while True:
+            pagina = self.pagina(numero, {'sortBy': campo, 'order': 'desc'}, limite)
+            nuevas = [tarea for tarea in pagina if str(tarea.get(campo, '')) >= desde]
+            tareas.extend(nuevas)
+            if len(nuevas) < len(pagina) or len(pagina) < limite:
+                return tareas
+            numero += 1
+
+    def obtener(self, id_tarea):
+        return self._pedir('GET', id_tarea)
+
+    def crear(self, tarea):
+        """Crea la tarea y devuelve la guardada por la API (con ``id`` y ``createdAt``)."""
+        return self._pedir('POST', json=tarea)
+
+    def actualizar(self, id_tarea, campos):
+        return self._pedir('PUT', id_tarea, json=campos)
+
+    def eliminar(self, id_tarea):
+        return self._pedir('DELETE', id_tarea)
@@ -0,0 +1,60 @@
+"""Filtros de la lista de tareas, traducidos a parámetros de la API.
+
+mockapi.io filtra por igualdad de campo (``?isComplete=true&priority=1``),
+así que el estado y la prioridad se le piden a la API y la respuesta trae
+solo esas tareas. Los rangos (la ventana de fecha límite) no los sabe
+filtrar: esos se aplican aquí sobre lo recibido. ``aplicar`` revisa todas
+las condiciones, de modo que el resultado es correcto aunque la API ignore
+los parámetros.
+"""
+from dataclasses import dataclass
+
+# Columnas que usan la tabla y la gráfica de la página de tareas
+CAMPOS_VISTA = ['id', 'taskTitle', 'description', 'priority', 'isComplete', 'dueDate']
+
+
+@dataclass(frozen=True)
+class FiltroTareas:
+    """Condiciones sobre las tareas; ``None`` es "cualquiera".
+
+    ``completa`` es ``'true'`` o ``'false'`` y ``prioridad`` ``'1'`` a ``'3'``,
+    como los guarda la API. Las fechas límite son ``AAAA-MM-DD`` e incluyen
+    los extremos.
+    """
+
+    completa: str = None
+    prioridad: str = None
+    vence_desde: str = None
+    vence_hasta: str = None
+
+    def vacio(self):
+        return self == FiltroTareas()
+
+    def parametros(self):
+        """Parámetros de consulta para las condiciones que la API filtra (igualdad de campo)."""
+        parametros = {}
+        if self.completa is not None:
+            parametros['isComplete'] = self.completa
+        if self.prioridad is not None:
+            parametros['priority'] = self.prioridad
+        return parametros
+
+    def cumple_parametros(self, tarea):
+        """Si ``tarea`` cumple las condiciones que se le piden a la API."""
+        return all(str(tarea.get(campo)) == valor for campo, valor in self.parametros().items())
+
+    def cumple(self, tarea):
+        if not self.cumple_parametros(tarea):
+            return False
+        vence = str(tarea.get('dueDate') or '')[:10]
+        if self.vence_desde is not None and not (vence and vence >= self.vence_desde):
+            return False
+        if self.vence_hasta is not None and not (vence and vence <= self.vence_hasta):
+            return False
+        return True
+
+    def aplicar(self, tareas):
+        """Las tareas que cumplen todas las condiciones."""
+        if self.vacio():
+            return list(tareas)
+        return [tarea for tarea in tareas if self.cumple(tarea)]
@@ -0,0 +1,187 @@
+"""Importación masiva de tareas desde un CSV o un JSON.
+
+Cada fila se valida y normaliza al formato de la API (los mismos strings
+que envía el formulario). Las válidas se envían con un pool acotado de
+hilos, sin pasar de ``por_segundo`` peticiones por segundo.
+
+Un POST se reenvía (con espera exponencial) solo si es seguro que la API no
+lo procesó: la conexión no llegó a abrirse o la API respondió 429. Si la
+respuesta no llega (tiempo de espera de lectura, conexión cortada) o es un
+5xx, la tarea pudo haberse creado: se informa como fallida con resultado
+desconocido, sin reenviarla, para no crear duplicados. Los errores de
+validación (4xx) tampoco se reintentan.
+"""
+import io
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date
+
+import pandas as pd
+import requests
+from urllib3.exceptions import ProtocolError
+
+from .cliente import ESPERA_REINTENTO, PAGINAS_SIMULTANEAS
+
+CAMPOS = ('taskTitle', 'description', 'priority', 'isComplete', 'dueDate')
+# Tantas como conexiones guarda la sesión del cliente
+IMPORTACIONES_SIMULTANEAS = PAGINAS_SIMULTANEAS
+PETICIONES_POR_SEGUNDO = 100
+REINTENTOS_IMPORTACION = 3
+VERDADEROS = {'true', '1', 'si', 'sí', 'yes'}
+FALSOS = {'false', '0', 'no', ''}
+
+
+def leer_archivo(nombre, contenido):
+    """Filas (dicts) de un CSV o de un JSON (lista de objetos, o {"tasks": [...]})."""
+    if nombre.lower().endswith('.json'):
+        datos = json.loads(contenido)
+        if isinstance(datos, dict):
+            datos = datos.get('tasks', [])
+        if not isinstance(datos, list) or not all(isinstance(fila, dict) for fila in datos):
+            raise ValueError("El JSON debe ser una lista de tareas (objetos).")
+        return datos
+    df = pd.read_csv(io.BytesIO(contenido), dtype=str, keep_default_na=False)
+    return df.to_dict('records')
+
+
+def validar_tarea(fila):
+    """Tarea lista para enviar, o ``ValueError`` con el motivo."""
+    titulo = str(fila.get('taskTitle') or '').strip()
+    if not titulo:
+        raise ValueError("falta taskTitle")
+
+    prioridad = str(fila.get('priority') or '2').strip()
+    if prioridad not in ('1', '2', '3'):
+        raise ValueError(f"priority debe ser 1, 2 o 3 (no '{prioridad}')")
+
+    completa = str(fila.get('isComplete', '')).strip().lower()
+    if completa not in VERDADEROS | FALSOS:
+        raise ValueError(f"isComplete debe ser true o false (no '{completa}')")
+
+    fecha = str(fila.get('dueDate') or '').strip()
+    if fecha:
+        try:
+            fecha = date.fromisoformat(fecha[:10]).isoformat()
+        except ValueError:
+            raise ValueError(f"dueDate debe ser una fecha AAAA-MM-DD (no '{fecha}')") from None
+
+    return {
+        'taskTitle': titulo,
+        'description': str(fila.get('description') or '').strip(),
+        'priority': prioridad,
+        'isComplete': 'true' if completa in VERDADEROS else 'false',
+        'dueDate': fecha,
+    }
+
+
+def validar(filas):
+    """Separa las filas en ``(tareas válidas, errores)``.
+
+    Cada válida es ``(número de fila, tarea)`` y cada error
+    ``(número de fila, motivo)``; las filas se numeran desde 1.
+    """
+    validas, errores = [], []
+    for numero, fila in enumerate(filas, start=1):
+        try:
+            validas.append((numero, validar_tarea(fila)))
+        except ValueError as e:
+            errores.append((numero, str(e)))
+    return validas, errores
+
+
+class LimiteTasa:
+    """Reparte turnos a ``por_segundo`` por segundo entre todos los hilos."""
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1 / por_segundo
+        self._siguiente = time.monotonic()
+        self._candado = threading.Lock()
+
+    def esperar(self):
+        with self._candado:
+            ahora = time.monotonic()
+            turno = max(self._siguiente, ahora)
+            self._siguiente = turno + self.intervalo
+        time.sleep(max(0.0, turno - ahora))
+
+
+def _reintentable(error):
+    """Si reenviar el POST no puede duplicar la tarea (la API no lo procesó)."""
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code == 429
+    # ConnectTimeout es un ConnectionError; "Connection aborted" (ProtocolError)
+    # es un corte después de enviar la petición
+    causa = error.args[0] if error.args else None
+    return isinstance(error, requests.ConnectionError) and not isinstance(causa, ProtocolError)
+
+
+def _desconocido(error):
+    """Si la API pudo haber creado la tarea aunque la petición falló."""
+    if isinstance(error, requests.HTTPError):
+        return error.response is None or error.response.status_code >= 500
+    return not _reintentable(error)
+
+
+@dataclass
+class ResultadoImportacion:
+    creadas: list = field(default_factory=list)
+    # (número de fila, tarea, motivo)
+    fallidas: list = field(default_factory=list)
+    # Números de fila de las fallidas que la API pudo haber creado igual
+    inciertas: list = field(default_factory=list)
+    segundos: float = 0.0
+
+    def informe(self):
+        """DataFrame de las filas que no se pudieron crear, con su motivo."""
+        return pd.DataFrame(
+            [{'fila': numero, **tarea, 'error': motivo} for numero, tarea, motivo in self.fallidas],
+            columns=['fila', *CAMPOS, 'error'],
+        )
+
+
+def importar(cliente, validas, simultaneas=IMPORTACIONES_SIMULTANEAS, por_segundo=PETICIONES_POR_SEGUNDO,
+             reintentos=REINTENTOS_IMPORTACION, progreso=None):
+    """Crea las tareas ``validas`` (de ``validar``) en la API.
+
+    ``progreso(hechas, total)`` se llama en el hilo que importa (no en los
+    del pool) cada vez que termina una tarea, así que puede dibujar en
+    Streamlit.
+    """
+    limite = LimiteTasa(por_segundo)
+
+    def enviar(tarea):
+        for intento in range(reintentos + 1):
+            limite.esperar()
+            try:
+                return cliente.crear(tarea)
+            except requests.RequestException as e:
+                if intento == reintentos or not _reintentable(e):
+                    raise
+                time.sleep(ESPERA_REINTENTO * 2 ** intento)
+
+    resultado = ResultadoImportacion()
+    inicio = time.monotonic()
+    with ThreadPoolExecutor(simultaneas, thread_name_prefix='tareas-importacion') as hilos:
+        futuros = {hilos.submit(enviar, tarea): (numero, tarea) for numero, tarea in validas}
+        for hechas, futuro in enumerate(as_completed(futuros), start=1):
+            numero, tarea = futuros[futuro]
+            try:
+                resultado.creadas.append(futuro.result())
+            except requests.RequestException as e:
+                if isinstance(e, requests.HTTPError) and e.response is not None:
+                    motivo = f"HTTP {e.response.status_code}"
+                else:
+                    motivo = f"conexión: {e}"
+                if _desconocido(e):
+                    motivo += " (resultado desconocido: pudo haberse creado)"
+                    resultado.inciertas.append(numero)
+                resultado.fallidas.append((numero, tarea, motivo))
+            if progreso is not None:
+                progreso(hechas, len(futuros))
+    resultado.fallidas.sort(key=lambda fallida: fallida[0])
+    resultado.inciertas.sort()
+    resultado.segundos = time.monotonic() - inicio
+    return resultado
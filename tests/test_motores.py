@@ -0,0 +1,98 @@
+"""Paridad de los motores de consulta con una referencia en pandas simple, y entre ellos, sobre datos sintéticos."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from accidentalidad import coleccion
+from accidentalidad.busqueda import COLUMNAS_TEXTO, normalizar_texto
+from accidentalidad.compartido import DatasetCompartido
+from accidentalidad.cubo import Cubo
+from accidentalidad.motores import MotorPandas, comparar
+from herramientas.generar_datos import generar
+
+
+@pytest.fixture(scope='module')
+def dataset(tmp_path_factory):
+    carpeta = tmp_path_factory.mktemp('motores')
+    ruta = generar(20_000, carpeta / 'AMVA_sintetico.csv', semilla=7, desde='2015-01-01', anios=3)
+    rutas, cache = [ruta], carpeta / 'cache'
+    huellas = coleccion.huellas(rutas)
+    coleccion.asegurar_snapshots(rutas, huellas, cache)
+    return DatasetCompartido('prueba', coleccion.leer_coleccion(rutas, huellas, directorio_cache=cache))
+
+
+class MotorReferencia:
+    """Los filtros con máscaras booleanas sobre el DataFrame y los conteos con ``Cubo.construir``."""
+
+    def __init__(self, dataset):
+        self.df = dataset.df
+
+    def seleccionar(self, igualdades=None, rango=None, consulta=None):
+        df = self.df
+        mascara = np.ones(len(df), dtype=bool)
+        for col, valor in (igualdades or {}).items():
+            mascara &= (df[col] == valor).to_numpy()
+        if rango is not None:
+            desde, hasta = (pd.Timestamp(f) for f in rango)
+            mascara &= df['FECHA'].between(desde, hasta).to_numpy()
+        consulta = normalizar_texto(consulta) if consulta else ''
+        if consulta:
+            contiene = np.zeros(len(df), dtype=bool)
+            for col in COLUMNAS_TEXTO:
+                textos = df[col].astype(object).map(lambda v: normalizar_texto(v) if isinstance(v, str) else '')
+                contiene |= textos.str.contains(consulta, regex=False).to_numpy()
+            mascara &= contiene
+        # Igual que los motores: sin igualdades ni texto, un rango que cubre todo no filtra
+        if not igualdades and not consulta and mascara.all():
+            return None
+        return np.flatnonzero(mascara)
+
+    def vista(self, igualdades=None, rango=None, consulta=None):
+        filas = self.seleccionar(igualdades, rango, consulta)
+        return Cubo.construir(self.df if filas is None else self.df.take(filas))
+
+
+def casos(df):
+    primero, ultimo = df['FECHA'].min(), df['FECHA'].max()
+    return [
+        # Sin filtros
+        ({}, None, None),
+        # Filtros por categoría, solos y combinados
+        ({'MUNICIPIO': 'MEDELLIN'}, None, None),
+        ({'CLASE': 'Choque', 'GRAVEDAD': 'Heridos'}, None, None),
+        ({'DÍA DE LA SEMANA': 'LUNES', 'COMUNA': 'BELEN'}, None, None),
+        # Rangos de fechas: justo en los bordes de los datos, a mitad de mes y de un solo día
+        ({}, (primero, ultimo), None),
+        ({}, (primero, primero + pd.Timedelta(days=45)), None),
+        ({}, (ultimo - pd.Timedelta(days=45), ultimo), None),
+        ({'MUNICIPIO': 'BELLO'}, (pd.Timestamp('2016-03-17'), pd.Timestamp('2017-02-09')), None),
+        ({}, (pd.Timestamp('2016-05-05'), pd.Timestamp('2016-05-05')), None),
+        # Búsqueda de texto (sin tildes ni mayúsculas), sola y con filtros
+        ({}, None, 'barrio 01'),
+        ({'CLASE': 'Atropello'}, (pd.Timestamp('2016-01-01'), pd.Timestamp('2016-06-30')), 'cl 1'),
+        # Sin coincidencias
+        ({'MUNICIPIO': 'MEDELLIN'}, None, 'no existe esta direccion'),
+        # Ventana fuera del rango de los datos
+        ({}, (pd.Timestamp('2030-01-01'), pd.Timestamp('2030-12-31')), None),
+    ]
+
+
+def test_pandas_coincide_con_la_referencia(dataset):
+    assert comparar(MotorReferencia(dataset), MotorPandas(dataset), casos(dataset.df)) == []
+
+
+def test_pandas_y_duckdb_coinciden(dataset):
+    pytest.importorskip('duckdb')
+    from accidentalidad.motores import MotorDuckDB
+
+    assert comparar(MotorReferencia(dataset), MotorDuckDB(dataset), casos(dataset.df)) == []
+    assert comparar(MotorPandas(dataset), MotorDuckDB(dataset), casos(dataset.df)) == []
+
+
+def test_casos_no_triviales(dataset):
+    # Los casos sin coincidencias y fuera de rango de verdad no seleccionan nada
+    motor = MotorPandas(dataset)
+    *_, sin_coincidencias, fuera_de_rango = casos(dataset.df)
+    assert len(motor.seleccionar(*sin_coincidencias)) == 0
+    assert len(motor.seleccionar(*fuera_de_rango)) == 0
+    assert 0 < len(motor.seleccionar({}, None, 'barrio 01')) < len(dataset.df)